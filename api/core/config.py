@@ -1,4 +1,3 @@
-from openai import OpenAI
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
 from authlib.integrations.starlette_client import OAuth
@@ -24,13 +23,3 @@ def set_youtube_key():
     YOUTUBE_KEY = os.getenv("YOUTUBE_KEY")
     youtube = build('youtube', 'v3', developerKey=YOUTUBE_KEY)
     return youtube
-
-def set_gemini_key():
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    
-    client = OpenAI(
-        api_key=GEMINI_API_KEY,
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-    )
-    
-    return client
\ No newline at end of file
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+import httpx
+
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+# Max in-flight LLM requests per event loop (async) and per process (sync/threaded)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Pooled HTTP connections kept open to the Gemini endpoint
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+# Retries the OpenAI SDK does on 429/5xx/connection errors, with backoff
+LLM_MAX_RETRIES = 2
+
+
+@dataclass(frozen=True)
+class ModelLimit:
+    requests_per_minute: int
+    timeout: float  # seconds for a whole request, including generation
+
+
+MODEL_LIMITS = {
+    "gemini-2.5-pro": ModelLimit(requests_per_minute=int(os.getenv("LLM_PRO_RPM", "60")), timeout=180.0),
+    "gemini-2.5-flash": ModelLimit(requests_per_minute=int(os.getenv("LLM_FLASH_RPM", "300")), timeout=90.0),
+}
+DEFAULT_LIMIT = ModelLimit(requests_per_minute=60, timeout=120.0)
+
+
+class _RateLimiter:
+    """
+    Per-model request pacing shared by sync and async callers. reserve() books the
+    next free slot under a short lock and returns how long the caller must wait,
+    so neither threads nor coroutines hold the lock while sleeping.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def reserve(self, model: str) -> float:
+        interval = 60.0 / max(1, limit_for(model).requests_per_minute)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(model, now))
+            self._next_slot[model] = slot + interval
+        return slot - now
+
+
+_rate_limiter = _RateLimiter()
+
+# Async clients and semaphores are bound to the loop they were created on
+_loop_state = weakref.WeakKeyDictionary()
+
+_sync_client = None
+_sync_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_sync_lock = threading.Lock()
+
+
+def limit_for(model: str) -> ModelLimit:
+    return MODEL_LIMITS.get(model, DEFAULT_LIMIT)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+
+
+def _async_state():
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        client = AsyncOpenAI(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            base_url=GEMINI_BASE_URL,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=DEFAULT_LIMIT.timeout),
+        )
+        state = (client, asyncio.Semaphore(LLM_MAX_CONCURRENCY))
+        _loop_state[loop] = state
+    return state
+
+
+def get_async_client() -> AsyncOpenAI:
+    """The pooled AsyncOpenAI client for the running event loop."""
+    return _async_state()[0]
+
+
+def get_sync_client() -> OpenAI:
+    """The process-wide pooled OpenAI client, for sync and threaded code."""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None:
+            _sync_client = OpenAI(
+                api_key=os.getenv("GEMINI_API_KEY"),
+                base_url=GEMINI_BASE_URL,
+                max_retries=LLM_MAX_RETRIES,
+                http_client=httpx.Client(limits=_limits(), timeout=DEFAULT_LIMIT.timeout),
+            )
+        return _sync_client
+
+
+async def chat_completion(model: str, messages: list, timeout: float = None, **kwargs):
+    """
+    Non-blocking chat completion through the shared client: waits for a
+    concurrency slot and the model's rate limit, then awaits the request.
+    """
+    client, semaphore = _async_state()
+    async with semaphore:
+        delay = _rate_limiter.reserve(model)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout or limit_for(model).timeout,
+            **kwargs,
+        )
+
+
+async def stream_chat_completion(model: str, messages: list, timeout: float = None, **kwargs):
+    """
+    Streaming chat completion: yields content deltas as the model produces them.
+    Holds a concurrency slot until the stream is exhausted or closed.
+    """
+    client, semaphore = _async_state()
+    async with semaphore:
+        delay = _rate_limiter.reserve(model)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout or limit_for(model).timeout,
+            stream=True,
+            **kwargs,
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+
+def chat_completion_sync(model: str, messages: list, timeout: float = None, **kwargs):
+    """Blocking counterpart of chat_completion for sync routes, threads and scripts."""
+    client = get_sync_client()
+    with _sync_semaphore:
+        delay = _rate_limiter.reserve(model)
+        if delay > 0:
+            time.sleep(delay)
+        return client.chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout or limit_for(model).timeout,
+            **kwargs,
+        )
+
+
+def response_text(response) -> str:
+    """Message content of the first choice, or '' if the model returned none."""
+    try:
+        return (response.choices[0].message.content or "").strip()
+    except (AttributeError, IndexError):
+        return ""
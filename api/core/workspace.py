@@ -0,0 +1,186 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# All video work happens under this directory, one subdirectory per reel job
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", "workspace")
+# Global disk budget for everything under WORKSPACE_ROOT
+WORKSPACE_MAX_BYTES = int(os.getenv("WORKSPACE_MAX_MB", "4096")) * 1024 * 1024
+
+# Directories used before per-job workspaces existed; leftovers are removed at startup
+LEGACY_DIRS = ("downloads", "highlights", "final_reels")
+
+JOB_SUBDIRS = ("downloads", "highlights", "final_reels")
+
+
+class WorkspaceFullError(RuntimeError):
+    """Raised when the disk budget can't be met even after evicting every idle job."""
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                continue  # removed while walking
+    return total
+
+
+class JobWorkspace:
+    """
+    Isolated directory tree for one reel job: downloads/, highlights/ and final_reels/.
+    Concurrent jobs never see each other's files, so every path a job uses is
+    either one it chose or one yt-dlp/ffmpeg reported back for it.
+    """
+
+    def __init__(self, manager: "WorkspaceManager", job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+        self.root = os.path.join(manager.root, job_id)
+        self.downloads = os.path.join(self.root, "downloads")
+        self.highlights = os.path.join(self.root, "highlights")
+        self.final_reels = os.path.join(self.root, "final_reels")
+        self.active = True
+        self.last_used = time.time()
+        # Clip path -> duration in seconds, filled in as clips are cut so make_final_reel doesn't ffprobe them
+        self.clip_durations = {}
+
+    def touch(self):
+        self.last_used = time.time()
+
+    def reserve(self, nbytes: int):
+        """
+        Book `nbytes` of the global budget for what this job writes next, evicting
+        idle jobs if needed. The booking replaces the job's previous one (a job has
+        one download in flight at a time) and lasts until finish() or release(),
+        so concurrent jobs can't all claim the same free space.
+        """
+        self.touch()
+        self.manager.ensure_space(nbytes, job=self)
+
+    def final_path(self, filename: str) -> str:
+        self.touch()
+        return os.path.join(self.final_reels, filename)
+
+    def finish(self):
+        """Mark the job idle and drop its booking: its files stay until released or evicted."""
+        self.active = False
+        self.touch()
+        self.manager.unreserve(self)
+
+    def release(self):
+        self.manager.release(self)
+
+
+class WorkspaceManager:
+    """
+    Hands out per-job workspaces under one root and keeps total disk use plus
+    active jobs' reserved bytes under max_bytes by evicting idle jobs, least
+    recently used first. Active jobs are never evicted.
+    """
+
+    def __init__(self, root: str = WORKSPACE_ROOT, max_bytes: int = WORKSPACE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._jobs = {}
+        self._reserved = {}  # job_id -> bytes booked by JobWorkspace.reserve()
+        self._lock = threading.Lock()
+
+    def create_job(self, prefix: str = "job") -> JobWorkspace:
+        job = JobWorkspace(self, f"{prefix}_{uuid.uuid4().hex[:12]}")
+        for sub in JOB_SUBDIRS:
+            os.makedirs(os.path.join(job.root, sub), exist_ok=True)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        return job
+
+    def get_job(self, job_id: str):
+        """The live job with this id, or None if it was released or evicted."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def release(self, job: JobWorkspace):
+        """Delete everything the job wrote."""
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+            self._reserved.pop(job.job_id, None)
+        shutil.rmtree(job.root, ignore_errors=True)
+
+    def unreserve(self, job: JobWorkspace):
+        with self._lock:
+            self._reserved.pop(job.job_id, None)
+
+    def usage_bytes(self) -> int:
+        return _dir_size(self.root) if os.path.isdir(self.root) else 0
+
+    def ensure_space(self, nbytes: int = 0, job: JobWorkspace = None):
+        """
+        Evict idle jobs (LRU) until `nbytes` more fits in the budget alongside
+        other jobs' bookings. With `job`, the bytes are then booked for it.
+        """
+        with self._lock:
+            if job is not None:
+                self._reserved.pop(job.job_id, None)
+            usage = self.usage_bytes() + sum(self._reserved.values())
+            if usage + nbytes <= self.max_bytes:
+                if job is not None:
+                    self._reserved[job.job_id] = nbytes
+                return
+
+            idle = sorted((j for j in self._jobs.values() if not j.active), key=lambda j: j.last_used)
+            for idle_job in idle:
+                size = _dir_size(idle_job.root)
+                shutil.rmtree(idle_job.root, ignore_errors=True)
+                self._jobs.pop(idle_job.job_id, None)
+                self._reserved.pop(idle_job.job_id, None)
+                usage -= size
+                print(f"🧹 Evicted workspace {idle_job.job_id} ({size / (1024 * 1024):.1f}MB)")
+                if usage + nbytes <= self.max_bytes:
+                    if job is not None:
+                        self._reserved[job.job_id] = nbytes
+                    return
+
+        raise WorkspaceFullError(
+            f"Workspace budget exceeded: {usage / (1024 * 1024):.0f}MB used or reserved, "
+            f"{nbytes / (1024 * 1024):.0f}MB needed, {self.max_bytes / (1024 * 1024):.0f}MB allowed"
+        )
+
+    def cleanup_orphans(self):
+        """
+        Remove job directories this process doesn't know about (left behind by a
+        crash or restart) and stray files in the legacy shared directories.
+        """
+        removed = 0
+        if os.path.isdir(self.root):
+            with self._lock:
+                known = set(self._jobs)
+            for entry in os.scandir(self.root):
+                if entry.name in known:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+                removed += 1
+
+        for legacy in LEGACY_DIRS:
+            if not os.path.isdir(legacy):
+                continue
+            for entry in os.scandir(legacy):
+                if entry.is_file(follow_symlinks=False):
+                    os.remove(entry.path)
+                    removed += 1
+
+        if removed:
+            print(f"🧹 Removed {removed} orphaned workspace entries")
+
+
+workspace_manager = WorkspaceManager()
@@ -1,10 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from contextlib import asynccontextmanager
 import os
-from routers import nba_routes, hs_routes, college_routes, game_routes, auth_routes, community_routes, user_routes
+from core.workspace import workspace_manager
+from routers import nba_routes, hs_routes, college_routes, game_routes, auth_routes, community_routes, user_routes, reel_routes
 
-app = FastAPI(title="swish report")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Reel jobs left behind by a previous process can never be served; reclaim their disk
+    workspace_manager.cleanup_orphans()
+    yield
+
+app = FastAPI(title="swish report", lifespan=lifespan)
 
 # Add session middleware for OAuth
 app.add_middleware(
@@ -31,3 +39,4 @@ app.include_router(game_routes.router, prefix="/games", tags=["Games"])
 app.include_router(community_routes.router, prefix="/community", tags=["Community"])
 app.include_router(auth_routes.router, prefix="/auth", tags=["Auth"])
 app.include_router(user_routes.router, prefix="/user",tags=["User"] )
+app.include_router(reel_routes.router, prefix="/reels", tags=["Reels"])
@@ -3,15 +3,23 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from random import randint
+from sse_starlette.sse import EventSourceResponse
 from typing import Dict, Union, Literal
 
 from core.db import get_db_connection
+from scripts.insertion.ai_generation import insert_nba_lineup_analysis as lineup_analysis
+from scripts.insertion.ai_generation import insert_player_comparison_analysis as comparison_analysis
+from scripts.insertion.ai_generation import insert_matchup_simulation_analysis as matchup_analysis
+from scripts.insertion.ai_generation import insert_hot_take_analysis as hot_take_analysis
 from scripts.insertion.ai_generation.insert_nba_lineup_analysis import create_nba_lineup_analysis
 from scripts.insertion.ai_generation.insert_hot_take_analysis import create_hot_take_analysis
 from scripts.insertion.ai_generation.insert_player_comparison_analysis import create_player_comparison_analysis
 from scripts.insertion.ai_generation.insert_matchup_simulation_analysis import create_matchup_simulation_analysis
+from utils.ai_analysis_cache import analysis_cache_key, cached_analysis, get_cached_analysis, save_analysis, snapshot_hash
+from utils.ai_streaming import stream_analysis_events
 from utils.nba_helpers import fetch_nba_player_stats, handle_name, normalize_season
 
+import asyncio
 import json
 
 router = APIRouter()
@@ -20,10 +28,12 @@ class LineupSubmission(BaseModel):
     mode: Literal["starting5", "rotation"]
     lineup: Dict[str, Union[str, None]]  # positions mapped to player names or null
     email: str
+    refresh: bool = False  # skip the AI analysis cache and regenerate
 
 class MatchupSimulationSubmission(BaseModel):
     lineup1: Dict[str, Union[str, None]]
     lineup2: Dict[str, Union[str, None]]
+    refresh: bool = False
 
 class HotTakeSubmission(BaseModel):
     user_id: str
@@ -32,6 +42,91 @@ class HotTakeSubmission(BaseModel):
 class PlayerComparisonSubmission(BaseModel):
     player1_id: str
     player2_id: str
+    refresh: bool = False
+
+def get_user_id(cursor, email: str):
+    cursor.execute("SELECT user_id FROM users WHERE email = %s", (email,))
+    user_row = cursor.fetchone()
+    if not user_row:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_row["user_id"]
+
+def fetch_lineup_players(cursor, player_ids: list) -> list:
+    """Player info plus AI evaluation for every id in a lineup; 404 if none are found."""
+    placeholders = ",".join(["%s"] * len(player_ids))
+    select_sql = f"""
+        SELECT
+            p.player_uid,
+            p.full_name,
+            nba.position,
+            nba.height,
+            nba.weight,
+            nba.years_pro,
+            nba.accolades,
+            ai.stars,
+            ai.rating,
+            ai.strengths,
+            ai.weaknesses,
+            ai.ai_analysis
+        FROM players AS p
+        INNER JOIN nba_player_info AS nba
+            ON p.player_uid = nba.player_uid
+        INNER JOIN ai_generated_nba_evaluations AS ai
+            ON p.player_uid = ai.player_uid
+        WHERE p.player_uid IN ({placeholders})
+    """
+    cursor.execute(select_sql, player_ids)
+    results = cursor.fetchall()
+
+    if not results:
+        raise HTTPException(status_code=404, detail="No players found for lineup")
+    return results
+
+def insert_lineup(cursor, user_id, mode: str, lineup: dict, analysis_json: dict) -> int:
+    insert_sql = """
+        INSERT INTO lineups (user_id, mode, players, scouting_report)
+        VALUES (%s, %s, %s, %s)
+    """
+    cursor.execute(insert_sql, (user_id, mode, json.dumps(lineup), json.dumps(analysis_json)))
+    return cursor.lastrowid
+
+def insert_hot_take(cursor, user_id, content: str, analysis_json: dict) -> int:
+    insert_sql = """
+        INSERT INTO hot_takes (user_id, content, truthfulness_score, ai_insight)
+        VALUES (%s, %s, %s, %s)
+    """
+    cursor.execute(
+        insert_sql,
+        (user_id, content, analysis_json["truthfulness_score"], analysis_json["ai_insight"]),
+    )
+    return cursor.lastrowid
+
+def lineup_cache_inputs(mode: str, results: list) -> dict:
+    return {
+        "mode": mode,
+        "player_ids": sorted(str(r["player_uid"]) for r in results),
+        "evaluations": snapshot_hash(sorted(results, key=lambda r: str(r["player_uid"]))),
+    }
+
+def matchup_cache_inputs(lineup1: dict, lineup2: dict, results: list) -> dict:
+    # Lineup order matters (scoreA/scoreB); slots within a lineup are keyed by position
+    return {
+        "lineup1": lineup1,
+        "lineup2": lineup2,
+        "evaluations": snapshot_hash(sorted(results, key=lambda r: str(r["player_uid"]))),
+    }
+
+def persist(write) -> int:
+    """Run write(cursor) on a fresh connection and commit; used once a stream has finished."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        row_id = write(cursor)
+        conn.commit()
+        return row_id
+    finally:
+        cursor.close()
+        conn.close()
 
 @router.get("/poeltl/get-player")
 def poeltl_get_daily_player():
@@ -141,10 +236,21 @@ async def get_player_comparison(submission: PlayerComparisonSubmission):
             "rpg": latest.get("rpg", 0),
         }
 
-    # 5️⃣ AI analysis
-    ai_analysis = await create_player_comparison_analysis(
-        players_data[submission.player1_id],
-        players_data[submission.player2_id]
+    # 5️⃣ AI analysis (cached per player pair and stat snapshot; order doesn't matter)
+    pair = sorted([submission.player1_id, submission.player2_id], key=str)
+    ai_analysis = await cached_analysis(
+        "player_comparison",
+        comparison_analysis.MODEL,
+        comparison_analysis.PROMPT_VERSION,
+        {
+            "player_ids": pair,
+            "stats": snapshot_hash([players_data[pid]["seasons"] for pid in pair]),
+        },
+        lambda: create_player_comparison_analysis(
+            players_data[submission.player1_id],
+            players_data[submission.player2_id]
+        ),
+        bypass=submission.refresh,
     )
 
     result = {
@@ -173,60 +279,22 @@ async def get_lineup_analysis(submission: LineupSubmission):
     cursor = conn.cursor(dictionary=True)
 
     try:
-        cursor.execute("SELECT user_id FROM users WHERE email = %s", (submission.email,))
-        user_row = cursor.fetchone()
-        if not user_row:
-            raise HTTPException(status_code=404, detail="User not found")
-        user_id = user_row["user_id"]
-
-        player_ids = list(submission.lineup.values())
-        placeholders = ",".join(["%s"] * len(player_ids))
-
-        select_sql = f"""
-            SELECT
-                p.player_uid,
-                p.full_name,
-                nba.position,
-                nba.height,
-                nba.weight,
-                nba.years_pro,
-                nba.accolades,
-                ai.stars,
-                ai.rating,
-                ai.strengths,
-                ai.weaknesses,
-                ai.ai_analysis
-            FROM players AS p
-            INNER JOIN nba_player_info AS nba
-                ON p.player_uid = nba.player_uid
-            INNER JOIN ai_generated_nba_evaluations AS ai
-                ON p.player_uid = ai.player_uid
-            WHERE p.player_uid IN ({placeholders})
-        """
-        cursor.execute(select_sql, player_ids)
-        results = cursor.fetchall()
-
-        if not results:
-            raise HTTPException(status_code=404, detail="No players found for lineup")
-
-        analysis_json = await create_nba_lineup_analysis(submission.mode, results)
-        print(analysis_json)
+        user_id = get_user_id(cursor, submission.email)
 
-        insert_sql = """
-            INSERT INTO lineups (user_id, mode, players, scouting_report)
-            VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(
-            insert_sql,
-            (
-                user_id,
-                submission.mode,
-                json.dumps(submission.lineup),
-                json.dumps(analysis_json),
-            ),
+        results = fetch_lineup_players(cursor, list(submission.lineup.values()))
+
+        analysis_json = await cached_analysis(
+            "nba_lineup",
+            lineup_analysis.MODEL,
+            lineup_analysis.PROMPT_VERSION,
+            lineup_cache_inputs(submission.mode, results),
+            lambda: create_nba_lineup_analysis(submission.mode, results),
+            bypass=submission.refresh,
         )
+        print(analysis_json)
+
+        lineup_id = insert_lineup(cursor, user_id, submission.mode, submission.lineup, analysis_json)
         conn.commit()
-        lineup_id = cursor.lastrowid
 
         return {
             "message": "Lineup submitted successfully",
@@ -245,29 +313,12 @@ async def submit_hot_take(submission: HotTakeSubmission):
     cursor = conn.cursor(dictionary=True)
 
     try:
-        cursor.execute("SELECT user_id FROM users WHERE email = %s", (submission.user_id,))
-        user_row = cursor.fetchone()
-        if not user_row:
-            raise HTTPException(status_code=404, detail="User not found")
-        user_id = user_row["user_id"]
+        user_id = get_user_id(cursor, submission.user_id)
 
         analysis_json = await create_hot_take_analysis(submission.content)
 
-        insert_sql = """
-            INSERT INTO hot_takes (user_id, content, truthfulness_score, ai_insight)
-            VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(
-            insert_sql,
-            (
-                user_id,
-                submission.content,
-                analysis_json["truthfulness_score"],
-                analysis_json["ai_insight"],
-            ),
-        )
+        take_id = insert_hot_take(cursor, user_id, submission.content, analysis_json)
         conn.commit()
-        take_id = cursor.lastrowid
 
         return {
             "message": "Hot take submitted successfully",
@@ -287,41 +338,21 @@ async def simulated_matchups(submission: MatchupSimulationSubmission):
 
     try:
         player_ids = list(submission.lineup1.values()) + list(submission.lineup2.values())
-        placeholders = ",".join(["%s"] * len(player_ids))
-
-        select_sql = f"""
-            SELECT
-                p.player_uid,
-                p.full_name,
-                nba.position,
-                nba.height,
-                nba.weight,
-                nba.years_pro,
-                nba.accolades,
-                ai.stars,
-                ai.rating,
-                ai.strengths,
-                ai.weaknesses,
-                ai.ai_analysis
-            FROM players AS p
-            INNER JOIN nba_player_info AS nba
-                ON p.player_uid = nba.player_uid
-            INNER JOIN ai_generated_nba_evaluations AS ai
-                ON p.player_uid = ai.player_uid
-            WHERE p.player_uid IN ({placeholders})
-        """
-        cursor.execute(select_sql, player_ids)
-        results = cursor.fetchall()
-
-        if not results:
-            raise HTTPException(status_code=404, detail="No players found for lineup")
+        results = fetch_lineup_players(cursor, player_ids)
 
         player_lookup = {str(row["player_uid"]): row for row in results}
 
         lineup1 = {slot: player_lookup.get(pid) for slot, pid in submission.lineup1.items()}
         lineup2 = {slot: player_lookup.get(pid) for slot, pid in submission.lineup2.items()}
 
-        analysis_json = await create_matchup_simulation_analysis(lineup1, lineup2)
+        analysis_json = await cached_analysis(
+            "matchup_simulation",
+            matchup_analysis.MODEL,
+            matchup_analysis.PROMPT_VERSION,
+            matchup_cache_inputs(submission.lineup1, submission.lineup2, results),
+            lambda: create_matchup_simulation_analysis(lineup1, lineup2),
+            bypass=submission.refresh,
+        )
         print(analysis_json)
         
         return {
@@ -337,3 +368,105 @@ async def simulated_matchups(submission: MatchupSimulationSubmission):
         cursor.close()
         conn.close()
 
+
+# -------------------------------
+# Streaming (SSE) variants
+# -------------------------------
+# Each stream sends `token` events as the model writes, a `field` event as each
+# top-level key of the JSON completes, then one `result` event with the same body
+# as the non-streaming endpoint once it has been persisted. DB lookups happen
+# before the stream opens so 404s stay normal HTTP errors, and no connection is
+# held while the model is generating.
+
+@router.post("/hot_take/stream")
+async def submit_hot_take_stream(submission: HotTakeSubmission):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        user_id = get_user_id(cursor, submission.user_id)
+    finally:
+        cursor.close()
+        conn.close()
+
+    def finalize(analysis_json: dict) -> dict:
+        take_id = persist(lambda cur: insert_hot_take(cur, user_id, submission.content, analysis_json))
+        return {
+            "message": "Hot take submitted successfully",
+            "take_id": take_id,
+            "hot_take_analysis": analysis_json,
+        }
+
+    return EventSourceResponse(stream_analysis_events(
+        hot_take_analysis.MODEL,
+        hot_take_analysis.hot_take_messages(submission.content),
+        hot_take_analysis.REQUIRED_KEYS,
+        finalize,
+    ))
+
+
+@router.post("/lineup-builder/submit-lineup/stream")
+async def get_lineup_analysis_stream(submission: LineupSubmission):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        user_id = get_user_id(cursor, submission.email)
+        results = fetch_lineup_players(cursor, list(submission.lineup.values()))
+    finally:
+        cursor.close()
+        conn.close()
+
+    inputs = lineup_cache_inputs(submission.mode, results)
+    cache_key = analysis_cache_key("nba_lineup", lineup_analysis.MODEL, lineup_analysis.PROMPT_VERSION, **inputs)
+    cached = None if submission.refresh else await asyncio.to_thread(get_cached_analysis, cache_key)
+
+    def finalize(analysis_json: dict) -> dict:
+        if analysis_json is not cached:
+            save_analysis(cache_key, "nba_lineup", lineup_analysis.MODEL, lineup_analysis.PROMPT_VERSION, analysis_json)
+        lineup_id = persist(lambda cur: insert_lineup(cur, user_id, submission.mode, submission.lineup, analysis_json))
+        return {
+            "message": "Lineup submitted successfully",
+            "lineup_id": lineup_id,
+            "scouting_report": analysis_json,
+            "players": results,
+        }
+
+    return EventSourceResponse(stream_analysis_events(
+        lineup_analysis.MODEL,
+        lineup_analysis.nba_lineup_messages(submission.mode, results),
+        lineup_analysis.REQUIRED_KEYS,
+        finalize,
+        cached=cached,
+    ))
+
+
+@router.post("/simulated-matchups/submit-matchup/stream")
+async def simulated_matchups_stream(submission: MatchupSimulationSubmission):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        player_ids = list(submission.lineup1.values()) + list(submission.lineup2.values())
+        results = fetch_lineup_players(cursor, player_ids)
+    finally:
+        cursor.close()
+        conn.close()
+
+    player_lookup = {str(row["player_uid"]): row for row in results}
+    lineup1 = {slot: player_lookup.get(pid) for slot, pid in submission.lineup1.items()}
+    lineup2 = {slot: player_lookup.get(pid) for slot, pid in submission.lineup2.items()}
+
+    inputs = matchup_cache_inputs(submission.lineup1, submission.lineup2, results)
+    cache_key = analysis_cache_key("matchup_simulation", matchup_analysis.MODEL, matchup_analysis.PROMPT_VERSION, **inputs)
+    cached = None if submission.refresh else await asyncio.to_thread(get_cached_analysis, cache_key)
+
+    def finalize(analysis_json: dict) -> dict:
+        if analysis_json is not cached:
+            save_analysis(cache_key, "matchup_simulation", matchup_analysis.MODEL, matchup_analysis.PROMPT_VERSION, analysis_json)
+        return {key: analysis_json[key] for key in matchup_analysis.REQUIRED_KEYS}
+
+    return EventSourceResponse(stream_analysis_events(
+        matchup_analysis.MODEL,
+        matchup_analysis.matchup_simulation_messages(lineup1, lineup2),
+        matchup_analysis.REQUIRED_KEYS,
+        finalize,
+        cached=cached,
+    ))
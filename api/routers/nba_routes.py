@@ -2,29 +2,25 @@ import json, os, random, traceback, math
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 
 from core.db import get_db_connection
+from core.workspace import WorkspaceFullError, workspace_manager
 from utils.nba_helpers import get_nba_youtube_videos, refresh_player_videos, fetch_nba_player_stats, handle_name
 from utils.helpers import parse_json_list
 from utils.nba_highlight_reels import generate_nba_highlights
-from utils.highlight_reel_helpers import make_final_reel, FINAL_DIR
+from utils.highlight_reel_helpers import cleanup_files, make_final_reel
+from utils.pipeline_profiler import profile_job
+from utils.reel_streaming import FIRST_SEGMENT_TIMEOUT, start_reel_stream, stream_status
 from scripts.insertion.nba.insert_missing_nba_player import insert_nba_player, create_nba_player_analysis
 
 router = APIRouter()
 
 CACHE_EXPIRY_HOURS = 6
 
-DOWNLOAD_DIR = "downloads"
-TEMP_CLIP_DIR = "highlights"
-FINAL_DIR = "final_reels"
-
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-os.makedirs(TEMP_CLIP_DIR, exist_ok=True)
-os.makedirs(FINAL_DIR, exist_ok=True)
-
 class PlayerSubmission(BaseModel):
     name: str
     basketball_reference_link: Optional[str] = None
@@ -350,7 +346,7 @@ def get_nba_player_reel(player_id: int):
         FROM players
         WHERE player_uid = %s;
     """
-    conn, cursor = None, None
+    conn, cursor, job = None, None, None
     
     try:
         conn = get_db_connection()
@@ -362,27 +358,87 @@ def get_nba_player_reel(player_id: int):
         full_name = row["full_name"]
 
         # --- generate highlights across multiple videos ---
-        try:
-            clips = generate_nba_highlights(full_name, max_videos=5, top_k_per_video=3)
-        except ValueError as e:
-            raise HTTPException(status_code=404, detail=str(e))
-
-        final_filename = f"{full_name.replace(' ', '_')}_{random.randint(1000,9999)}_highlight.mp4"
-        final_path = os.path.join(FINAL_DIR, final_filename)
-        make_final_reel(clips, output_path=final_path)
-
-        return FileResponse(final_path, filename=final_filename, media_type="video/mp4")
+        job = workspace_manager.create_job(f"reel_{player_id}")
+        with profile_job(job.job_id):
+            try:
+                clips = generate_nba_highlights(full_name, max_videos=5, top_k_per_video=3, job=job)
+            except ValueError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+
+            final_filename = f"{full_name.replace(' ', '_')}_{random.randint(1000,9999)}_highlight.mp4"
+            final_path = job.final_path(final_filename)
+            make_final_reel(clips, output_path=final_path, durations=[job.clip_durations.get(clip) for clip in clips])
+            cleanup_files(clips)
+
+        # The job is deleted once the response has been sent; if the client
+        # disconnects first it stays idle until evicted or cleaned at startup
+        job.finish()
+        response = FileResponse(final_path, filename=final_filename, media_type="video/mp4",
+                                background=BackgroundTask(job.release))
+        job = None
+        return response
 
     except HTTPException:
         raise
+    except WorkspaceFullError as e:
+        print("⚠️ Highlight reel rejected:", str(e))
+        raise HTTPException(status_code=503, detail="Highlight reel service is busy, try again shortly")
     except Exception as e:
         print("🔥 Highlight reel error:", str(e))
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="Internal server error generating highlight reel")
+    finally:
+        if job: job.release()
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+@router.get("/players/{player_id}/reel/stream")
+def stream_nba_player_reel(player_id: int):
+    """
+    Start rendering the reel as an HLS playlist and return its URL once the first
+    highlight is playable; later clips are appended while videos are still processed.
+    """
+    select_sql = """
+        SELECT full_name
+        FROM players
+        WHERE player_uid = %s;
+    """
+    conn, cursor = None, None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(select_sql, (player_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Player not found")
+        full_name = row["full_name"]
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+    job = None
+    try:
+        job = workspace_manager.create_job(f"stream_{player_id}")
+        writer = start_reel_stream(
+            job, lambda on_clip: generate_nba_highlights(full_name, max_videos=5, top_k_per_video=3, job=job, on_clip=on_clip)
+        )
+        writer.first_segment.wait(timeout=FIRST_SEGMENT_TIMEOUT)
+    except WorkspaceFullError as e:
+        print("⚠️ Highlight reel rejected:", str(e))
+        if job is not None: job.release()
+        raise HTTPException(status_code=503, detail="Highlight reel service is busy, try again shortly")
+    except Exception as e:
+        print("🔥 Highlight reel error:", str(e))
+        traceback.print_exc()
+        if job is not None: job.release()
+        raise HTTPException(status_code=500, detail="Internal server error generating highlight reel")
+
+    if writer.finished and writer.segment_count == 0:
+        job.release()
+        raise HTTPException(status_code=404, detail=writer.error or "No valid highlight clips found for this player.")
+
+    return stream_status(job, writer)
+
 @router.get("/players/submit-player", response_model=Dict)
 async def submit_nba_player(submission: PlayerSubmission):
     try:
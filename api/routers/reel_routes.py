@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from core.workspace import workspace_manager
+
+import os, re
+
+router = APIRouter()
+
+# Only playlist and segment names the HLS writer produces; no path separators
+REEL_FILE_RE = re.compile(r"^[\w-]+\.(m3u8|ts)$")
+
+MEDIA_TYPES = {
+    "m3u8": "application/vnd.apple.mpegurl",
+    "ts": "video/mp2t",
+}
+
+@router.get("/{job_id}/{filename}")
+def get_reel_file(job_id: str, filename: str):
+    """Serve the playlist and segments of a streamed highlight reel."""
+    m = REEL_FILE_RE.match(filename)
+    job = workspace_manager.get_job(job_id)
+    if not m or not job:
+        raise HTTPException(status_code=404, detail="Reel not found")
+
+    path = os.path.join(job.final_reels, filename)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Reel not found")
+    job.touch()
+
+    # The playlist grows while the reel is rendering; segments never change once listed
+    headers = {"Cache-Control": "no-cache"} if m.group(1) == "m3u8" else {"Cache-Control": "public, max-age=3600"}
+    return FileResponse(path, media_type=MEDIA_TYPES[m.group(1)], headers=headers)
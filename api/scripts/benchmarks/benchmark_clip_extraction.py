@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+from utils.highlight_reel_helpers import (
+    REEL_FPS, REEL_VF, get_duration, get_keyframe_times, is_reel_normalized,
+    nearest_keyframe, probe_video, save_highlight_clips,
+)
+
+# Usage (from api/): python -m scripts.benchmarks.benchmark_clip_extraction source.mp4 --segments 4
+
+
+def _ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-y", "-v", "error", *args], check=True, capture_output=True, text=True)
+
+
+def legacy_extract(video_path, segments, output_dir):
+    """Previous path: libx264 'fast' cut, then a second encode into the reel format (_prep.mp4)."""
+    outputs = []
+    for i, seg in enumerate(segments):
+        clip = os.path.join(output_dir, f"legacy_clip_{i+1}.mp4")
+        _ffmpeg("-ss", str(seg["start"]), "-t", str(seg["end"] - seg["start"]), "-i", video_path,
+                "-c:v", "libx264", "-preset", "fast", "-crf", "23", "-c:a", "aac", "-b:a", "128k", clip)
+        prep = clip.replace(".mp4", "_prep.mp4")
+        _ffmpeg("-i", clip, "-vf", REEL_VF, "-r", str(REEL_FPS), "-c:v", "libx264", "-preset", "fast",
+                "-crf", "23", "-c:a", "aac", "-b:a", "192k", "-ac", "2", prep)
+        outputs.append(prep)
+    return outputs
+
+
+def current_extract(video_path, segments, output_dir):
+    """New path: keyframe-snapped stream copy or a single normalized encode, prep only when still needed."""
+    outputs = []
+    clips, _ = save_highlight_clips(video_path, segments, output_dir=output_dir)
+    for clip in clips:
+        if is_reel_normalized(probe_video(clip)):
+            outputs.append(clip)
+            continue
+        prep = clip.replace(".mp4", "_prep.mp4")
+        _ffmpeg("-i", clip, "-vf", REEL_VF, "-r", str(REEL_FPS), "-c:v", "libx264", "-preset", "fast",
+                "-crf", "23", "-c:a", "aac", "-b:a", "192k", "-ac", "2", prep)
+        outputs.append(prep)
+    return outputs
+
+
+def ssim_against_reference(video_path, seg, clip):
+    """SSIM of a reel-format clip against a near-lossless reel-format encode of the same source range."""
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = os.path.join(tmp, "reference.mp4")
+        _ffmpeg("-ss", str(seg["start"]), "-t", str(seg["end"] - seg["start"]), "-i", video_path,
+                "-vf", REEL_VF, "-r", str(REEL_FPS), "-c:v", "libx264", "-preset", "veryfast", "-crf", "4", "-an", reference)
+        result = subprocess.run(
+            ["ffmpeg", "-i", clip, "-i", reference, "-lavfi", f"[0:v]{REEL_VF},fps={REEL_FPS}[a];[a][1:v]ssim", "-f", "null", "-"],
+            capture_output=True, text=True
+        )
+    m = re.search(r"All:([\d.]+)", result.stderr)
+    return float(m.group(1)) if m else None
+
+
+def evenly_spaced_segments(video_path, count, length=8.0):
+    duration = get_duration(video_path)
+    step = duration / (count + 1)
+    return [
+        {"start": round(step * (i + 1), 3), "end": round(min(duration, step * (i + 1) + length), 3)}
+        for i in range(count)
+    ]
+
+
+def snapped_segments(video_path, segments, tolerance=0.5):
+    """The source ranges save_highlight_clips actually copies, so SSIM references line up."""
+    keyframes = get_keyframe_times(video_path)
+    snapped = []
+    for seg in segments:
+        keyframe = nearest_keyframe(keyframes, seg["start"], tolerance)
+        snapped.append({"start": keyframe, "end": seg["end"]} if keyframe is not None else seg)
+    return snapped
+
+
+def run_path(name, extractor, video_path, segments, reference_segments=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        outputs = extractor(video_path, segments, tmp)
+        seconds = time.perf_counter() - started
+        ssims = [
+            ssim_against_reference(video_path, seg, clip)
+            for seg, clip in zip(reference_segments or segments, outputs)
+        ]
+    ssims = [s for s in ssims if s is not None]
+    return {
+        "path": name,
+        "seconds": seconds,
+        "clips": len(outputs),
+        "mean_ssim": sum(ssims) / len(ssims) if ssims else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy double-encode clip extraction with the stream-copy path.")
+    parser.add_argument("video", help="Local source video")
+    parser.add_argument("--segments", type=int, default=4, help="Number of evenly spaced segments to cut")
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    segments = evenly_spaced_segments(args.video, args.segments)
+    results = [
+        run_path("legacy", legacy_extract, args.video, segments),
+        run_path("current", current_extract, args.video, segments, snapped_segments(args.video, segments)),
+    ]
+    for r in results:
+        ssim = f"{r['mean_ssim']:.4f}" if r["mean_ssim"] is not None else "n/a"
+        print(f"📊 {r['path']}: {r['seconds']:.2f}s for {r['clips']} clips, mean SSIM {ssim}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"video": args.video, "segments": segments, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import json
+import time
+
+from utils.highlight_reel_helpers import analyze_video, select_highlight_segments
+from utils.highlight_scoring import temporal_iou
+
+# Usage (from api/): python -m scripts.benchmarks.benchmark_highlight_selection clip1.mp4 --modes local hybrid llm
+
+MODES = ("local", "hybrid", "llm")
+
+
+def agreement(selected, reference, min_iou=0.5):
+    """Fraction of `reference` segments matched by a `selected` segment with IoU >= min_iou."""
+    if not reference:
+        return None
+    return sum(1 for r in reference if any(temporal_iou(r, s) >= min_iou for s in selected)) / len(reference)
+
+
+def benchmark(video_path, modes, top_k):
+    analysis = analyze_video(video_path)
+    candidates = analysis["candidates"] or []
+
+    selections = {}
+    results = {"video": video_path, "candidates": len(candidates), "modes": {}}
+    for mode in modes:
+        started = time.perf_counter()
+        selections[mode] = select_highlight_segments(candidates, top_k=top_k, mode=mode)
+        results["modes"][mode] = {
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "segments": selections[mode],
+        }
+
+    if "llm" in selections:
+        for mode in modes:
+            if mode != "llm":
+                results["modes"][mode]["agreement_with_llm"] = agreement(selections[mode], selections["llm"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare local, hybrid and LLM highlight selection latency.")
+    parser.add_argument("videos", nargs="+", help="Local sample videos")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    results = []
+    for video_path in args.videos:
+        result = benchmark(video_path, args.modes, args.top_k)
+        results.append(result)
+        for mode, r in result["modes"].items():
+            match = r.get("agreement_with_llm")
+            match_text = f", {match:.0%} of LLM picks" if match is not None else ""
+            print(f"📊 {video_path} [{mode}]: {r['latency_ms']:.1f}ms for {result['candidates']} candidates{match_text}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import re
+import time
+
+from utils.llm_json import loads_llm_json
+
+# Usage (from api/):
+#   python -m scripts.benchmarks.benchmark_llm_json
+#   python -m scripts.benchmarks.benchmark_llm_json --corpus failures.jsonl --repeat 2000
+# Extra corpora can be collected in production with LLM_JSON_FAILURE_LOG; entries
+# without a "parsed" value only count whether a parser produced anything.
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "llm_json_corpus.jsonl")
+
+
+# -------------------------------
+# Baselines: the parsers llm_json replaced
+# -------------------------------
+def _legacy_extract_first_json_object(text):
+    fenced_code = re.search(r"```json\s*([\s\S]*?)```", text)
+    if fenced_code:
+        text = fenced_code.group(1).strip()
+    else:
+        fenced_code = re.search(r"```([\s\S]*?)```", text)
+        if fenced_code:
+            text = fenced_code.group(1).strip()
+
+    start = text.find('{')
+    if start == -1:
+        return text
+    brace_count = 0
+    for i, ch in enumerate(text[start:], start=start):
+        if ch == '{':
+            brace_count += 1
+        elif ch == '}':
+            brace_count -= 1
+            if brace_count == 0:
+                return text[start:i+1]
+    return text[start:]
+
+
+def _legacy_fix_ai_analysis_quotes(text):
+    key = '"aiAnalysis":'
+    idx = text.find(key)
+    if idx == -1:
+        return text
+    start_quote = text.find('"', idx + len(key))
+    if start_quote == -1:
+        return text
+    result = []
+    i = start_quote + 1
+    while i < len(text):
+        ch = text[i]
+        if ch == '"' and text[i-1] != '\\':
+            j = i + 1
+            while j < len(text) and text[j] in " \n\r\t":
+                j += 1
+            if j < len(text) and text[j] in ",}":
+                break
+            result.append('\\"')
+            i += 1
+            continue
+        result.append(ch)
+        i += 1
+    return text[:start_quote+1] + ''.join(result) + text[i:]
+
+
+def legacy_report_parser(text, expect):
+    """ai_generation_helpers.parse_json_report before llm_json (objects only)."""
+    cleaned = _legacy_extract_first_json_object(text)
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        return json.loads(_legacy_fix_ai_analysis_quotes(cleaned))
+
+
+def fence_strip_parser(text, expect):
+    """The hot take / lineup / matchup modules' ad-hoc fence stripping."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.lower().startswith("json"):
+            text = text[4:].strip()
+    return json.loads(text)
+
+
+def regex_array_parser(text, expect):
+    """The highlight modules' greedy [...] regex."""
+    m = re.search(r"\[.*\]", text, flags=re.S)
+    if not m:
+        raise ValueError("no array")
+    return json.loads(m.group(0))
+
+
+PARSERS = {
+    "llm_json": lambda text, expect: loads_llm_json(text, expect),
+    "legacy_report": legacy_report_parser,
+    "fence_strip": fence_strip_parser,
+    "regex_array": regex_array_parser,
+}
+
+
+def load_corpus(paths):
+    cases = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f):
+                if line.strip():
+                    case = json.loads(line)
+                    case.setdefault("name", f"{os.path.basename(path)}:{n}")
+                    case.setdefault("expect", "object")
+                    cases.append(case)
+    return cases
+
+
+def run_parser(parse, case):
+    try:
+        return True, parse(case["text"], case["expect"])
+    except Exception:
+        return False, None
+
+
+def benchmark(cases, parsers, repeat):
+    results = {}
+    for name in parsers:
+        parse = PARSERS[name]
+        correct, parsed_any, failures = 0, 0, []
+        for case in cases:
+            ok, value = run_parser(parse, case)
+            parsed_any += ok
+            if "parsed" in case:
+                # A parser is right when it matches the expected value, or fails where no value is expected
+                if (case["parsed"] is None and not ok) or (ok and value == case["parsed"]):
+                    correct += 1
+                else:
+                    failures.append(case["name"])
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for case in cases:
+                run_parser(parse, case)
+        seconds = time.perf_counter() - started
+
+        results[name] = {
+            "correct": correct,
+            "parsed": parsed_any,
+            "cases": len(cases),
+            "us_per_parse": seconds / (repeat * len(cases)) * 1e6,
+            "wrong": failures,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correctness and speed of LLM JSON parsers on a corpus of replies.")
+    parser.add_argument("--corpus", nargs="+", default=[DEFAULT_CORPUS], help="JSONL files of {text, expect, parsed}")
+    parser.add_argument("--parsers", nargs="+", choices=list(PARSERS), default=list(PARSERS))
+    parser.add_argument("--repeat", type=int, default=500, help="Timing passes over the corpus")
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    cases = load_corpus(args.corpus)
+    results = benchmark(cases, args.parsers, args.repeat)
+    for name, r in results.items():
+        wrong = f" (wrong: {', '.join(r['wrong'])})" if r["wrong"] else ""
+        print(f"📊 {name}: {r['correct']}/{r['cases']} correct, {r['parsed']} parsed, "
+              f"{r['us_per_parse']:.1f}µs/parse{wrong}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
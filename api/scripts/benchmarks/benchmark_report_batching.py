@@ -0,0 +1,57 @@
+import argparse
+import json
+
+from utils.ai_generation_helpers import fetch_players
+from utils.ai_prompts import SYSTEM_PROMPT, nba_player_content
+from utils.ai_report_engine import ReportEngine
+
+# Usage (from api/): python -m scripts.benchmarks.benchmark_report_batching --players 40 --sizes 1 5 10
+# Calls the real model (GEMINI_API_KEY) but never writes reports.
+
+sample_sql = """
+SELECT players.*, nba.* FROM players
+INNER JOIN nba_player_info AS nba ON players.player_uid=nba.player_uid
+WHERE current_level="NBA"
+ORDER BY players.player_uid
+LIMIT %d;
+"""
+
+
+def build_content(player):
+    return nba_player_content(player['full_name'], player)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-player and batched scouting report generation.")
+    parser.add_argument("--players", type=int, default=40, help="NBA players to generate reports for in each mode")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 5, 10], help="Players per request to try")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    players = fetch_players(sample_sql % args.players)
+    print(f"Benchmarking {len(players)} players")
+
+    results = {}
+    for size in args.sizes:
+        engine = ReportEngine(
+            f"benchmark_reports_{size}", "", SYSTEM_PROMPT, build_content,
+            model=args.model, players_per_request=size,
+        )
+        results[size] = engine.run(players, retry_failed=True, dry_run=True)
+
+    baseline = results.get(1)
+    for size, r in results.items():
+        speedup = f", {r['players_per_minute'] / baseline['players_per_minute']:.1f}x per-player throughput" \
+            if baseline and baseline["players_per_minute"] and size != 1 else ""
+        print(f"📊 {size} per request: {r['players_per_minute']:.1f} players/min, "
+              f"{r['prompt_tokens_per_report']:.0f} prompt + {r['completion_tokens_per_report']:.0f} completion "
+              f"tokens/report, {r['fallbacks']} fallbacks{speedup}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
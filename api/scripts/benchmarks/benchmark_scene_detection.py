@@ -0,0 +1,108 @@
+import argparse
+import json
+import resource
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.highlight_reel_helpers import cleanup_files, detect_scenes, get_video_fps, make_analysis_proxy
+
+# Usage (from api/): python -m scripts.benchmarks.benchmark_scene_detection clip1.mp4 clip2.mp4
+
+
+def legacy_detect_scenes(video_path, threshold=30.0):
+    """The previous full-resolution path: ContentDetector with an in-memory StatsManager."""
+    from scenedetect import open_video, SceneManager
+    from scenedetect.detectors import ContentDetector
+    from scenedetect.stats_manager import StatsManager
+
+    video = open_video(video_path)
+    scene_manager = SceneManager(stats_manager=StatsManager())
+    scene_manager.add_detector(ContentDetector(threshold=threshold))
+    scene_manager.detect_scenes(video=video)
+    return [(start.get_seconds(), end.get_seconds()) for start, end in scene_manager.get_scene_list()[:75]]
+
+
+def _run_full_res(video_path):
+    started = time.perf_counter()
+    scenes = legacy_detect_scenes(video_path)
+    return {
+        "seconds": time.perf_counter() - started,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "scenes": scenes,
+    }
+
+
+def _run_proxy(video_path):
+    started = time.perf_counter()
+    proxy_path = make_analysis_proxy(video_path)
+    proxy_seconds = time.perf_counter() - started
+    try:
+        scenes = detect_scenes(proxy_path or video_path, source_fps=get_video_fps(video_path))
+    finally:
+        if proxy_path:
+            cleanup_files([proxy_path])
+    return {
+        "seconds": time.perf_counter() - started,
+        "proxy_seconds": proxy_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "scenes": scenes,
+    }
+
+
+def boundary_agreement(reference, candidate, tolerance=0.25):
+    """Precision/recall of scene cut times in `candidate` against `reference`, within `tolerance` seconds."""
+    ref_cuts = [start for start, _ in reference[1:]]
+    cand_cuts = [start for start, _ in candidate[1:]]
+    if not ref_cuts and not cand_cuts:
+        return {"precision": 1.0, "recall": 1.0}
+
+    def matched(cuts, others):
+        return sum(1 for c in cuts if any(abs(c - o) <= tolerance for o in others))
+
+    return {
+        "precision": matched(cand_cuts, ref_cuts) / len(cand_cuts) if cand_cuts else 0.0,
+        "recall": matched(ref_cuts, cand_cuts) / len(ref_cuts) if ref_cuts else 0.0,
+    }
+
+
+def benchmark(video_path, tolerance=0.25):
+    # Each mode runs in a fresh process so peak RSS isn't shared between them
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        full_res = pool.submit(_run_full_res, video_path).result()
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        proxy = pool.submit(_run_proxy, video_path).result()
+
+    return {
+        "video": video_path,
+        "full_res": {k: v for k, v in full_res.items() if k != "scenes"} | {"scene_count": len(full_res["scenes"])},
+        "proxy": {k: v for k, v in proxy.items() if k != "scenes"} | {"scene_count": len(proxy["scenes"])},
+        "speedup": full_res["seconds"] / proxy["seconds"] if proxy["seconds"] else None,
+        "agreement": boundary_agreement(full_res["scenes"], proxy["scenes"], tolerance),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-resolution vs proxy scene detection.")
+    parser.add_argument("videos", nargs="+", help="Local sample clips")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Boundary match tolerance in seconds")
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    results = []
+    for video_path in args.videos:
+        result = benchmark(video_path, args.tolerance)
+        results.append(result)
+        print(
+            f"📊 {video_path}: full-res {result['full_res']['seconds']:.2f}s / {result['full_res']['peak_rss_mb']:.0f}MB, "
+            f"proxy {result['proxy']['seconds']:.2f}s / {result['proxy']['peak_rss_mb']:.0f}MB, "
+            f"precision {result['agreement']['precision']:.2f}, recall {result['agreement']['recall']:.2f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
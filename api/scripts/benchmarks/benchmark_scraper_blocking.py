@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import json
+import time
+
+from utils.helpers import launch_browser, new_page
+
+# Usage (from api/): python -m scripts.benchmarks.benchmark_scraper_blocking
+#   python -m scripts.benchmarks.benchmark_scraper_blocking --urls https://247sports.com/season/2025-basketball/recruitrankings/
+# Loads each URL with the resource policy off and on and reports bytes transferred
+# and page-load times. Keep --repeat low: the sports-reference sites allow 20 requests/min.
+
+DEFAULT_URLS = [
+    "https://www.basketball-reference.com/players/j/jamesle01.html",
+    "https://www.sports-reference.com/cbb/players/zion-williamson-1.html",
+    "https://247sports.com/season/2025-basketball/recruitrankings/",
+]
+
+
+async def measure(browser, url, block_resources):
+    page = await new_page(browser, block_resources=block_resources)
+    sizes = []
+    aborted = 0
+
+    def on_finished(request):
+        sizes.append(asyncio.ensure_future(request.sizes()))
+
+    def on_failed(request):
+        nonlocal aborted
+        aborted += 1
+
+    page.on("requestfinished", on_finished)
+    page.on("requestfailed", on_failed)
+
+    try:
+        started = time.perf_counter()
+        await page.goto(url, wait_until="domcontentloaded", timeout=120000)
+        dom_seconds = time.perf_counter() - started
+        await page.wait_for_load_state("load", timeout=120000)
+        load_seconds = time.perf_counter() - started
+
+        transferred = 0
+        for result in await asyncio.gather(*sizes, return_exceptions=True):
+            if isinstance(result, dict):
+                transferred += max(0, result["responseBodySize"]) + max(0, result["responseHeadersSize"])
+
+        return {
+            "requests": len(sizes),
+            "aborted": aborted,
+            "kb": transferred / 1024,
+            "dom_seconds": dom_seconds,
+            "load_seconds": load_seconds,
+        }
+    finally:
+        await page.context.close()
+
+
+async def run(urls, repeat):
+    playwright, browser = await launch_browser(headless=True)
+    results = {}
+    try:
+        for url in urls:
+            results[url] = {}
+            for label, block in (("before", False), ("after", True)):
+                runs = [await measure(browser, url, block) for _ in range(repeat)]
+                results[url][label] = {key: sum(r[key] for r in runs) / len(runs) for key in runs[0]}
+    finally:
+        await browser.close()
+        await playwright.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandwidth and load time of scraper pages with and without resource blocking.")
+    parser.add_argument("--urls", nargs="+", default=DEFAULT_URLS)
+    parser.add_argument("--repeat", type=int, default=1, help="Loads per URL and mode")
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.urls, args.repeat))
+    for url, modes in results.items():
+        before, after = modes["before"], modes["after"]
+        saved = 100 * (1 - after["kb"] / before["kb"]) if before["kb"] else 0
+        print(f"📊 {url}")
+        for label, r in modes.items():
+            print(f"   {label}: {r['kb']:.0f} KB over {r['requests']:.0f} requests ({r['aborted']:.0f} aborted), "
+                  f"DOM {r['dom_seconds']:.2f}s, load {r['load_seconds']:.2f}s")
+        print(f"   {saved:.0f}% less transferred")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
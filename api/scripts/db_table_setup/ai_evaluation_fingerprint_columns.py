@@ -0,0 +1,30 @@
+from core.db import get_db_connection
+
+# Adds input_fingerprint / prompt_version to AI evaluation tables created before they existed.
+# Usage (from api/): python -m scripts.db_table_setup.ai_evaluation_fingerprint_columns
+
+TABLES = ("ai_generated_nba_evaluations", "ai_generated_high_school_evaluations")
+
+COLUMNS = {
+    "input_fingerprint": "CHAR(32) DEFAULT NULL",
+    "prompt_version": "INT DEFAULT NULL",
+}
+
+cnx = get_db_connection()
+cursor = cnx.cursor()
+
+for table in TABLES:
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    for column, definition in COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            print(f"Added {table}.{column}")
+
+cnx.commit()
+print("AI evaluation fingerprint columns are up to date!")
+cursor.close()
+cnx.close()
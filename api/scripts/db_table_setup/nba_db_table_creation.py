@@ -112,6 +112,8 @@ CREATE TABLE IF NOT EXISTS ai_generated_nba_evaluations (
     strengths JSON NOT NULL,
     weaknesses JSON NOT NULL,
     ai_analysis MEDIUMTEXT NOT NULL,
+    input_fingerprint CHAR(32) DEFAULT NULL,  -- hash of the prompt inputs the report was generated from
+    prompt_version INT DEFAULT NULL,
     CONSTRAINT uq_player_uid UNIQUE (player_uid),
     CONSTRAINT fk_ai_player_uid FOREIGN KEY (player_uid) REFERENCES players(player_uid)
         ON DELETE CASCADE
@@ -1,142 +1,132 @@
-import time
+import argparse
 import json
-import concurrent.futures
 
-from datetime import datetime
+from collections import defaultdict
 from core.db import get_db_connection
-from core.config import set_gemini_key
-from utils.ai_prompts import SYSTEM_PROMPT, user_content
-from utils.ai_generation_helpers import fetch_players, parse_json_report, insert_report
+from utils.ai_prompts import SCOUTING_REPORT_PROMPT_VERSION, SYSTEM_PROMPT, user_content
+from utils.ai_generation_helpers import fetch_players
+from utils.ai_report_engine import REPORT_PLAYERS_PER_REQUEST, ReportEngine
 
-client = set_gemini_key()
+# Usage (from api/):
+#   python -m scripts.insertion.ai_generation.insert_ai_generated_hs_reports            # prospects without a report
+#   python -m scripts.insertion.ai_generation.insert_ai_generated_hs_reports --refresh  # also reports whose inputs changed
 
-select_sql = """
-SELECT p.player_uid, p.full_name, hspr.class_year, hspr.school_name FROM players AS p
+# Each prospect's highest-priority ranking row (school, class) plus a hash of every
+# ranking the prompt includes (looked up by name, like select_sql_all_rankings)
+inputs_join_sql = """
 INNER JOIN high_school_player_rankings AS hspr ON hspr.player_uid = p.player_uid
+    AND hspr.source = (
+        SELECT source
+        FROM high_school_player_rankings h2
+        WHERE h2.player_uid = p.player_uid
+        ORDER BY FIELD(h2.source, '247sports', 'espn', 'rivals')  -- priority order
+        LIMIT 1
+    )
+LEFT JOIN (
+    SELECT p2.full_name,
+        MD5(GROUP_CONCAT(
+            CONCAT_WS('|', r.source, r.player_rank, r.player_grade, r.stars)
+            ORDER BY r.source, r.player_rank SEPARATOR ';'
+        )) AS rankings_hash
+    FROM high_school_player_rankings AS r
+    INNER JOIN players AS p2 ON r.player_uid = p2.player_uid
+    WHERE p2.class_year IS NOT NULL
+    GROUP BY p2.full_name
+) AS rh ON rh.full_name = p.full_name
+"""
+
+fingerprint_sql = "MD5(CONCAT_WS('|', rh.rankings_hash, hspr.school_name, hspr.class_year))"
+
+# Prospects needing a report (anti-join) with the fields the prompt needs
+select_sql = f"""
+SELECT p.player_uid, p.full_name, hspr.class_year, hspr.school_name, {fingerprint_sql} AS input_fingerprint
+FROM players AS p
+{inputs_join_sql}
+LEFT JOIN ai_generated_high_school_evaluations AS ai ON ai.player_uid = p.player_uid
 WHERE p.class_year IS NOT NULL
-AND hspr.source = (
-    SELECT source
-    FROM high_school_player_rankings h2
-    WHERE h2.player_uid = p.player_uid
-    ORDER BY FIELD(h2.source, '247sports', 'espn', 'rivals')  -- priority order
-    LIMIT 1
-);
+AND ({{condition}});
 """
 
-select_sql_per_player = """
+missing_condition = "ai.player_uid IS NULL"
+stale_condition = f"""ai.player_uid IS NULL
+    OR ai.input_fingerprint IS NULL OR ai.input_fingerprint <> {fingerprint_sql}
+    OR ai.prompt_version IS NULL OR ai.prompt_version <> {SCOUTING_REPORT_PROMPT_VERSION}"""
+
+# Stamp reports written before fingerprints existed with their current inputs, without regenerating them
+backfill_sql = f"""
+UPDATE ai_generated_high_school_evaluations AS ai
+INNER JOIN players AS p ON p.player_uid = ai.player_uid
+{inputs_join_sql}
+SET ai.input_fingerprint = {fingerprint_sql}, ai.prompt_version = %s
+WHERE ai.input_fingerprint IS NULL;
+"""
+
+# Every prospect's rankings in one query, grouped by name in Python
+select_sql_all_rankings = """
 SELECT p.full_name, hspr.player_rank, hspr.player_grade, hspr.stars, hspr.source
 FROM high_school_player_rankings AS hspr
 INNER JOIN players AS p ON hspr.player_uid = p.player_uid
-WHERE p.full_name = %s AND p.class_year IS NOT NULL;
+WHERE p.class_year IS NOT NULL;
 """
 
 insert_sql = """
 INSERT INTO ai_generated_high_school_evaluations
-    (player_uid, stars, rating, strengths, weaknesses, ai_analysis)
-VALUES (%s, %s, %s, %s, %s, %s)
+    (player_uid, stars, rating, strengths, weaknesses, ai_analysis, input_fingerprint, prompt_version)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
 ON DUPLICATE KEY UPDATE
     stars = VALUES(stars),
     rating = VALUES(rating),
     strengths = VALUES(strengths),
     weaknesses = VALUES(weaknesses),
-    ai_analysis = VALUES(ai_analysis);
+    ai_analysis = VALUES(ai_analysis),
+    input_fingerprint = VALUES(input_fingerprint),
+    prompt_version = VALUES(prompt_version);
 """
 
-def fetch_player_rankings(player_name):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(select_sql_per_player, (player_name,))
-    rankings = cursor.fetchall()
-    cursor.close()
-    conn.close()
+def fetch_all_player_rankings():
+    rankings = defaultdict(list)
+    for row in fetch_players(select_sql_all_rankings):
+        rankings[row['full_name']].append(row)
     return rankings
-        
-def get_scouting_report_with_retry(player_name, class_year, high_school, ranking_info, retries=3):
-    ranking_info_json = json.dumps(ranking_info, indent=2)
-    
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_content(ranking_info_json, player_name, high_school, class_year)}
-    ]
-
-    for attempt in range(retries):
-        try:
-            response = client.chat.completions.create(
-                model="gemini-2.5-flash",
-                messages=messages,
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            err_str = str(e).lower()
-            if ("rate limit" in err_str or "429" in err_str) and attempt < retries - 1:
-                wait = 2 ** attempt
-                print(f"Rate limited. Retrying {player_name} in {wait}s...")
-                time.sleep(wait)
-            else:
-                raise
-
-def ai_report_exists(player_uid, class_year):
+
+def backfill_fingerprints():
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM ai_generated_high_school_evaluations WHERE player_uid = %s LIMIT 1", (player_uid,))
-    exists = cursor.fetchone() is not None
+    cursor.execute(backfill_sql, (SCOUTING_REPORT_PROMPT_VERSION,))
+    conn.commit()
+    print(f"Stamped fingerprints on {cursor.rowcount} existing prospect reports")
     cursor.close()
     conn.close()
-    
-    if (exists and int(class_year) <= datetime.now().year):
-        return True
-    
-    return exists
-
-def safe_process_player(player):
-    player_uid = player['player_uid']
-    class_year = player['class_year']
-    high_school = player['school_name']
-    player_name = player['full_name']
-
-    # Skip if AI report already exists for this player
-    if ai_report_exists(player_uid, class_year):
-        print(f"Skipping {player_name}, AI report already exists.")
-        return player_name, True
-
-    # Fetch the player's ranking info for context
-    ranking_info = fetch_player_rankings(player_name)
-
-    try:
-        raw = get_scouting_report_with_retry(player_name, class_year, high_school, ranking_info)
-
-        parsed = parse_json_report(raw)
-        if not parsed:
-            print(f"Failed to parse JSON for {player_name}")
-            return player_name, False
-
-        insert_report(
-            player_uid=player_uid,
-            stars=parsed.get('stars', None),
-            rating=parsed.get('rating', None),
-            strengths=parsed.get('strengths', []),
-            weaknesses=parsed.get('weaknesses', []),
-            ai_analysis=parsed.get('aiAnalysis', ''),
-            insert_sql=insert_sql
-        )
-        print(f"Inserted report for {player_name}")
-        return player_name, True
-    except Exception as e:
-        print(f"Error processing {player_name}: {e}")
-        return player_name, False
-
-def main():
-    players = fetch_players(select_sql)
-    print(f"Fetched {len(players)} players from DB")
-
-    MAX_WORKERS = 5
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [executor.submit(safe_process_player, player) for player in players]
-
-        for future in concurrent.futures.as_completed(futures):
-            player_name, success = future.result()
-            if not success:
-                print(f"Failed for player: {player_name}")
+
+def main(retry_failed=False, players_per_request=None, refresh=False):
+    condition = stale_condition if refresh else missing_condition
+    players = fetch_players(select_sql.format(condition=condition))
+    print(f"Fetched {len(players)} prospects {'with missing or stale' if refresh else 'without'} reports from DB")
+    if not players:
+        return
+
+    rankings = fetch_all_player_rankings()
+
+    def build_content(player):
+        ranking_info_json = json.dumps(rankings.get(player['full_name'], []), indent=2)
+        return user_content(ranking_info_json, player['full_name'], player['school_name'], player['class_year'])
+
+    engine = ReportEngine(
+        "hs_reports_refresh" if refresh else "hs_reports", insert_sql, SYSTEM_PROMPT, build_content,
+        players_per_request=players_per_request or REPORT_PLAYERS_PER_REQUEST,
+        prompt_version=SCOUTING_REPORT_PROMPT_VERSION,
+    )
+    engine.run(players, retry_failed=retry_failed)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate AI scouting reports for high school prospects.")
+    parser.add_argument("--refresh", action="store_true", help="Also regenerate reports whose inputs or prompt version changed")
+    parser.add_argument("--backfill", action="store_true", help="Only stamp current fingerprints on reports that have none")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry prospects that failed in a previous run")
+    parser.add_argument("--players-per-request", type=int, help="Players packed into one LLM request")
+    args = parser.parse_args()
+
+    if args.backfill:
+        backfill_fingerprints()
+    else:
+        main(retry_failed=args.retry_failed, players_per_request=args.players_per_request, refresh=args.refresh)
@@ -1,101 +1,87 @@
-import time
-import concurrent.futures
-
-from core.config import set_gemini_key
-from utils.ai_prompts import SYSTEM_PROMPT, nba_player_content
-from utils.ai_generation_helpers import fetch_players, fetch_nba_player_info, nba_ai_report_exists, parse_json_report, insert_report
-
-client = set_gemini_key()
-
-select_sql = """
-SELECT * FROM players INNER JOIN nba_player_info AS nba ON players.player_uid=nba.player_uid WHERE current_level="NBA";
+import argparse
+
+from core.db import get_db_connection
+from utils.ai_prompts import SCOUTING_REPORT_PROMPT_VERSION, SYSTEM_PROMPT, nba_player_content
+from utils.ai_generation_helpers import fetch_players
+from utils.ai_report_engine import REPORT_PLAYERS_PER_REQUEST, ReportEngine
+
+# Usage (from api/):
+#   python -m scripts.insertion.ai_generation.insert_ai_generated_nba_reports            # players without a report
+#   python -m scripts.insertion.ai_generation.insert_ai_generated_nba_reports --refresh  # also reports whose inputs changed
+
+# Fingerprint of everything the prompt depends on: data_hash covers the scraped
+# bio, teams and accolades; is_active is excluded from it but changes the prompt
+fingerprint_sql = "MD5(CONCAT_WS('|', nba.data_hash, nba.is_active))"
+
+# NBA players needing a report, with everything the prompt needs (one anti-join, no per-player queries)
+select_sql = f"""
+SELECT players.*, nba.*, {fingerprint_sql} AS input_fingerprint FROM players
+INNER JOIN nba_player_info AS nba ON players.player_uid=nba.player_uid
+LEFT JOIN ai_generated_nba_evaluations AS ai ON ai.player_uid=players.player_uid
+WHERE current_level="NBA" AND ({{condition}});
 """
 
-select_sql_per_player = """
-SELECT * FROM players INNER JOIN nba_player_info AS nba ON players.player_uid=nba.player_uid WHERE current_level="NBA" AND players.player_uid=%s
+missing_condition = "ai.player_uid IS NULL"
+stale_condition = f"""ai.player_uid IS NULL
+    OR ai.input_fingerprint IS NULL OR ai.input_fingerprint <> {fingerprint_sql}
+    OR ai.prompt_version IS NULL OR ai.prompt_version <> {SCOUTING_REPORT_PROMPT_VERSION}"""
+
+# Stamp reports written before fingerprints existed with their current inputs, without regenerating them
+backfill_sql = f"""
+UPDATE ai_generated_nba_evaluations AS ai
+INNER JOIN nba_player_info AS nba ON nba.player_uid = ai.player_uid
+SET ai.input_fingerprint = {fingerprint_sql}, ai.prompt_version = %s
+WHERE ai.input_fingerprint IS NULL;
 """
 
 insert_sql = """
 INSERT INTO ai_generated_nba_evaluations
-    (player_uid, stars, rating, strengths, weaknesses, ai_analysis)
-VALUES (%s, %s, %s, %s, %s, %s)
+    (player_uid, stars, rating, strengths, weaknesses, ai_analysis, input_fingerprint, prompt_version)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
 ON DUPLICATE KEY UPDATE
     stars = VALUES(stars),
     rating = VALUES(rating),
     strengths = VALUES(strengths),
     weaknesses = VALUES(weaknesses),
-    ai_analysis = VALUES(ai_analysis);
+    ai_analysis = VALUES(ai_analysis),
+    input_fingerprint = VALUES(input_fingerprint),
+    prompt_version = VALUES(prompt_version);
 """
 
-def get_scouting_report_with_retry(player_uid, player_name, retries=3):
-    player_info = fetch_nba_player_info(select_sql_per_player, player_uid)
-    
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": nba_player_content(player_name, player_info)}
-    ]
-
-    for attempt in range(retries):
-        try:
-            response = client.chat.completions.create(
-                model="gemini-2.5-flash",
-                messages=messages,
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            err_str = str(e).lower()
-            if ("rate limit" in err_str or "429" in err_str) and attempt < retries - 1:
-                wait = 2 ** attempt
-                print(f"Rate limited. Retrying {player_name} in {wait}s...")
-                time.sleep(wait)
-            else:
-                raise
-
-def safe_process_player(player):
-    player_uid = player['player_uid']
-    player_name = player['full_name']
-    is_active = player['is_active']
-
-    # Skip if AI report already exists for this player
-    if nba_ai_report_exists(player_uid, is_active):
-        print(f"Skipping {player_name}, AI report already exists.")
-        return player_name, True
-
-    try:
-        raw = get_scouting_report_with_retry(player_uid, player_name)
-
-        parsed = parse_json_report(raw)
-        if not parsed:
-            print(f"Failed to parse JSON for {player_name}")
-            return player_name, False
-
-        insert_report(
-            player_uid=player_uid,
-            stars=parsed.get('stars', None),
-            rating=parsed.get('rating', None),
-            strengths=parsed.get('strengths', []),
-            weaknesses=parsed.get('weaknesses', []),
-            ai_analysis=parsed.get('aiAnalysis', ''),
-            insert_sql=insert_sql
-        )
-        print(f"Inserted report for {player_name}")
-        return player_name, True
-    except Exception as e:
-        print(f"Error processing {player_name}: {e}")
-        return player_name, False
-
-def main():
-    players = fetch_players(select_sql)
-    print(f"Fetched {len(players)} players from DB")
-
-    MAX_WORKERS = 5
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [executor.submit(safe_process_player, player) for player in players]
-
-        for future in concurrent.futures.as_completed(futures):
-            player_name, success = future.result()
-            if not success:
-                print(f"Failed for player: {player_name}")
+def build_content(player):
+    player_info = {k: v for k, v in player.items() if k != 'input_fingerprint'}
+    return nba_player_content(player['full_name'], player_info)
+
+def backfill_fingerprints():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(backfill_sql, (SCOUTING_REPORT_PROMPT_VERSION,))
+    conn.commit()
+    print(f"Stamped fingerprints on {cursor.rowcount} existing NBA reports")
+    cursor.close()
+    conn.close()
+
+def main(retry_failed=False, players_per_request=None, refresh=False):
+    condition = stale_condition if refresh else missing_condition
+    players = fetch_players(select_sql.format(condition=condition))
+    print(f"Fetched {len(players)} NBA players {'with missing or stale' if refresh else 'without'} reports from DB")
+
+    engine = ReportEngine(
+        "nba_reports_refresh" if refresh else "nba_reports", insert_sql, SYSTEM_PROMPT, build_content,
+        players_per_request=players_per_request or REPORT_PLAYERS_PER_REQUEST,
+        prompt_version=SCOUTING_REPORT_PROMPT_VERSION,
+    )
+    engine.run(players, retry_failed=retry_failed)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate AI scouting reports for NBA players.")
+    parser.add_argument("--refresh", action="store_true", help="Also regenerate reports whose inputs or prompt version changed")
+    parser.add_argument("--backfill", action="store_true", help="Only stamp current fingerprints on reports that have none")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry players that failed in a previous run")
+    parser.add_argument("--players-per-request", type=int, help="Players packed into one LLM request")
+    args = parser.parse_args()
+
+    if args.backfill:
+        backfill_fingerprints()
+    else:
+        main(retry_failed=args.retry_failed, players_per_request=args.players_per_request, refresh=args.refresh)
@@ -1,41 +1,38 @@
-from core.config import set_gemini_key
+from core.llm_client import chat_completion
 from utils.ai_prompts import SYSTEM_PROMPT_HOT_TAKE, hot_take_content
+from utils.llm_json import json_mode_kwargs, loads_llm_json
 from fastapi import HTTPException
 
-import json
+MODEL = "gemini-2.5-pro"
+REQUIRED_KEYS = ["truthfulness_score", "ai_insight"]
 
-client = set_gemini_key()
-
-async def create_hot_take_analysis(content: str) -> dict:
-    messages = [
+def hot_take_messages(content: str) -> list:
+    return [
         {"role": "system", "content": SYSTEM_PROMPT_HOT_TAKE},
         {"role": "user", "content": hot_take_content(content)}
     ]
+
+async def create_hot_take_analysis(content: str) -> dict:
+    messages = hot_take_messages(content)
     
     try:
-        response = client.chat.completions.create(
-            model="gemini-2.5-pro",
+        response = await chat_completion(
+            model=MODEL,
             messages=messages,
+            **json_mode_kwargs(),
         )
 
         analysis_str = response.choices[0].message.content.strip()
 
-        if analysis_str.startswith("```"):
-            analysis_str = analysis_str.strip("`")
-            if analysis_str.lower().startswith("json"):
-                analysis_str = analysis_str[4:].strip()
-
         try:
-            analysis_json = json.loads(analysis_str)
-        except json.JSONDecodeError as e:
+            analysis_json = loads_llm_json(analysis_str)
+        except ValueError as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"AI analysis did not return valid JSON: {str(e)} | OUTPUT: {analysis_str}"
             )
 
-        required_keys = ["truthfulness_score", "ai_insight"]
-        
-        if not all(key in analysis_json for key in required_keys):
+        if not all(key in analysis_json for key in REQUIRED_KEYS):
             raise HTTPException(
                 status_code=500,
                 detail=f"AI JSON is missing required keys | OUTPUT: {analysis_json}"
@@ -1,33 +1,37 @@
-from core.config import set_gemini_key
+from core.llm_client import chat_completion
 from utils.ai_prompts import SYSTEM_PROMPT_MATCHUP_SIMULATION, matchup_simulation_content
+from utils.llm_json import json_mode_kwargs, loads_llm_json
 from fastapi import HTTPException
 
-import json
+MODEL = "gemini-2.5-pro"
+# Bump when the system prompt or user content changes, so cached analyses are regenerated
+PROMPT_VERSION = 1
+REQUIRED_KEYS = [
+    "scoreA", "scoreB", "mvp",
+    "keyStats", "players", "reasoning"
+]
 
-client = set_gemini_key()
-
-async def create_matchup_simulation_analysis(lineup1, lineup2) -> dict:
-    messages = [
+def matchup_simulation_messages(lineup1, lineup2) -> list:
+    return [
         {"role": "system", "content": SYSTEM_PROMPT_MATCHUP_SIMULATION},
         {"role": "user", "content": matchup_simulation_content(lineup1, lineup2)}
     ]
+
+async def create_matchup_simulation_analysis(lineup1, lineup2) -> dict:
+    messages = matchup_simulation_messages(lineup1, lineup2)
     
     try:
-        response = client.chat.completions.create(
-            model="gemini-2.5-pro",
+        response = await chat_completion(
+            model=MODEL,
             messages=messages,
+            **json_mode_kwargs(),
         )
 
         analysis_str = response.choices[0].message.content.strip()
 
-        if analysis_str.startswith("```"):
-            analysis_str = analysis_str.strip("`")
-            if analysis_str.lower().startswith("json"):
-                analysis_str = analysis_str[4:].strip()
-
         try:
-            analysis_json = json.loads(analysis_str)
-        except json.JSONDecodeError as e:
+            analysis_json = loads_llm_json(analysis_str)
+        except ValueError as e:
             print("Gemini API error:", str(e))
             raise HTTPException(
                 status_code=500,
@@ -35,11 +39,7 @@ async def create_matchup_simulation_analysis(lineup1, lineup2) -> dict:
             )
 
         # Validate keys
-        required_keys = [
-            "scoreA", "scoreB", "mvp",
-            "keyStats", "players", "reasoning"
-        ]
-        if not all(key in analysis_json for key in required_keys):
+        if not all(key in analysis_json for key in REQUIRED_KEYS):
             raise HTTPException(
                 status_code=500,
                 detail=f"AI JSON is missing required keys | OUTPUT: {analysis_json}"
@@ -1,44 +1,44 @@
-from core.config import set_gemini_key
+from core.llm_client import chat_completion
 from utils.ai_prompts import SYSTEM_PROMPT_LINEUP_BUILDER, nba_lineup_content
+from utils.llm_json import json_mode_kwargs, loads_llm_json
 from fastapi import HTTPException
 
-import json
+MODEL = "gemini-2.5-pro"
+# Bump when the system prompt or user content changes, so cached analyses are regenerated
+PROMPT_VERSION = 1
+REQUIRED_KEYS = [
+    "overallScore", "strengths", "weaknesses",
+    "synergyNotes", "floor", "ceiling", "overallAnalysis"
+]
 
-client = set_gemini_key()
-
-async def create_nba_lineup_analysis(mode: str, player_info: list) -> dict:
-    messages = [
+def nba_lineup_messages(mode: str, player_info: list) -> list:
+    return [
         {"role": "system", "content": SYSTEM_PROMPT_LINEUP_BUILDER},
         {"role": "user", "content": nba_lineup_content(mode, player_info)}
     ]
 
+async def create_nba_lineup_analysis(mode: str, player_info: list) -> dict:
+    messages = nba_lineup_messages(mode, player_info)
+
     try:
-        response = client.chat.completions.create(
-            model="gemini-2.5-pro",
+        response = await chat_completion(
+            model=MODEL,
             messages=messages,
+            **json_mode_kwargs(),
         )
 
         analysis_str = response.choices[0].message.content.strip()
 
-        if analysis_str.startswith("```"):
-            analysis_str = analysis_str.strip("`")
-            if analysis_str.lower().startswith("json"):
-                analysis_str = analysis_str[4:].strip()
-
         try:
-            analysis_json = json.loads(analysis_str)
-        except json.JSONDecodeError as e:
+            analysis_json = loads_llm_json(analysis_str)
+        except ValueError as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"AI analysis did not return valid JSON: {str(e)} | OUTPUT: {analysis_str}"
             )
 
         # Validate keys
-        required_keys = [
-            "overallScore", "strengths", "weaknesses",
-            "synergyNotes", "floor", "ceiling", "overallAnalysis"
-        ]
-        if not all(key in analysis_json for key in required_keys):
+        if not all(key in analysis_json for key in REQUIRED_KEYS):
             raise HTTPException(
                 status_code=500,
                 detail=f"AI JSON is missing required keys | OUTPUT: {analysis_json}"
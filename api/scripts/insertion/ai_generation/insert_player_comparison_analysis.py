@@ -1,12 +1,14 @@
-from core.config import set_gemini_key
+from core.llm_client import chat_completion
 from utils.ai_prompts import SYSTEM_PROMPT_PLAYER_COMPARISON
 from fastapi import HTTPException
 
-client = set_gemini_key()
-
 from decimal import Decimal
 import json
 
+MODEL = "gemini-2.5-pro"
+# Bump when SYSTEM_PROMPT_PLAYER_COMPARISON or the user content changes, so cached analyses are regenerated
+PROMPT_VERSION = 1
+
 
 async def create_player_comparison_analysis(player1: dict, player2: dict):
     def safe(obj):
@@ -35,8 +37,8 @@ Compare these two players:
     ]
 
     try:
-        response = client.chat.completions.create(  # no await
-            model="gemini-2.5-pro",
+        response = await chat_completion(
+            model=MODEL,
             messages=messages,
         )
 
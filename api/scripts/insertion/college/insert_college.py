@@ -1,133 +1,165 @@
-from core.db import get_db_connection
 from scripts.scraping.fetch_college_player_info import fetch_college_players
-from utils.helpers import launch_browser, normalize_name
+from utils.crawl_journal import CrawlJournal
+from utils.crawl_state import CrawlState
+from utils.helpers import name_match_key, normalize_name
+from utils.ingest_pipeline import ingest
+from datetime import datetime
+import argparse
 import asyncio
 import json
 import hashlib
+import re
+
+COLLEGE_PLAYER_URL_PREFIX = "https://www.sports-reference.com/cbb/players/"
+
+upsert_info_sql = """
+    INSERT INTO college_player_info
+    (player_uid, player_url, position, height, weight, years,
+    schools, awards, is_active, data_hash)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    ON DUPLICATE KEY UPDATE
+        last_scraped = IF(data_hash <=> VALUES(data_hash), last_scraped, NOW()),
+        player_url = VALUES(player_url),
+        position = VALUES(position),
+        height = VALUES(height),
+        weight = VALUES(weight),
+        schools = VALUES(schools),
+        awards = VALUES(awards),
+        is_active = VALUES(is_active),
+        data_hash = VALUES(data_hash)
+"""
 
 def compute_data_hash(player):
     """Compute a hash for deduplication."""
     fields = {
-        "position": player[4] or "",
-        "height": player[5] or "",
-        "weight": player[6] or 0,
-        "schools": player[13] or [],
-        "awards": player[12] or []
+        "position": player.get("position") or "",
+        "height": player.get("height") or "",
+        "weight": player.get("weight") or 0,
+        "schools": player.get("schools") or [],
+        "awards": player.get("awards") or []
     }
     serialized = json.dumps(fields, sort_keys=True)
     return hashlib.md5(serialized.encode()).hexdigest()
 
-async def insert_college_players(cursor, player_list):
+def is_active_player(years):
+    """A player whose "(2023-2026)" span reaches the current year is still in college."""
+    match = re.search(r"(\d{4})\s*\)", years or "")
+    return bool(match) and int(match.group(1)) >= datetime.now().year
+
+def select_players_by_name(cursor, names):
+    """
+    name -> (player_uid, current_level) for the `names` that exist, first player_uid winning
+    for duplicate names. Names match case- and accent-insensitively, like the old
+    `full_name=%s` lookup did through the table collation.
+    """
+    if not names:
+        return {}
+    placeholders = ", ".join(["%s"] * len(names))
+    cursor.execute(f"""
+        SELECT player_uid, full_name, current_level FROM players
+        WHERE full_name IN ({placeholders})
+        ORDER BY player_uid
+    """, list(names))
+    stored = {}
+    for player_uid, full_name, current_level in cursor.fetchall():
+        stored.setdefault(name_match_key(full_name), (player_uid, current_level))
+    return {name: stored[name_match_key(name)] for name in names if name_match_key(name) in stored}
+
+def insert_college_players(cursor, player_list):
     """
-    Insert players into `players` table if they don't exist.
+    Insert a batch of players into `players` table if they don't exist.
     Update current_level if previously "HS" -> "COLLEGE".
     Skip if current_level is "NBA".
     Returns a mapping of (full_name, years) -> player_uid
     """
-    player_uid_map = {}
+    names = {normalize_name(player["name"]) for player in player_list}
+    existing = select_players_by_name(cursor, names)
+
+    # One row per spelling-insensitive name, so case variants within a batch don't both insert
+    new_names = {}
+    for name in sorted(names - existing.keys()):
+        new_names.setdefault(name_match_key(name), name)
+    if new_names:
+        cursor.executemany("""
+            INSERT INTO players (full_name, current_level, created_at, updated_at)
+            VALUES (%s, 'COLLEGE', NOW(), NOW())
+        """, [(name,) for name in new_names.values()])
+        existing.update(select_players_by_name(cursor, names - existing.keys()))
+
+    promoted = sorted({uid for uid, level in existing.values() if level == "HS"})
+    if promoted:
+        placeholders = ", ".join(["%s"] * len(promoted))
+        cursor.execute(f"""
+            UPDATE players SET current_level='COLLEGE', updated_at=NOW()
+            WHERE player_uid IN ({placeholders})
+        """, promoted)
 
+    player_uid_map = {}
     for player in player_list:
-        full_name = normalize_name(player[0])
-        years = player[3] if player[3] else ""
-
-        cursor.execute("""
-            SELECT player_uid, current_level FROM players
-            WHERE full_name=%s
-        """, (full_name,))
-        row = cursor.fetchone()
-
-        if row:
-            player_uid, current_level = row
-            if current_level == "HS":
-                cursor.execute("""
-                    UPDATE players SET current_level='COLLEGE', updated_at=NOW()
-                    WHERE player_uid=%s
-                """, (player_uid,))
-            elif current_level == "NBA":
-                continue  # skip
-        else:
-            cursor.execute("""
-                INSERT INTO players (full_name, current_level, created_at, updated_at)
-                VALUES (%s, 'COLLEGE', NOW(), NOW())
-            """, (full_name,))
-            player_uid = cursor.lastrowid
-
-        player_uid_map[(full_name, years)] = player_uid
+        full_name = normalize_name(player["name"])
+        player_uid, current_level = existing[full_name]
+        if current_level == "NBA":
+            continue  # skip
+        player_uid_map[(full_name, player.get("years") or "")] = player_uid
 
     return player_uid_map
 
 
-async def insert_college_player_info(cursor, player_uid_map, player_list):
+def insert_college_player_info(cursor, player_uid_map, player_list):
     """
-    Insert into `college_player_info` table.
-    Deduplicate using UNIQUE (player_uid, years) and data_hash.
-    Update row if data_hash changed.
+    Upsert a batch into `college_player_info` table.
+    Deduplicate using UNIQUE (player_uid, years); last_scraped only moves when data_hash changed.
     """
+    rows = []
     for player in player_list:
-        full_name = normalize_name(player[0])
-        years = player[3] if player[3] else ""
+        full_name = normalize_name(player["name"])
+        years = player.get("years") or ""
         player_uid = player_uid_map.get((full_name, years))
-        if not player_uid:
+        if not player_uid or player.get("weight") is None:
             continue
 
-        player_url = player[1]
-        position = player[4] or ""
-        height = player[5] or ""
-        weight = player[6]
-        schools = json.dumps(player[13] or [])
-        awards = json.dumps(player[12] or [])
-        is_active = 1 if player[15] else 0
+        rows.append((
+            player_uid,
+            player["href"],
+            player.get("position") or "",
+            player.get("height") or "",
+            player["weight"],
+            years,
+            json.dumps(player.get("schools") or []),
+            json.dumps(player.get("awards") or []),
+            1 if is_active_player(years) else 0,
+            compute_data_hash(player),
+        ))
 
-        if weight is None:
-            continue
+    if rows:
+        cursor.executemany(upsert_info_sql, rows)
+
+
+def write_player_batch(cursor, player_list):
+    player_uid_map = insert_college_players(cursor, player_list)
+    insert_college_player_info(cursor, player_uid_map, player_list)
+
+
+async def main(full=False):
+    # Only player pages that changed since the last crawl come back (all of them with full=True)
+    crawl_state = CrawlState(COLLEGE_PLAYER_URL_PREFIX, force=full).load()
+    # An interrupted crawl resumes from its journal instead of starting over
+    journal = CrawlJournal("college_players").load()
+
+    # Players are upserted in batches while the crawl runs; each commit also records their pages' crawl state
+    written = await ingest(
+        lambda queue: fetch_college_players(crawl_state=crawl_state, journal=journal, sink=queue),
+        write_player_batch,
+        after_commit=lambda players: crawl_state.flush(player["href"] for player in players),
+    )
 
-        data_hash = compute_data_hash(player)
-
-        # Check if row exists
-        cursor.execute("""
-            SELECT info_uid, data_hash FROM college_player_info
-            WHERE player_uid=%s AND years=%s
-        """, (player_uid, years))
-        row = cursor.fetchone()
-
-        if row:
-            info_uid, existing_hash = row
-            if existing_hash != data_hash:
-                # Update existing row
-                cursor.execute("""
-                    UPDATE college_player_info
-                    SET player_url=%s, position=%s, height=%s, weight=%s,
-                        schools=%s, awards=%s, is_active=%s, data_hash=%s,
-                        last_scraped=NOW()
-                    WHERE info_uid=%s
-                """, (player_url, position, height, weight, schools, awards, is_active, data_hash, info_uid))
-        else:
-            # Insert new row
-            cursor.execute("""
-                INSERT INTO college_player_info
-                (player_uid, player_url, position, height, weight, years,
-                schools, awards, is_active, data_hash)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (player_uid, player_url, position, height, weight, years, schools, awards, is_active, data_hash))
-
-
-async def main():
-    cnx = get_db_connection()
-    cursor = cnx.cursor()
-
-    playwright, browser = await launch_browser(headless=True)
-    scraped_players = await fetch_college_players(browser)
-    await browser.close()
-    await playwright.stop()
-
-    player_uid_map = await insert_college_players(cursor, scraped_players)
-    await insert_college_player_info(cursor, player_uid_map, scraped_players)
-
-    cnx.commit()
-    cursor.close()
-    cnx.close()
-    print("Inserted/Updated college players successfully!")
+    crawl_state.flush()
+    journal.finish()
+    print(f"Inserted/Updated {written} college players successfully!")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape sports-reference college players and upsert them.")
+    parser.add_argument("--full", action="store_true", help="Parse every player page, ignoring crawl state")
+    args = parser.parse_args()
+    asyncio.run(main(full=args.full))
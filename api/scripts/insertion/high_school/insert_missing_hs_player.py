@@ -1,10 +1,10 @@
 from core.db import get_db_connection
 from scripts.scraping.fetch_individual_hs_player import fetch_247_data, fetch_espn_data, fetch_rivals_data
-from utils.ai_generation_helpers import hs_ai_report_exists, parse_json_report, insert_report
-from scripts.insertion.ai_generation.insert_ai_generated_hs_reports import fetch_player_rankings
+from utils.ai_generation_helpers import hs_ai_report_exists, parse_json_report, insert_reports
+from scripts.insertion.ai_generation.insert_ai_generated_hs_reports import fingerprint_sql, inputs_join_sql, insert_sql
 
-from core.config import set_gemini_key
-from utils.ai_prompts import SYSTEM_PROMPT, user_content
+from core.llm_client import chat_completion
+from utils.ai_prompts import SCOUTING_REPORT_PROMPT_VERSION, SYSTEM_PROMPT, user_content
 
 import asyncio
 import json
@@ -67,13 +67,14 @@ async def insert_hs_player(full_name, sports247_link, espn_link, rivals_link):
     return {"status": "success", "player": full_name, "player_uid": player_uid}
 
 async def create_hs_player_analysis(player_uid):
-    client = set_gemini_key()
     cnx = get_db_connection()
     cursor = cnx.cursor()
     
-    select_sql = """
-    SELECT p.player_uid, p.full_name, hspr.class_year, hspr.school_name FROM players AS p
-    INNER JOIN high_school_player_rankings AS hspr ON hspr.player_uid = p.player_uid
+    # Same ranking row and input fingerprint as the bulk report script, so the report isn't seen as stale
+    select_sql = f"""
+    SELECT p.player_uid, p.full_name, hspr.class_year, hspr.school_name, {fingerprint_sql} AS input_fingerprint
+    FROM players AS p
+    {inputs_join_sql}
     WHERE p.player_uid=%s AND p.class_year IS NOT NULL LIMIT 1;
     """
     
@@ -83,11 +84,22 @@ async def create_hs_player_analysis(player_uid):
     player_name = player[1]
     class_year = player[2]
     high_school = player[3]
+    input_fingerprint = player[4]
     
     if (hs_ai_report_exists(player_uid, class_year)):
         return {"status": "fail", "player": player_name, "player_uid": player_uid}
     
-    ranking_info = fetch_player_rankings(player_name)
+    rankings_sql = """
+    SELECT p.full_name, hspr.player_rank, hspr.player_grade, hspr.stars, hspr.source
+    FROM high_school_player_rankings AS hspr
+    INNER JOIN players AS p ON hspr.player_uid = p.player_uid
+    WHERE p.full_name = %s AND p.class_year IS NOT NULL;
+    """
+
+    ranking_cursor = cnx.cursor(dictionary=True)
+    ranking_cursor.execute(rankings_sql, (player_name,))
+    ranking_info = ranking_cursor.fetchall()
+    ranking_cursor.close()
     ranking_info_json = json.dumps(ranking_info, indent=2)
     
     messages = [
@@ -95,7 +107,7 @@ async def create_hs_player_analysis(player_uid):
         {"role": "user", "content": user_content(ranking_info_json, player_name, high_school, class_year)}
     ]
     
-    response = client.chat.completions.create(
+    response = await chat_completion(
         model="gemini-2.5-flash",
         messages=messages,
     )
@@ -106,14 +118,16 @@ async def create_hs_player_analysis(player_uid):
     if not parsed:
         return {"status": "fail", "reason": "failed to parse AI response", "player": player_name}
 
-    insert_report(
-        player_uid=player_uid,
-        stars=parsed.get('stars', None),
-        rating=parsed.get('rating', None),
-        strengths=parsed.get('strengths', []),
-        weaknesses=parsed.get('weaknesses', []),
-        ai_analysis=parsed.get('aiAnalysis', '')
-    )
+    insert_reports([(
+        player_uid,
+        parsed.get('stars', None),
+        parsed.get('rating', None),
+        json.dumps(parsed.get('strengths', [])),
+        json.dumps(parsed.get('weaknesses', [])),
+        parsed.get('aiAnalysis', ''),
+        input_fingerprint,
+        SCOUTING_REPORT_PROMPT_VERSION,
+    )], insert_sql)
     
     print(f"Inserted report for {player_name}")
     
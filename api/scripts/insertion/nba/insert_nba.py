@@ -1,12 +1,42 @@
 from datetime import datetime
 from unidecode import unidecode
+import argparse
 import hashlib
 import json
 import asyncio
 
 from core.db import get_db_connection
 from scripts.scraping.fetch_nba_player_info import fetch_nba_players
-from utils.helpers import launch_browser, normalize_name
+from utils.crawl_journal import CrawlJournal
+from utils.crawl_state import CrawlState
+from utils.helpers import name_match_key, normalize_name
+from utils.ingest_pipeline import ingest
+
+NBA_PLAYER_URL_PREFIX = "https://www.basketball-reference.com/players/"
+
+upsert_details_sql = """
+    INSERT INTO nba_player_info
+    (player_uid, player_url, position, height, weight, teams, min_year, max_year,
+    draft_round, draft_pick, draft_year, years_pro, accolades, colleges, high_schools,
+    is_active, data_hash, last_scraped)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        position = VALUES(position),
+        height = VALUES(height),
+        weight = VALUES(weight),
+        teams = VALUES(teams),
+        min_year = VALUES(min_year),
+        max_year = VALUES(max_year),
+        draft_round = VALUES(draft_round),
+        draft_pick = VALUES(draft_pick),
+        years_pro = VALUES(years_pro),
+        accolades = VALUES(accolades),
+        colleges = VALUES(colleges),
+        high_schools = VALUES(high_schools),
+        is_active = VALUES(is_active),
+        data_hash = VALUES(data_hash),
+        last_scraped = VALUES(last_scraped)
+"""
 
 def compute_player_hash(player_tuple):
     """Compute a hash of player info ignoring URL and is_active."""
@@ -14,43 +44,61 @@ def compute_player_hash(player_tuple):
     return hashlib.md5(json.dumps(relevant_data, sort_keys=True, default=str).encode()).hexdigest()
 
 
-async def insert_nba_players(cursor, player_list):
+def select_players(cursor, keys):
     """
-    Insert players into `players` table and return mapping (full_name, draft_year) -> player_uid.
-    Checks for existing player to avoid duplicates.
+    (full_name, draft_year) -> player_uid for the players among `keys` that exist.
+    Names match case- and accent-insensitively, like the old `full_name=%s` lookup did
+    through the table collation, so spelling variants reuse the same row.
     """
-    player_uid_map = {}
-
-    for player in player_list:
-        full_name = normalize_name(player[0])
-        draft_year = int(player[10] or 0)
-
-        # Check for existing player
-        cursor.execute("""
-            SELECT player_uid FROM players
-            WHERE full_name=%s AND draft_year=%s
-        """, (full_name, draft_year))
-        row = cursor.fetchone()
-
-        if row:
-            player_uid = row[0]
-        else:
-            cursor.execute("""
-                INSERT INTO players (full_name, draft_year, current_level)
-                VALUES (%s, %s, 'NBA')
-            """, (full_name, draft_year))
-            player_uid = cursor.lastrowid
-
-        player_uid_map[(full_name, draft_year)] = player_uid
+    if not keys:
+        return {}
+    names = sorted({name for name, _ in keys})
+    placeholders = ", ".join(["%s"] * len(names))
+    cursor.execute(f"""
+        SELECT player_uid, full_name, draft_year FROM players
+        WHERE full_name IN ({placeholders})
+        ORDER BY player_uid
+    """, names)
+    stored = {}
+    for player_uid, full_name, draft_year in cursor.fetchall():
+        stored.setdefault((name_match_key(full_name), draft_year), player_uid)
+
+    found = {}
+    for name, draft_year in keys:
+        player_uid = stored.get((name_match_key(name), draft_year))
+        if player_uid:
+            found[(name, draft_year)] = player_uid
+    return found
+
+
+def insert_nba_players(cursor, player_list):
+    """
+    Insert a batch of players into `players` table and return mapping (full_name, draft_year) -> player_uid.
+    Checks for existing players (one query per batch) to avoid duplicates.
+    """
+    keys = {(normalize_name(player[0]), int(player[10] or 0)) for player in player_list}
+    player_uid_map = select_players(cursor, keys)
+
+    # One row per spelling-insensitive name, so "Jj Redick" and "JJ Redick" in one batch don't both insert
+    missing = {}
+    for name, draft_year in sorted(keys - player_uid_map.keys()):
+        missing.setdefault((name_match_key(name), draft_year), (name, draft_year))
+    if missing:
+        cursor.executemany("""
+            INSERT INTO players (full_name, draft_year, current_level)
+            VALUES (%s, %s, 'NBA')
+        """, list(missing.values()))
+        player_uid_map.update(select_players(cursor, keys - player_uid_map.keys()))
 
     return player_uid_map
 
 
-async def insert_nba_player_details(cursor, player_list, player_uid_map, existing_players):
+def insert_nba_player_details(cursor, player_list, player_uid_map, existing_players):
     """
-    Insert or update detailed player info based on hash and draft_year.
-    Only updates if data has changed.
+    Upsert detailed player info for a batch based on hash and draft_year.
+    Only writes rows whose data has changed.
     """
+    rows = []
     for player in player_list:
         full_name, link, min_year, max_year, position, height, weight, teams, \
         draft_round, draft_pick, draft_year, years_pro, accolades, colleges, \
@@ -58,7 +106,7 @@ async def insert_nba_player_details(cursor, player_list, player_uid_map, existin
 
         full_name = normalize_name(full_name)
 
-        player_uid = player_uid_map[(full_name, draft_year)]
+        player_uid = player_uid_map[(full_name, int(draft_year or 0))]
         data_hash = compute_player_hash(player)
 
         key = (player_uid, draft_year)
@@ -66,30 +114,9 @@ async def insert_nba_player_details(cursor, player_list, player_uid_map, existin
 
         if existing and existing["hash"] == data_hash:
             continue  # no changes
+        existing_players[key] = {"hash": data_hash, "last_scraped": datetime.now()}
 
-        cursor.execute("""
-            INSERT INTO nba_player_info
-            (player_uid, player_url, position, height, weight, teams, min_year, max_year,
-            draft_round, draft_pick, draft_year, years_pro, accolades, colleges, high_schools,
-            is_active, data_hash, last_scraped)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                position = VALUES(position),
-                height = VALUES(height),
-                weight = VALUES(weight),
-                teams = VALUES(teams),
-                min_year = VALUES(min_year),
-                max_year = VALUES(max_year),
-                draft_round = VALUES(draft_round),
-                draft_pick = VALUES(draft_pick),
-                years_pro = VALUES(years_pro),
-                accolades = VALUES(accolades),
-                colleges = VALUES(colleges),
-                high_schools = VALUES(high_schools),
-                is_active = VALUES(is_active),
-                data_hash = VALUES(data_hash),
-                last_scraped = VALUES(last_scraped)
-        """, (
+        rows.append((
             player_uid, link, position, height, weight, json.dumps(teams),
             int(min_year) if min_year else None,
             int(max_year) if max_year else None,
@@ -98,46 +125,74 @@ async def insert_nba_player_details(cursor, player_list, player_uid_map, existin
             is_active, data_hash, datetime.now()
         ))
 
+    if rows:
+        cursor.executemany(upsert_details_sql, rows)
 
-async def main():
-    cnx = get_db_connection()
-    cursor = cnx.cursor()
 
-    cursor.execute("""
-        SELECT player_uid, draft_year, data_hash, last_scraped
-        FROM nba_player_info
-    """)
-    existing_players_list = cursor.fetchall()
-    existing_players = {
-        (row[0], row[1]): {"hash": row[2], "last_scraped": row[3]}
-        for row in existing_players_list
-    }
-
-    # Launch browser and fetch players
-    playwright, browser = await launch_browser(headless=True)
-    scraped_players = await fetch_nba_players(browser, existing_players)
-    await browser.close()
-    await playwright.stop()
-
-    # Deduplicate scraped players by (full_name, draft_year)
-    unique_players = {}
-    for p in scraped_players:
+def dedupe_players(player_list, seen):
+    """
+    Drop players already written this run, by (full_name, draft_year), filling in a
+    missing draft_year the same way for the key and the stored row.
+    """
+    unique_players = []
+    for p in player_list:
         draft_year = p[10] or (p[3] if p[3] else 0)
-        key = (normalize_name(p[0]), draft_year)
-        if key not in unique_players:
+        key = (name_match_key(p[0]), draft_year)
+        if key not in seen:
+            seen.add(key)
             p = list(p)
             p[10] = draft_year
-            unique_players[key] = tuple(p)
-    players = list(unique_players.values())
-
-    # Insert players
-    player_uid_map = await insert_nba_players(cursor, players)
-    await insert_nba_player_details(cursor, players, player_uid_map, existing_players)
+            unique_players.append(tuple(p))
+    return unique_players
 
-    cnx.commit()
-    cursor.close()
-    cnx.close()
-    print("Inserted NBA players successfully!")
 
-
-asyncio.run(main())
\ No newline at end of file
+def load_existing_players():
+    """(player_uid, draft_year) -> stored data_hash, so unchanged players are skipped."""
+    cnx = get_db_connection()
+    cursor = cnx.cursor()
+    try:
+        cursor.execute("""
+            SELECT player_uid, draft_year, data_hash, last_scraped
+            FROM nba_player_info
+        """)
+        return {
+            (row[0], row[1]): {"hash": row[2], "last_scraped": row[3]}
+            for row in cursor.fetchall()
+        }
+    finally:
+        cursor.close()
+        cnx.close()
+
+
+async def main(full=False):
+    existing_players = load_existing_players()
+    seen = set()
+
+    def write_player_batch(cursor, scraped_players):
+        players = dedupe_players(scraped_players, seen)
+        player_uid_map = insert_nba_players(cursor, players)
+        insert_nba_player_details(cursor, players, player_uid_map, existing_players)
+
+    # Fetch players (plain HTTP unless SCRAPER_BACKEND=browser); only pages that
+    # changed since the last crawl come back (all of them with full=True)
+    crawl_state = CrawlState(NBA_PLAYER_URL_PREFIX, force=full).load()
+    # An interrupted crawl resumes from its journal instead of starting over
+    journal = CrawlJournal("nba_players").load()
+
+    # Players are upserted in batches while the crawl runs; each commit also records their pages' crawl state
+    written = await ingest(
+        lambda queue: fetch_nba_players(crawl_state=crawl_state, journal=journal, sink=queue),
+        write_player_batch,
+        after_commit=lambda players: crawl_state.flush(player[1] for player in players),
+    )
+
+    crawl_state.flush()
+    journal.finish()
+    print(f"Inserted {written} NBA players successfully!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape basketball-reference players and upsert them.")
+    parser.add_argument("--full", action="store_true", help="Parse every player page, ignoring crawl state")
+    args = parser.parse_args()
+    asyncio.run(main(full=args.full))
@@ -1,12 +1,18 @@
 import asyncio
 import json
-import random
 import re
 import string
 import hashlib
 import traceback
-from utils.helpers import USER_AGENT
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+import httpx
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from selectolax.parser import HTMLParser
+
+from utils.crawl_state import fetch_if_changed
+from utils.scraper_runtime import SCRAPER_BACKEND, SCRAPER_CONCURRENCY, gather_bounded, html_fetcher
+
+POSITION_MAP = {"Guard": "G", "Forward": "F", "Center": "C"}
 
 
 def normalize_list(values):
@@ -27,165 +33,163 @@ def compute_college_player_hash(player_obj):
     return hashlib.md5(serialized.encode()).hexdigest()
 
 
-async def scrape_player(browser, player_data, timeout=30):
-    """Scrape a single player with per-player timeout and safe cleanup."""
-    context = None
-    page = None
+def parse_player_info(html):
+    """Position, height, weight and awards from a sports-reference player page."""
+    tree = HTMLParser(html)
+    data = {"position": "", "height": "", "weight": None, "awards": []}
+
+    p_tags = tree.css("#meta p")
+    for i, p_tag in enumerate(p_tags):
+        strong = p_tag.css_first("strong")
+        if strong and strong.text(strip=True).lower().startswith("position"):
+            match = re.search(r"Position:\s*</strong>\s*([A-Za-z]+)", p_tag.html)
+            if match:
+                position = match.group(1).strip()
+                data["position"] = POSITION_MAP.get(position, position)
+            if i + 1 < len(p_tags):
+                hw = [span.text(strip=True) for span in p_tags[i + 1].css("span")]
+                if len(hw) > 0:
+                    data["height"] = hw[0]
+                if len(hw) > 1:
+                    weight = re.match(r"\d+", hw[1].replace("lb", "").strip())
+                    data["weight"] = (int(weight.group(0)) or None) if weight else None
+            break
+
+    data["awards"] = [a.text(strip=True) for a in tree.css("ul#bling li a") if a.text(strip=True)]
+    return data
+
+
+def parse_player_index(html):
+    """Men's players listed on a letter index page, as player dicts for scrape_player."""
+    players = []
+    for p_tag in HTMLParser(html).css("#content p"):
+        player_a = p_tag.css_first("a")
+        if not player_a:
+            continue
+        name = player_a.text(strip=True).replace(".", "")
+        href = player_a.attributes.get("href")
+        if not href or not re.match(r"^[A-Za-z]", name):
+            continue
+
+        small = p_tag.css_first("small.note")
+        years, schools = "", []
+        if small:
+            match = re.search(r"\(\d{4}\s*[-–]\s*\d{4}\)", small.text())
+            if match:
+                years = match.group(0)
+            for a in small.css("a"):
+                href_s = a.attributes.get("href")
+                if href_s and "/men/" in href_s:
+                    schools.append({"name": a.text(strip=True), "href": f"https://www.sports-reference.com{href_s}"})
+
+        if schools:
+            players.append({"name": name, "href": href, "years": years, "schools": schools})
+    return players
+
+
+async def scrape_player(fetcher, player_data, timeout=30, crawl_state=None, journal=None):
+    """
+    Scrape a single player through the shared fetcher, with per-player timeouts.
+    Returns None when crawl_state says the page hasn't changed since the last crawl.
+    Successful results (including None) are recorded in the journal; failures are not, so a resumed crawl retries them.
+    """
+    url = f"https://www.sports-reference.com{player_data['href']}"
     try:
-        context = await browser.new_context()
-        page = await context.new_page()
-        await page.set_extra_http_headers({"User-Agent": USER_AGENT})
-
-        async def _scrape():
-            url = f"https://www.sports-reference.com{player_data['href']}"
-            await page.goto(url, wait_until="domcontentloaded", timeout=timeout*1000)
-
-            result = await page.evaluate(r'''() => {
-                const data = { position: "", height: "", weight: null, awards: [] };
-                const metaDiv = document.querySelector("#meta");
-                if (metaDiv) {
-                    const pTags = Array.from(metaDiv.querySelectorAll("p"));
-                    for (let i=0;i<pTags.length;i++){
-                        const strong = pTags[i].querySelector("strong");
-                        if (strong && strong.innerText.toLowerCase().startsWith("position")) {
-                            const match = /Position:\s*<\/strong>\s*([A-Za-z]+)/.exec(pTags[i].innerHTML);
-                            if (match) {
-                                const posMap = { "Guard":"G","Forward":"F","Center":"C" };
-                                data.position = posMap[match[1].trim()]||match[1].trim();
-                            }
-                            if (i+1 < pTags.length) {
-                                const hw = Array.from(pTags[i+1].querySelectorAll("span")).map(el=>el.innerText.trim());
-                                if (hw.length>0) data.height = hw[0];
-                                if (hw.length>1) data.weight = parseInt(hw[1].replace("lb","").trim())||null;
-                            }
-                            break;
-                        }
-                    }
-                }
-                const bling = document.querySelectorAll("ul#bling li a");
-                data.awards = Array.from(bling).map(a=>a.innerText.trim()).filter(Boolean);
-                return data;
-            }''')
-
-            player_data.update(result)
-            player_data['href'] = f"https://www.sports-reference.com{player_data['href']}"
+        html = await fetch_if_changed(fetcher, url, crawl_state, timeout=timeout)
+        if html is not None:
+            player_data.update(parse_player_info(html))
+            player_data['href'] = url
             print(player_data)
-            
-            return player_data
+        else:
+            player_data = None
 
-        return await asyncio.wait_for(_scrape(), timeout=timeout+5)
+        if journal:
+            journal.record(url, player_data)
+        return player_data
 
-    except (PlaywrightTimeoutError, asyncio.TimeoutError):
+    except (PlaywrightTimeoutError, httpx.TimeoutException, asyncio.TimeoutError):
         print(f"⚠️ Timeout scraping {player_data.get('name')}")
     except Exception:
         print(f"⚠️ Error scraping {player_data.get('name')}:\n{traceback.format_exc()}")
-    finally:
-        if page:
-            try: await page.close()
-            except: pass
-        if context:
-            try: await context.close()
-            except: pass
+    if crawl_state:
+        crawl_state.discard(url)
     return player_data
 
 
-async def fetch_college_players(browser, resume_letter="a", batch_size=3, checkpoint_file="players_checkpoint.json"):
-    """Fetch all men's college basketball players with checkpointing and per-letter robustness."""
+async def fetch_college_players(resume_letter="a", concurrency=SCRAPER_CONCURRENCY, backend=SCRAPER_BACKEND,
+                                crawl_state=None, journal=None, sink=None):
+    """
+    Fetch all men's college basketball players with per-letter robustness.
+    Player pages are fetched `concurrency` at a time (plain HTTP by default, see
+    utils.scraper_runtime.html_fetcher); pacing comes from the per-site rate
+    limiter rather than sleeps between players. With a crawl_state (see
+    utils.crawl_state) only pages that are due and have changed are parsed and
+    returned; the caller flushes it once the players are stored.
+
+    With a journal (utils.crawl_journal.CrawlJournal) every finished player is
+    appended as it completes, and a restarted crawl replays those results and
+    carries on from the first unfinished page.
+
+    With a sink (an asyncio.Queue, see utils.ingest_pipeline) each player is put
+    on it as soon as it is scraped and the returned list stays empty.
+    """
     players_to_insert = []
     seen_hashes = set()
     letters = string.ascii_lowercase[string.ascii_lowercase.index(resume_letter):]
 
-    for letter in letters:
-        print(f"🔍 Fetching letter {letter}")
-        context = None
-        page = None
-        try:
-            context = await browser.new_context()
-            page = await context.new_page()
-            await page.set_extra_http_headers({"User-Agent": USER_AGENT})
-            url = f"https://www.sports-reference.com/cbb/players/{letter}-index.html"
-            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-
-            p_elements = await page.query_selector_all("#content p")
-            batch = []
-
-            for p_el in p_elements:
-                player_a = await p_el.query_selector("a")
-                if not player_a:
-                    continue
-                name = (await player_a.inner_text()).strip().replace(".", "")
-                href = await player_a.get_attribute("href")
-                if not href or not re.match(r"^[A-Za-z]", name):
-                    continue
-
-                small = await p_el.query_selector("small.note")
-                years, schools = "", []
-                if small:
-                    raw = await small.inner_text()
-                    match = re.search(r"\(\d{4}\s*[-–]\s*\d{4}\)", raw)
-                    if match: years = match.group(0)
-                    for a in await small.query_selector_all("a"):
-                        href_s = await a.get_attribute("href")
-                        if href_s and "/men/" in href_s:
-                            schools.append({"name": (await a.inner_text()).strip(), "href": f"https://www.sports-reference.com{href_s}"})
-
-                if not schools:
-                    continue
-
-                batch.append({"name": name, "href": href, "years": years, "schools": schools})
-
-                if len(batch) >= batch_size:
-                    for pl in batch:
-                        pl_data = await scrape_player(browser, pl)
-                        if (pl_data.get("weight") is None or pl_data.get("height") is None) and not pl_data.get("awards"):
-                            print(f"⚠️ Skipping {pl_data['name']} because weight/height is None and no awards")
-                            continue
-                        h = compute_college_player_hash(pl_data)
-                        if h not in seen_hashes:
-                            seen_hashes.add(h)
-                            players_to_insert.append(pl_data)
-                    batch = []
-
-            # process remaining
-            for pl in batch:
-                pl_data = await scrape_player(browser, pl)
-                if (pl_data.get("weight") is None or pl_data.get("height") is None) and not pl_data.get("awards"):
-                    print(f"⚠️ Skipping {pl_data['name']} because weight/height is None and no awards")
-                    continue
-                h = compute_college_player_hash(pl_data)
-                if h not in seen_hashes:
-                    seen_hashes.add(h)
-                    players_to_insert.append(pl_data)
-
-            # checkpoint to disk
-            with open(checkpoint_file, "w", encoding="utf-8") as f:
-                json.dump(players_to_insert, f, indent=2)
-
-            await page.close()
-            await context.close()
-            await asyncio.sleep(random.uniform(3, 7))
-
-        except Exception as e:
-            print(f"💥 Fatal error on letter {letter}: {e}")
-            if page:
-                try: await page.close()
-                except: pass
-            if context:
-                try: await context.close()
-                except: pass
-            continue
-
+    async def collect(pl_data):
+        if pl_data is None:
+            return
+        if (pl_data.get("weight") is None or pl_data.get("height") is None) and not pl_data.get("awards"):
+            print(f"⚠️ Skipping {pl_data['name']} because weight/height is None and no awards")
+            return
+        h = compute_college_player_hash(pl_data)
+        if h in seen_hashes:
+            return
+        seen_hashes.add(h)
+        if sink is not None:
+            await sink.put(pl_data)
+        else:
+            players_to_insert.append(pl_data)
+
+    if journal:
+        for pl_data in journal.results():
+            await collect(pl_data)
+
+    async with html_fetcher(concurrency, backend) as fetcher:
+
+        async def scrape_and_collect(pl):
+            await collect(await scrape_player(fetcher, pl, crawl_state=crawl_state, journal=journal))
+
+        for letter in letters:
+            if journal and journal.letter_done(letter):
+                continue
+            print(f"🔍 Fetching letter {letter}")
+            try:
+                url = f"https://www.sports-reference.com/cbb/players/{letter}-index.html"
+                batch = parse_player_index(await fetcher.html(url))
+                urls = [f"https://www.sports-reference.com{pl['href']}" for pl in batch]
+                if journal:
+                    batch = [pl for pl, pl_url in zip(batch, urls) if not journal.is_done(pl_url)]
+
+                await gather_bounded(batch, scrape_and_collect, fetcher.size)
+
+                # Failed pages aren't journaled; leave the letter open so a resumed crawl retries them
+                if journal and all(journal.is_done(pl_url) for pl_url in urls):
+                    journal.complete_letter(letter)
+
+            except Exception as e:
+                print(f"💥 Fatal error on letter {letter}: {e}")
+                continue
+
+    if crawl_state:
+        print(f"🗂️ Crawl state: {crawl_state.summary()}")
     return players_to_insert
 
 
 async def main():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        try:
-            players = await fetch_college_players(browser)
-            print(f"✅ Scraped {len(players)} players")
-        finally:
-            await browser.close()
+    players = await fetch_college_players()
+    print(f"✅ Scraped {len(players)} players")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,4 +1,4 @@
-from utils.helpers import launch_browser
+from utils.helpers import launch_browser, new_page
 from utils.hs_helpers import get_espn_star_count, is_rankings_finalized, parse_espn_bio, parse_city_state, normalize_position, parse_rivals_high_school
 
 async def safe_int(value):
@@ -10,7 +10,7 @@ async def safe_int(value):
 
 async def fetch_247_data(link):
     playwright, browser = await launch_browser(headless=True)
-    page = await browser.new_page()
+    page = await new_page(browser)
     await page.goto(link, wait_until='domcontentloaded', timeout=60000)
 
     lis = page.locator("ul.metrics-list li")
@@ -55,7 +55,7 @@ async def fetch_247_data(link):
 
 async def fetch_espn_data(link):
     playwright, browser = await launch_browser(headless=True)
-    page = await browser.new_page()
+    page = await new_page(browser)
     await page.goto(link, wait_until='domcontentloaded', timeout=60000)
 
     ul = page.locator("ul.mod-rating")
@@ -99,7 +99,7 @@ async def fetch_espn_data(link):
 
 async def fetch_rivals_data(link):
     playwright, browser = await launch_browser(headless=True)
-    page = await browser.new_page()
+    page = await new_page(browser)
     await page.goto(link, wait_until='domcontentloaded', timeout=60000)
 
     async def get_dd_by_dt_text(target_text):
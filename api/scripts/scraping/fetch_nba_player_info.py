@@ -1,12 +1,12 @@
-from utils.helpers import safe_goto, USER_AGENT
+from utils.crawl_state import fetch_if_changed
+from utils.scraper_runtime import SCRAPER_BACKEND, SCRAPER_CONCURRENCY, gather_bounded, html_fetcher
+from selectolax.parser import HTMLParser
 from datetime import datetime
 
 import hashlib
 import json
-import asyncio
 import string
 import re
-import random
 import traceback
 
 
@@ -31,49 +31,59 @@ def compute_college_player_hash(player_tuple):
     serialized = json.dumps(fields_to_hash, sort_keys=True)
     return hashlib.md5(serialized.encode()).hexdigest()
 
-async def scrape_player(browser, _, data):
+
+def _text(node):
+    """Element text with whitespace collapsed, close to the browser's innerText for these pages."""
+    return " ".join(node.text().split())
+
+
+def parse_player_index(html):
+    """Index table rows for one letter: the fields scrape_player expects in `data`."""
+    rows = []
+    for tr in HTMLParser(html).css("table#players tbody tr"):
+        a = tr.css_first('th[data-stat="player"] a')
+        if not a:
+            continue
+        cells = {td.attributes.get("data-stat"): td for td in tr.css("td")}
+        rows.append({
+            "name": _text(a),
+            "link": a.attributes.get("href"),
+            "yearMin": _text(cells["year_min"]) if "year_min" in cells else "",
+            "yearMax": _text(cells["year_max"]) if "year_max" in cells else "",
+            "position": _text(cells["pos"]) if "pos" in cells else "",
+            "height": _text(cells["height"]) if "height" in cells else "",
+            "weight": _text(cells["weight"]) if "weight" in cells else "",
+            "colleges": [_text(c) for c in cells["colleges"].css("a")] if "colleges" in cells else [],
+        })
+    return rows
+
+
+def parse_player_page(html):
+    """Bio paragraphs, team names and accolades from a basketball-reference player page."""
+    tree = HTMLParser(html)
+    # The full bio is in the HTML; the "more info" button only toggles its visibility
+    info_paragraphs = [text for text in (_text(p) for p in tree.css("div#info p")) if text]
+    teams_data = [a.attributes.get("data-tip") for a in tree.css("div.uni_holder a") if a.attributes.get("data-tip")]
+    accolades = [text for text in (a.text(strip=True) for a in tree.css("ul#bling li a")) if text]
+    return info_paragraphs, teams_data, accolades
+
+
+async def scrape_player(fetcher, data, crawl_state=None, journal=None):
+    """
+    Player tuple for one index row, or None when crawl_state says the page hasn't changed.
+    Successful results (including None) are recorded in the journal; failures are not, so a resumed crawl retries them.
+    """
     player_url = f"https://www.basketball-reference.com{data['link']}"
-    page = None
     try:
-        context = await browser.new_context()
-        page = await context.new_page()
-        await page.set_extra_http_headers({"User-Agent": USER_AGENT})
-
-        await safe_goto(browser, page, player_url)
-
-        # Optional "more info" click
-        try:
-            await page.click("#meta_more_button", timeout=3000)
-            await page.wait_for_selector("div#info p", timeout=5000)
-        except:
-            pass
-
-        info_paragraphs = await page.evaluate('''() => {
-            const infoDiv = document.querySelector("div#info");
-            if (!infoDiv) return [];
-            return Array.from(infoDiv.querySelectorAll("p"))
-                        .map(p => p.innerText.trim())
-                        .filter(Boolean);
-        }''')
-
-        teams_data = await page.evaluate('''() => {
-            const uniDiv = document.querySelector("div.uni_holder");
-            if (!uniDiv) return [];
-            return Array.from(uniDiv.querySelectorAll("a"))
-                        .map(a => a.getAttribute("data-tip"))
-                        .filter(Boolean);
-        }''')
+        html = await fetch_if_changed(fetcher, player_url, crawl_state)
+        if html is None:
+            if journal:
+                journal.record(player_url, None)
+            return None
+        info_paragraphs, teams_data, accolades = parse_player_page(html)
 
         team_names = list({tip.split(",",1)[0].strip() for tip in teams_data})
 
-        accolades = await page.evaluate('''() => {
-            const blingList = document.querySelector("ul#bling");
-            if (!blingList) return [];
-            return Array.from(blingList.querySelectorAll("li a"))
-                        .map(a => a.textContent.trim())
-                        .filter(Boolean);
-        }''')
-
         years_pro = draft_round = draft_pick = draft_year = high_schools = None
 
         for p_text in info_paragraphs:
@@ -125,115 +135,85 @@ async def scrape_player(browser, _, data):
         )
         
         print(player_tuple)
-        
+
+        if journal:
+            journal.record(player_url, player_tuple)
         return player_tuple
 
     except Exception:
         print(f"⚠️ Error scraping {player_url}:\n{traceback.format_exc()}")
+        if crawl_state:
+            crawl_state.discard(player_url)
         return (
             data["name"], player_url, int(data.get("yearMin") or 0),
             int(data.get("yearMax") or 0), data["position"], data.get("height"),
             data.get("weight"), [], None, None, None, None, [], data.get("colleges") or [], [], False
         )
-    finally:
-        if page:
-            await page.close()
-        
-        if context:
-            await context.close()
 
 
-async def fetch_college_players(browser, existing_players=None, batch_size=3, letter_delay_range=(5,10)):
-    if existing_players is None:
-        existing_players = {}
+async def fetch_nba_players(resume_letter="a", concurrency=SCRAPER_CONCURRENCY, backend=SCRAPER_BACKEND,
+                            crawl_state=None, journal=None, sink=None):
+    """
+    Scrape every player in the basketball-reference A-Z index. Player pages are
+    fetched `concurrency` at a time (plain HTTP by default, see
+    utils.scraper_runtime.html_fetcher), paced by the per-site rate limiter.
+    Returns player tuples (see scrape_player), deduplicated by hash. With a
+    crawl_state only changed pages are parsed; the caller flushes it after inserting.
+
+    With a journal (utils.crawl_journal.CrawlJournal) every finished player is
+    appended as it completes, and a restarted crawl replays those results and
+    carries on from the first unfinished page.
 
+    With a sink (an asyncio.Queue, see utils.ingest_pipeline) each player is put
+    on it as soon as it is scraped and the returned list stays empty.
+    """
     players_to_insert = []
     seen_hashes = set()
-
-    index_page = await browser.new_page()
-    await index_page.set_extra_http_headers({"User-Agent": USER_AGENT})
-
-    for letter in string.ascii_lowercase:
-        url = f"https://www.sports-reference.com/cbb/players/{letter}-index.html"
-        try:
-            index_page = await safe_goto(browser, index_page, url)
-            p_elements = await index_page.query_selector_all("#content p")
-            print(f"🔍 Found {len(p_elements)} p tags for letter {letter}")
-
-            batch = []
-            for p in p_elements:
-                player_a = await p.query_selector("a")
-                if not player_a:
-                    continue
-
-                player_name = (await player_a.inner_text()).strip()
-                href = await player_a.get_attribute("href")
-                if not href or not player_name or player_name.startswith("_") or not re.match(r"^[A-Za-z]", player_name):
-                    continue
-
-                # Extract years and schools
-                small = await p.query_selector("small.note")
-                years = ""
-                schools = []
-                if small:
-                    raw_small_text = await small.inner_text()
-                    match = re.search(r"\(\d{4}\s*[-–]\s*\d{4}\)", raw_small_text)
-                    if match:
-                        years = match.group(0)
-                    school_links = await small.query_selector_all("a")
-                    for a in school_links:
-                        school_href = await a.get_attribute("href")
-                        if school_href and "/men/" in school_href:
-                            school_name = (await a.inner_text()).strip()
-                            schools.append({"name": school_name, "href": school_href})
-
-                if not schools:
-                    continue
-
-                player_obj = {
-                    "name": player_name,
-                    "href": href,
-                    "years": years,
-                    "schools": schools,
-                    "position": "",
-                    "height": "",
-                    "weight": None,
-                    "awards": []
-                }
-
-                batch.append(player_obj)
-
-                # Process batch when full
-                if len(batch) >= batch_size:
-                    await _process_player_batch(browser, batch, players_to_insert, seen_hashes)
-                    batch = []
-
-            # Process remaining players in batch
-            if batch:
-                await _process_player_batch(browser, batch, players_to_insert, seen_hashes)
-
-            print(f"✅ Found {len(players_to_insert)} men’s players for letter {letter}")
-            await asyncio.sleep(random.uniform(*letter_delay_range))
-
-        except Exception as e:
-            print(f"⚠️ Failed to load letter {letter}: {e}")
-            continue
-
-    await index_page.close()
-    return players_to_insert
-
-async def _process_player_batch(browser, batch, players_to_insert, seen_hashes):
-    """Helper to scrape and deduplicate a batch of players."""
-    for player_obj in batch:
-        try:
-            player_obj = await scrape_player(browser, player_obj)
-            player_hash = compute_college_player_hash(player_obj)
-            if player_hash in seen_hashes:
+    letters = string.ascii_lowercase[string.ascii_lowercase.index(resume_letter):]
+
+    async def collect(player_tuple):
+        if player_tuple is None:
+            return
+        player_hash = compute_college_player_hash(player_tuple)
+        if player_hash in seen_hashes:
+            return
+        seen_hashes.add(player_hash)
+        if sink is not None:
+            await sink.put(player_tuple)
+        else:
+            players_to_insert.append(player_tuple)
+
+    if journal:
+        for player in journal.results():
+            await collect(tuple(player) if player is not None else None)
+
+    async with html_fetcher(concurrency, backend) as fetcher:
+
+        async def scrape_and_collect(data):
+            await collect(await scrape_player(fetcher, data, crawl_state, journal))
+
+        for letter in letters:
+            if journal and journal.letter_done(letter):
+                continue
+            url = f"https://www.basketball-reference.com/players/{letter}/"
+            try:
+                index_rows = parse_player_index(await fetcher.html(url))
+                print(f"🔍 Found {len(index_rows)} players for letter {letter}")
+                urls = [f"https://www.basketball-reference.com{row['link']}" for row in index_rows]
+                if journal:
+                    index_rows = [row for row, row_url in zip(index_rows, urls) if not journal.is_done(row_url)]
+
+                await gather_bounded(index_rows, scrape_and_collect, fetcher.size)
+
+                # Failed pages aren't journaled; leave the letter open so a resumed crawl retries them
+                if journal and all(journal.is_done(row_url) for row_url in urls):
+                    journal.complete_letter(letter)
+                print(f"✅ {len(seen_hashes)} NBA players scraped through letter {letter}")
+
+            except Exception as e:
+                print(f"⚠️ Failed to load letter {letter}: {e}")
                 continue
-            seen_hashes.add(player_hash)
-            players_to_insert.append(player_obj)
-        except Exception as e:
-            print(f"⚠️ Error scraping {player_obj['name']}: {e}")
-            continue
-    await asyncio.sleep(random.uniform(2, 5))
 
+    if crawl_state:
+        print(f"🗂️ Crawl state: {crawl_state.summary()}")
+    return players_to_insert
@@ -1,8 +1,9 @@
+from utils.helpers import new_page
 from utils.hs_helpers import parse_school, parse_247_metrics, normalize_espn_height, get_espn_star_count, is_rankings_finalized
 
 async def fetch_247_sports_info(class_years, browser):
     rankings_247 = []
-    page = await browser.new_page()
+    page = await new_page(browser)
 
     try:
         for class_year in class_years:
@@ -10,15 +11,6 @@ async def fetch_247_sports_info(class_years, browser):
             await page.goto(url, wait_until='domcontentloaded', timeout=120000)
             await page.wait_for_selector("ul.rankings-page__list", timeout=10000)
 
-            # Scroll each player into view to force image loading
-            players_selector = "li.rankings-page__list-item"
-            players = await page.query_selector_all(players_selector)
-            
-            for player in players:
-                await player.scroll_into_view_if_needed()
-                await page.wait_for_timeout(200)  # small wait to let image load
-
-            # After scrolling all into view, extract data
             players_data = await page.evaluate('''() => {
                 return Array.from(document.querySelectorAll('li.rankings-page__list-item')).map(wrapper => {
                     const aTag = wrapper.querySelector('a');
@@ -26,8 +18,18 @@ async def fetch_247_sports_info(class_years, browser):
                     if (playerLink?.startsWith('/')) {
                         playerLink = 'https://247sports.com' + playerLink;
                     }
+                    // Images are blocked and never scrolled into view, so read the lazy-load
+                    // attributes; src is only a placeholder until the image loads
                     const imgTag = wrapper.querySelector('.circle-image-block img');
-                    let playerImageLink = imgTag?.getAttribute('src') || null;
+                    const srcset = imgTag?.getAttribute('data-srcset') || imgTag?.getAttribute('srcset');
+                    const candidates = [
+                        imgTag?.getAttribute('data-src'),
+                        imgTag?.getAttribute('data-lazy-src'),
+                        imgTag?.getAttribute('data-original'),
+                        srcset ? srcset.split(',')[0].trim().split(/\\s+/)[0] : null,
+                        imgTag?.getAttribute('src')
+                    ];
+                    const playerImageLink = candidates.find(src => src && !src.startsWith('data:')) || null;
                     return {
                         playerName: aTag?.innerText.trim() || null,
                         playerLink,
@@ -68,14 +70,14 @@ async def fetch_247_sports_info(class_years, browser):
     except Exception as e:
         print(f"⚠️ Error scraping 247sports: {e}")
     finally:
-        await page.close()
+        await page.context.close()
 
     return rankings_247
 
 
 async def fetch_espn_info(class_year, browser):
     espn_rankings = []
-    page = await browser.new_page()
+    page = await new_page(browser)
 
     try:
         url = f'https://www.espn.com/college-sports/basketball/recruiting/rankings/scnext300boys/_/class/{class_year}/order/true'
@@ -149,14 +151,14 @@ async def fetch_espn_info(class_year, browser):
     except Exception as e:
         print(f"⚠️ Error scraping ESPN {class_year}: {e}")
     finally:
-        await page.close()
+        await page.context.close()
 
     return espn_rankings
 
 
 async def fetch_rivals_info(class_year, browser):
     rivals_players = []
-    page = await browser.new_page()
+    page = await new_page(browser)
 
     try:
         url = f"https://www.on3.com/rivals/rankings/player/basketball/{class_year}/"
@@ -274,6 +276,6 @@ async def fetch_rivals_info(class_year, browser):
     except Exception as e:
         print(f"⚠️ Error scraping Rivals {class_year}: {e}")
     finally:
-        await page.close()
+        await page.context.close()
 
     return rivals_players
\ No newline at end of file
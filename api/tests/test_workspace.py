@@ -0,0 +1,25 @@
+import os
+
+from core.workspace import WorkspaceManager
+
+
+def _write(path: str, nbytes: int):
+    with open(path, "wb") as f:
+        f.write(b"\0" * nbytes)
+
+
+def test_eviction_books_reservation_for_requesting_job(tmp_path):
+    manager = WorkspaceManager(root=str(tmp_path / "workspace"), max_bytes=1000)
+
+    idle = manager.create_job("idle")
+    _write(os.path.join(idle.downloads, "video.mp4"), 700)
+    idle.finish()
+
+    job = manager.create_job("reel")
+    job.reserve(600)  # only fits once the idle job is evicted
+
+    assert manager.get_job(idle.job_id) is None
+    assert manager._reserved == {job.job_id: 600}
+
+    job.release()
+    assert manager._reserved == {}
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+
+from cachetools import TTLCache
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Optional
+
+# How long a stored analysis is reused before the LLM is asked again
+AI_CACHE_TTL_HOURS = int(os.getenv("AI_CACHE_TTL_HOURS", "168"))
+
+# Hot entries are also kept in-process so repeats skip the DB round trip
+_memory_cache = TTLCache(maxsize=512, ttl=3600)
+# The DB helpers run in worker threads (see cached_analysis) and TTLCache isn't thread-safe
+_memory_lock = threading.Lock()
+
+select_sql = """
+    SELECT response_json FROM ai_analysis_cache
+    WHERE cache_key = %s AND expires_at > UTC_TIMESTAMP()
+"""
+
+upsert_sql = """
+    INSERT INTO ai_analysis_cache (cache_key, kind, model, prompt_version, response_json, expires_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        response_json = VALUES(response_json),
+        created_at = CURRENT_TIMESTAMP,
+        expires_at = VALUES(expires_at)
+"""
+
+def _canonical(value: Any) -> Any:
+    """JSON-safe form with stable ordering: dict keys sorted, Decimals and dates stringified."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def snapshot_hash(data: Any) -> str:
+    """Short content hash of the stats/evaluations a prompt was built from."""
+    payload = json.dumps(_canonical(data), separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def analysis_cache_key(kind: str, model: str, prompt_version: int, **inputs) -> str:
+    """
+    Canonical key for an analysis: the kind, model and prompt template version
+    plus every prompt input (player ids, mode, stat snapshot hash, ...).
+    Callers sort inputs whose order doesn't change the answer.
+    """
+    payload = json.dumps(
+        {"kind": kind, "model": model, "prompt_version": prompt_version, "inputs": _canonical(inputs)},
+        separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_cached_analysis(cache_key: str) -> Optional[Any]:
+    """Return a stored, unexpired analysis, or None on a miss or DB error. Blocking; see cached_analysis."""
+    with _memory_lock:
+        value = _memory_cache.get(cache_key)
+    if value is not None:
+        return value
+
+    conn = cursor = None
+    try:
+        from core.db import get_db_connection
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(select_sql, (cache_key,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        value = row["response_json"]
+        if isinstance(value, str):
+            value = json.loads(value)
+        with _memory_lock:
+            _memory_cache[cache_key] = value
+        return value
+    except Exception as e:
+        print(f"⚠️ Could not read AI analysis cache: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def save_analysis(cache_key: str, kind: str, model: str, prompt_version: int, value: Any):
+    """Store an analysis for AI_CACHE_TTL_HOURS. Failures are logged, never raised. Blocking; see cached_analysis."""
+    with _memory_lock:
+        _memory_cache[cache_key] = value
+
+    conn = cursor = None
+    try:
+        from core.db import get_db_connection
+
+        expires_at = datetime.utcnow() + timedelta(hours=AI_CACHE_TTL_HOURS)
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(upsert_sql, (cache_key, kind, model, prompt_version, json.dumps(value), expires_at))
+        conn.commit()
+    except Exception as e:
+        print(f"⚠️ Could not write AI analysis cache: {e}")
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+async def cached_analysis(
+    kind: str,
+    model: str,
+    prompt_version: int,
+    inputs: dict,
+    compute: Callable[[], Awaitable[Any]],
+    bypass: bool = False,
+) -> Any:
+    """
+    Reuse a stored analysis for identical inputs, or await `compute()` and store it.
+    With bypass=True the cache is not read, but the fresh result replaces the stored one.
+    The DB round trips run in worker threads so they don't stall the event loop.
+    """
+    cache_key = analysis_cache_key(kind, model, prompt_version, **inputs)
+    if not bypass:
+        cached = await asyncio.to_thread(get_cached_analysis, cache_key)
+        if cached is not None:
+            print(f"♻️ AI analysis cache hit for {kind}")
+            return cached
+
+    value = await compute()
+    await asyncio.to_thread(save_analysis, cache_key, kind, model, prompt_version, value)
+    return value
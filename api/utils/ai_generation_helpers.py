@@ -1,8 +1,6 @@
-import re
-import json
-
 from core.db import get_db_connection
 from datetime import datetime
+from utils.llm_json import loads_llm_json, parse_llm_json, record_failure
 
 def fetch_players(select_sql):
     conn = get_db_connection()
@@ -13,15 +11,6 @@ def fetch_players(select_sql):
     conn.close()
     return rows
 
-def fetch_nba_player_info(select_sql_per_player, player_uid):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(select_sql_per_player, (player_uid, ))
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return row
-
 def hs_ai_report_exists(player_uid, class_year):
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -35,90 +24,54 @@ def hs_ai_report_exists(player_uid, class_year):
     
     return exists
 
-def nba_ai_report_exists(player_uid, is_active):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM ai_generated_nba_evaluations WHERE player_uid = %s LIMIT 1", (player_uid,))
-    exists = cursor.fetchone() is not None
-    cursor.close()
-    conn.close()
-    
-    if (exists):
-        return True
-    
-    return exists
-
-def extract_first_json_object(text):
-    # First, try to find a code block
-    fenced_code = re.search(r"```json\s*([\s\S]*?)```", text)
-    if fenced_code:
-        text = fenced_code.group(1).strip()
-    else:
-        fenced_code = re.search(r"```([\s\S]*?)```", text)
-        if fenced_code:
-            text = fenced_code.group(1).strip()
+def parse_json_report(text):
+    return parse_llm_json(text, expect="object")
 
-    start = text.find('{')
-    if start == -1:
-        return text
-    brace_count = 0
-    for i, ch in enumerate(text[start:], start=start):
+def split_json_objects(text):
+    """
+    Every top-level {...} in text. Counts braces only, so an unescaped quote
+    in one report doesn't swallow the rest.
+    """
+    objects, depth, start = [], 0, None
+    for i, ch in enumerate(text):
         if ch == '{':
-            brace_count += 1
-        elif ch == '}':
-            brace_count -= 1
-            if brace_count == 0:
-                return text[start:i+1]
-    return text[start:]
-
-def fix_ai_analysis_quotes(text):
-    key = '"aiAnalysis":'
-    idx = text.find(key)
-    if idx == -1:
-        return text
-
-    start_quote = text.find('"', idx + len(key))
-    if start_quote == -1:
-        return text
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == '}' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                objects.append(text[start:i+1])
+    return objects
 
-    result = []
-    i = start_quote + 1
-    while i < len(text):
-        ch = text[i]
-        if ch == '"' and text[i-1] != '\\':
-            # Look ahead to see if this ends the value
-            j = i + 1
-            while j < len(text) and text[j] in " \n\r\t":
-                j += 1
-            if j < len(text) and text[j] in ",}":
-                break  # closing quote
-            result.append('\\"')
-            i += 1
-            continue
-        result.append(ch)
-        i += 1
-
-    fixed_value = ''.join(result)
-    return text[:start_quote+1] + fixed_value + text[i:]
-
-def parse_json_report(text):
-    cleaned = extract_first_json_object(text)
+def parse_json_report_batch(text):
+    """
+    Parse a batch response (a JSON array of reports). If the array as a whole
+    can't be parsed, each object is parsed on its own, so one bad report
+    doesn't lose the rest.
+    """
     try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
-        fixed = fix_ai_analysis_quotes(cleaned)
+        parsed = loads_llm_json(text, expect="array")
+        if isinstance(parsed, list):
+            return [item for item in parsed if isinstance(item, dict)]
+    except ValueError:
+        pass
+
+    reports = []
+    for obj in split_json_objects(text):
         try:
-            return json.loads(fixed)
-        except Exception as e2:
-            print(f"JSON parse error even after cleanup and fix: {e2}\nOriginal text:\n{text}")
-            return None
+            reports.append(loads_llm_json(obj))
+        except ValueError:
+            record_failure(obj)
+    return reports
 
-def insert_report(player_uid, stars, rating, strengths, weaknesses, ai_analysis, insert_sql):
+def insert_reports(rows, insert_sql):
+    """Upsert many report rows (in insert_sql's column order) in one commit."""
     conn = get_db_connection()
     cursor = conn.cursor()
-    strengths_json = json.dumps(strengths)
-    weaknesses_json = json.dumps(weaknesses)
-    cursor.execute(insert_sql, (player_uid, stars, rating, strengths_json, weaknesses_json, ai_analysis))
-    conn.commit()
-    cursor.close()
-    conn.close()
\ No newline at end of file
+    try:
+        cursor.executemany(insert_sql, rows)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
@@ -29,6 +29,19 @@ Rules:
 - The `aiAnalysis` value must be plain text only, without any web addresses, parentheses linking to websites, or source credits.
 """
 
+# Stored with every scouting report; bump when SYSTEM_PROMPT or the report user content changes
+# so a refresh run regenerates reports written with the old prompt
+SCOUTING_REPORT_PROMPT_VERSION = 1
+
+# Appended to a report system prompt in batch mode: several players per request, one object each in a JSON array
+BATCH_REPORT_RULES = """
+Batch requests:
+- The user may ask for several players at once. Each player is introduced with "Player id: <id>".
+- In that case return ONLY a JSON array with one report object per player, in the same order, and no other text.
+- Each object must have an "id" field with the player's id (as a string) in addition to the fields above.
+- Evaluate every player independently, exactly as if they had been asked about alone.
+"""
+
 SYSTEM_PROMPT_LINEUP_BUILDER = """
 You are a basketball expert, and you understand the game of basketball at a high level.
 
@@ -264,4 +277,13 @@ def matchup_simulation_content(lineup1, lineup2):
     Provide an analysis for a matchup between these two teams: {lineup1} versus {lineup2}
     """
     
-    return user_content
\ No newline at end of file
+    return user_content
+
+def batch_report_content(players):
+    """Pack (id, user_content) pairs into one batch request."""
+    blocks = "\n\n".join(f"Player id: {player_id}\n{content.strip()}" for player_id, content in players)
+    user_content = f"""Give me a scouting report for each of these {len(players)} players. Return a JSON array of {len(players)} objects in the same order, each with its "id".
+
+    {blocks}"""
+
+    return user_content
@@ -0,0 +1,338 @@
+import concurrent.futures
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from typing import Callable, Dict, List, Optional
+
+from core.llm_client import chat_completion_sync
+from utils.ai_generation_helpers import insert_reports, parse_json_report, parse_json_report_batch
+from utils.ai_prompts import BATCH_REPORT_RULES, batch_report_content
+from utils.llm_json import json_mode_kwargs
+
+load_dotenv()
+
+# Upper bound for in-flight report requests; the engine backs off below it on 429s
+REPORT_MAX_CONCURRENCY = int(os.getenv("REPORT_MAX_CONCURRENCY", "8"))
+# Reports written per upsert round trip
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", "25"))
+# Where per-run progress is saved so an interrupted run picks up where it stopped
+REPORT_CHECKPOINT_DIR = os.getenv("REPORT_CHECKPOINT_DIR", "checkpoints")
+# Players packed into one request (one system prompt for all of them); 1 = one request per player
+REPORT_PLAYERS_PER_REQUEST = int(os.getenv("REPORT_PLAYERS_PER_REQUEST", "1"))
+
+RATE_LIMIT_RETRIES = 5
+
+
+class ReportParseError(ValueError):
+    """The model answered, but not with a usable JSON report. Retrying the same prompt won't help."""
+
+
+def is_rate_limited(error: Exception) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    err_str = str(error).lower()
+    return "429" in err_str or "rate limit" in err_str or "resource_exhausted" in err_str
+
+
+class AimdLimiter:
+    """
+    Concurrency limit that adapts to the provider: additive increase (one more
+    slot per `limit` successes) and multiplicative decrease (halve on a 429).
+    Decreases are ignored for `cooldown` seconds after the last one, so a burst
+    of 429s from requests already in flight only halves the limit once.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: Optional[int] = None, cooldown: float = 5.0):
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.limit = float(initial or max(min_limit, self.max_limit // 2))
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def on_rate_limit(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit / 2)
+            print(f"⚠️ Rate limited, concurrency down to {int(self.limit)}")
+
+
+class ReportCheckpoint:
+    """
+    Per-run progress file: player_uids whose reports are committed and those that
+    failed permanently (the model's output couldn't be parsed). Written atomically
+    after every batch; committed ids are cleared once a run completes.
+    """
+
+    def __init__(self, name: str, directory: str = REPORT_CHECKPOINT_DIR):
+        self.path = os.path.join(directory, f"{name}.json")
+        self.done = set()
+        self.failed: Dict[str, str] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.failed = data.get("failed", {})
+            print(f"♻️ Resuming {name}: {len(self.done)} done, {len(self.failed)} failed")
+
+    def should_skip(self, player_uid, retry_failed: bool = False) -> bool:
+        key = str(player_uid)
+        return key in self.done or (not retry_failed and key in self.failed)
+
+    def mark_done(self, player_uids):
+        for uid in player_uids:
+            self.done.add(str(uid))
+            self.failed.pop(str(uid), None)
+
+    def mark_failed(self, player_uid, reason: str):
+        self.failed[str(player_uid)] = reason
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "failed": self.failed}, f)
+        os.replace(tmp_path, self.path)
+
+
+class ReportStats:
+    """Throughput and token usage for one run, to compare batched and per-player generation."""
+
+    def __init__(self):
+        self.requests = 0
+        self.reports = 0
+        self.fallbacks = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record_request(self, response):
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            self.requests += 1
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.completion_tokens += usage.completion_tokens or 0
+
+    def record_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        per_report = max(1, self.reports)
+        return {
+            "reports": self.reports,
+            "requests": self.requests,
+            "fallbacks": self.fallbacks,
+            "seconds": elapsed,
+            "players_per_minute": self.reports / elapsed * 60 if elapsed else 0.0,
+            "prompt_tokens_per_report": self.prompt_tokens / per_report,
+            "completion_tokens_per_report": self.completion_tokens / per_report,
+        }
+
+
+class ReportEngine:
+    """
+    Generates AI scouting reports for many players. Callers prefilter players
+    that already have reports (one anti-join) and prefetch each player's prompt
+    context in bulk, so a task is only the LLM call. Concurrency adapts to rate
+    limits, results are upserted in batches on one connection, and progress is
+    checkpointed so a crashed run resumes without repeating finished players.
+
+    Each row also carries the player's input_fingerprint (computed in the
+    caller's select) and the prompt version, so later runs can regenerate only
+    reports whose inputs or prompt changed.
+
+    With players_per_request > 1, players are packed into one request that
+    returns a JSON array; any player missing or malformed in the array is
+    retried with its own single-player request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        insert_sql: str,
+        system_prompt: str,
+        build_content: Callable[[dict], str],
+        model: str = "gemini-2.5-flash",
+        max_concurrency: int = REPORT_MAX_CONCURRENCY,
+        batch_size: int = REPORT_BATCH_SIZE,
+        players_per_request: int = REPORT_PLAYERS_PER_REQUEST,
+        prompt_version: Optional[int] = None,
+    ):
+        self.name = name
+        self.insert_sql = insert_sql
+        self.system_prompt = system_prompt
+        self.build_content = build_content
+        self.model = model
+        self.batch_size = batch_size
+        self.players_per_request = max(1, players_per_request)
+        self.prompt_version = prompt_version
+        self.max_concurrency = max_concurrency
+        self.limiter = AimdLimiter(max_concurrency)
+        self.checkpoint = ReportCheckpoint(name)
+        self.stats = ReportStats()
+
+    def _complete(self, messages: list, label: str, **kwargs) -> str:
+        for attempt in range(RATE_LIMIT_RETRIES):
+            with self.limiter:
+                try:
+                    response = chat_completion_sync(model=self.model, messages=messages, **kwargs)
+                    self.limiter.on_success()
+                    self.stats.record_request(response)
+                    return response.choices[0].message.content
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt == RATE_LIMIT_RETRIES - 1:
+                        raise
+                    self.limiter.on_rate_limit()
+            # Back off outside the limiter so the slot goes to a request that can use it
+            wait = 2 ** attempt
+            print(f"Rate limited. Retrying {label} in {wait}s...")
+            time.sleep(wait)
+
+    def _report_row(self, player: dict, parsed: dict) -> tuple:
+        return (
+            player["player_uid"],
+            parsed.get("stars", None),
+            parsed.get("rating", None),
+            json.dumps(parsed.get("strengths", [])),
+            json.dumps(parsed.get("weaknesses", [])),
+            parsed.get("aiAnalysis", ""),
+            player.get("input_fingerprint"),
+            self.prompt_version,
+        )
+
+    def _process_single(self, player: dict) -> tuple:
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self.build_content(player)},
+        ]
+        parsed = parse_json_report(self._complete(messages, player["full_name"], **json_mode_kwargs()))
+        if not parsed:
+            raise ReportParseError("could not parse JSON report")
+        return self._report_row(player, parsed)
+
+    def _process_batch(self, players: List[dict]) -> List[tuple]:
+        """(player, row or exception) for each player in the chunk."""
+        if len(players) == 1:
+            try:
+                return [(players[0], self._process_single(players[0]))]
+            except Exception as e:
+                return [(players[0], e)]
+
+        by_id = {}
+        try:
+            messages = [
+                {"role": "system", "content": self.system_prompt + BATCH_REPORT_RULES},
+                {"role": "user", "content": batch_report_content(
+                    [(str(p["player_uid"]), self.build_content(p)) for p in players]
+                )},
+            ]
+            raw = self._complete(messages, f"batch of {len(players)}")
+            by_id = {str(r.get("id")): r for r in parse_json_report_batch(raw)}
+        except Exception as e:
+            if is_rate_limited(e):
+                return [(p, e) for p in players]
+            print(f"Batch request failed, falling back to single requests: {e}")
+
+        results = []
+        for player in players:
+            parsed = by_id.get(str(player["player_uid"]))
+            if parsed and "rating" in parsed and "aiAnalysis" in parsed:
+                results.append((player, self._report_row(player, parsed)))
+                continue
+            self.stats.record_fallback()
+            try:
+                results.append((player, self._process_single(player)))
+            except Exception as e:
+                results.append((player, e))
+        return results
+
+    def _flush(self, rows: List[tuple], dry_run: bool = False):
+        if not rows:
+            return
+        if not dry_run:
+            insert_reports(rows, self.insert_sql)
+            self.checkpoint.mark_done(row[0] for row in rows)
+            self.checkpoint.save()
+        rows.clear()
+
+    def run(self, players: List[dict], retry_failed: bool = False, dry_run: bool = False) -> dict:
+        """
+        Generate and store reports; returns ReportStats.summary(). dry_run
+        generates without writing reports or the checkpoint (for benchmarks).
+        """
+        todo = [p for p in players if not self.checkpoint.should_skip(p["player_uid"], retry_failed)]
+        print(f"🧠 {self.name}: {len(todo)} reports to generate ({len(players) - len(todo)} skipped by checkpoint)")
+        self.stats = ReportStats()
+        if not todo:
+            return self.stats.summary()
+
+        chunks = [todo[i:i + self.players_per_request] for i in range(0, len(todo), self.players_per_request)]
+        pending_rows, failed = [], 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [executor.submit(self._process_batch, chunk) for chunk in chunks]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    for player, result in future.result():
+                        if isinstance(result, Exception):
+                            failed += 1
+                            print(f"Error processing {player['full_name']}: {result}")
+                            # Only unparseable output is permanent; timeouts, 5xx and 429s are retried next run
+                            if isinstance(result, ReportParseError) and not dry_run:
+                                self.checkpoint.mark_failed(player["player_uid"], str(result)[:200])
+                        else:
+                            pending_rows.append(result)
+                            self.stats.reports += 1
+
+                    if len(pending_rows) >= self.batch_size:
+                        self._flush(pending_rows, dry_run)
+                        summary = self.stats.summary()
+                        print(f"✅ {self.stats.reports}/{len(todo)} reports ({summary['players_per_minute']:.1f}/min, "
+                              f"concurrency {int(self.limiter.limit)})")
+            finally:
+                # Commit whatever finished, even if the run is interrupted
+                for future in futures:
+                    future.cancel()
+                self._flush(pending_rows, dry_run)
+                if not dry_run:
+                    self.checkpoint.save()
+
+        if not dry_run:
+            # The run finished: only failures need remembering, so the next full run starts clean
+            self.checkpoint.done.clear()
+            self.checkpoint.save()
+
+        summary = self.stats.summary()
+        print(f"🏁 {self.name}: {summary['reports']} reports, {failed} failed in {summary['seconds']:.0f}s "
+              f"({summary['players_per_minute']:.1f} players/min, {summary['requests']} requests, "
+              f"{summary['fallbacks']} single-player fallbacks, "
+              f"{summary['prompt_tokens_per_report']:.0f} prompt + {summary['completion_tokens_per_report']:.0f} "
+              f"completion tokens/report)")
+        return summary
@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+from fastapi import HTTPException
+from typing import Any, Callable, List, Optional, Tuple
+
+from core.llm_client import stream_chat_completion
+from utils.llm_json import json_mode_kwargs, loads_llm_json
+
+
+class IncrementalJsonObject:
+    """
+    Parses a JSON object as it streams in. feed() returns each top-level
+    member as soon as its value is complete, so clients can render fields
+    before the model has finished. Anything before the first '{' (such as a
+    ```json fence) and after the closing '}' is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.start = None
+        self.end = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        members = []
+        text = self.text
+
+        while self._pos < len(text) and not self.done:
+            i, ch = self._pos, text[self._pos]
+            self._pos += 1
+
+            if self.start is None:
+                if ch == "{":
+                    self.start = i
+                    self._depth = 1
+                    self._member_start = i + 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    members += self._member(text[self._member_start:i])
+                    self.end = i
+            elif ch == "," and self._depth == 1:
+                members += self._member(text[self._member_start:i])
+                self._member_start = i + 1
+
+        return members
+
+    @staticmethod
+    def _member(fragment: str) -> List[Tuple[str, Any]]:
+        if not fragment.strip():
+            return []
+        try:
+            return list(json.loads("{" + fragment + "}").items())
+        except json.JSONDecodeError:
+            return []  # the full reply is parsed (and repaired) once the stream ends
+
+
+def _event(event: str, data: Any) -> dict:
+    return {"event": event, "data": data if isinstance(data, str) else json.dumps(data, default=str)}
+
+
+async def stream_analysis_events(
+    model: str,
+    messages: list,
+    required_keys: List[str],
+    finalize: Callable[[dict], dict],
+    cached: Optional[dict] = None,
+):
+    """
+    Server-sent events for one JSON analysis:
+      token  - raw text delta from the model
+      field  - {"key", "value"} for each top-level field once it is complete
+      result - finalize(analysis), called in a worker thread after the full object
+               validates, so its blocking writes (persist here) don't stall the loop
+      error  - {"detail"} if the request, parsing or finalize fails
+    A `cached` analysis skips the model and goes straight to result.
+    """
+    try:
+        if cached is not None:
+            yield _event("result", await asyncio.to_thread(finalize, cached))
+            return
+
+        parser = IncrementalJsonObject()
+        async for delta in stream_chat_completion(model=model, messages=messages, **json_mode_kwargs()):
+            yield _event("token", delta)
+            for key, value in parser.feed(delta):
+                yield _event("field", {"key": key, "value": value})
+
+        # The whole reply goes through the shared parser, which can repair what field events skipped
+        try:
+            analysis = loads_llm_json(parser.text)
+        except ValueError as e:
+            raise HTTPException(status_code=500, detail=f"AI analysis did not return valid JSON: {str(e)}")
+
+        if not all(key in analysis for key in required_keys):
+            raise HTTPException(status_code=500, detail=f"AI JSON is missing required keys | OUTPUT: {analysis}")
+
+        yield _event("result", await asyncio.to_thread(finalize, analysis))
+
+    except HTTPException as e:
+        yield _event("error", {"detail": e.detail})
+    except Exception as e:
+        print(f"🔥 Streaming AI analysis failed: {e}")
+        yield _event("error", {"detail": f"AI request failed: {str(e)}"})
@@ -0,0 +1,100 @@
+import json
+import os
+
+from dotenv import load_dotenv
+from typing import Any, Iterator, Set
+
+load_dotenv()
+
+# Where crawl journals live while a crawl is unfinished
+CRAWL_JOURNAL_DIR = os.getenv("CRAWL_JOURNAL_DIR", "checkpoints")
+
+
+class CrawlJournal:
+    """
+    Append-only JSONL record of one crawl. Every finished page is one line
+    ({"url", "result"}), written and flushed as soon as it finishes, and
+    {"letter"} marks an index letter whose pages are all done. A restarted
+    crawl replays the journal: finished letters are skipped entirely, finished
+    pages within a letter are not fetched again, and their results feed the
+    insertion step like freshly scraped ones. Appending costs the same per page
+    however large the crawl gets.
+
+    A torn last line from a crash is dropped. finish() deletes the journal once
+    the crawl's results are stored, so the next run starts from scratch.
+    """
+
+    def __init__(self, name: str, directory: str = CRAWL_JOURNAL_DIR):
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self.done: Set[str] = set()
+        self.letters: Set[str] = set()
+        self._file = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "rb+") as f:
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    f.truncate(end)  # drop a line torn by a crash before appending after it
+
+            for line in data[:end].decode("utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "letter" in entry:
+                    self.letters.add(entry["letter"])
+                else:
+                    self.done.add(entry["url"])
+            print(f"♻️ Resuming {self.name}: {len(self.letters)} letters and {len(self.done)} pages already crawled")
+        return self
+
+    def is_done(self, url: str) -> bool:
+        return url in self.done
+
+    def letter_done(self, letter: str) -> bool:
+        return letter in self.letters
+
+    def results(self) -> Iterator[Any]:
+        """
+        Stream the results recorded so far from disk, in crawl order. Pages that
+        were skipped as unchanged are None.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "url" in entry:
+                    yield entry["result"]
+
+    def _append(self, entry: dict):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry, default=str) + "\n")
+        self._file.flush()
+
+    def record(self, url: str, result: Any):
+        self.done.add(url)
+        self._append({"url": url, "result": result})
+
+    def complete_letter(self, letter: str):
+        self.letters.add(letter)
+        self._append({"letter": letter})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """The crawl's results are stored: drop the journal."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
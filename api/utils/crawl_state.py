@@ -0,0 +1,189 @@
+import hashlib
+import os
+import re
+
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from typing import Dict, Iterable, Optional
+
+load_dotenv()
+
+# A page that changed is fetched again after the minimum interval; every unchanged
+# fetch doubles its interval up to the maximum, so stable pages drop out of most runs
+CRAWL_MIN_INTERVAL_HOURS = int(os.getenv("CRAWL_MIN_INTERVAL_HOURS", "24"))
+CRAWL_MAX_INTERVAL_DAYS = int(os.getenv("CRAWL_MAX_INTERVAL_DAYS", "28"))
+
+UPSERT_BATCH_SIZE = 200
+
+select_sql = """
+    SELECT url, etag, last_modified, content_hash, recrawl_interval_hours, next_crawl_at
+    FROM crawl_state WHERE url LIKE %s
+"""
+
+upsert_sql = """
+    INSERT INTO crawl_state
+    (url, etag, last_modified, content_hash, recrawl_interval_hours, last_fetched_at, last_changed_at, next_crawl_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        etag = VALUES(etag),
+        last_modified = VALUES(last_modified),
+        content_hash = VALUES(content_hash),
+        recrawl_interval_hours = VALUES(recrawl_interval_hours),
+        last_fetched_at = VALUES(last_fetched_at),
+        last_changed_at = COALESCE(VALUES(last_changed_at), last_changed_at),
+        next_crawl_at = VALUES(next_crawl_at)
+"""
+
+_SCRIPT_RE = re.compile(r"<script\b.*?</script>", re.S | re.I)
+
+
+def page_hash(html: str) -> str:
+    """Hash of a page without its <script> blocks, which carry ad and tracking ids that change on every load."""
+    return hashlib.md5(_SCRIPT_RE.sub("", html).encode("utf-8")).hexdigest()
+
+
+class CrawlState:
+    """
+    Per-URL fetch history for one site section (rows of crawl_state whose url
+    starts with `url_prefix`). fetch() returns a page's HTML only when it needs
+    parsing: pages not yet due are skipped without a request, and a 304 or an
+    unchanged content hash skips the parse.
+
+    Updates are buffered; call flush() once the scraped data is stored, so a
+    crash before then re-crawls those pages instead of silently skipping them.
+    Database errors are logged and leave the crawl running without state.
+    """
+
+    def __init__(self, url_prefix: str, force: bool = False):
+        self.url_prefix = url_prefix
+        self.force = force
+        self.rows: Dict[str, dict] = {}
+        self._pending: Dict[str, tuple] = {}
+        self.stats = {"not_due": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "new": 0}
+
+    def load(self):
+        conn = cursor = None
+        try:
+            from core.db import get_db_connection
+
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(select_sql, (self.url_prefix + "%",))
+            self.rows = {row["url"]: row for row in cursor.fetchall()}
+            print(f"🗂️ Loaded crawl state for {len(self.rows)} pages under {self.url_prefix}")
+        except Exception as e:
+            print(f"⚠️ Could not load crawl state, fetching every page: {e}")
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+        return self
+
+    def is_due(self, url: str) -> bool:
+        row = self.rows.get(url)
+        return self.force or row is None or row["next_crawl_at"] <= datetime.utcnow()
+
+    def conditional_headers(self, url: str) -> dict:
+        row = self.rows.get(url) or {}
+        headers = {}
+        if row.get("etag"):
+            headers["If-None-Match"] = row["etag"]
+        if row.get("last_modified"):
+            headers["If-Modified-Since"] = row["last_modified"]
+        return headers
+
+    async def fetch(self, fetcher, url: str, timeout: float = 30) -> Optional[str]:
+        """HTML of `url` through an HttpFetcher or PagePool, or None if it hasn't changed since the last crawl."""
+        if not self.is_due(url):
+            self.stats["not_due"] += 1
+            return None
+
+        row = self.rows.get(url)
+        etag = last_modified = None
+        if hasattr(fetcher, "get"):
+            headers = {} if self.force else self.conditional_headers(url)
+            response = await fetcher.get(url, timeout=timeout, headers=headers)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if response.status_code == 304 and row:
+                self.stats["not_modified"] += 1
+                self._record(url, etag or row["etag"], last_modified or row["last_modified"], row["content_hash"], changed=False)
+                return None
+            response.raise_for_status()
+            html = response.text
+        else:
+            html = await fetcher.html(url, timeout=timeout)
+
+        content_hash = page_hash(html)
+        changed = not row or row["content_hash"] != content_hash
+        self._record(url, etag, last_modified, content_hash, changed=changed)
+        if not changed and not self.force:
+            self.stats["unchanged"] += 1
+            return None
+
+        self.stats["changed" if row else "new"] += 1
+        return html
+
+    def _record(self, url, etag, last_modified, content_hash, changed):
+        now = datetime.utcnow()
+        row = self.rows.get(url)
+        if changed or not row:
+            interval = CRAWL_MIN_INTERVAL_HOURS
+        else:
+            interval = min(row["recrawl_interval_hours"] * 2, CRAWL_MAX_INTERVAL_DAYS * 24)
+
+        self._pending[url] = (
+            url, etag, last_modified, content_hash, interval,
+            now, now if changed else None, now + timedelta(hours=interval),
+        )
+
+    def discard(self, url: str):
+        """Forget this run's fetch of `url` (e.g. it failed to parse), so the next run fetches it again."""
+        self._pending.pop(url, None)
+
+    def flush(self, urls: Optional[Iterable[str]] = None):
+        """
+        Write buffered page updates (only those for `urls`, if given). Call after
+        the data parsed from those pages has been committed. Flushing given
+        `urls` only touches their own pending rows, so it can run in a worker
+        thread while the crawl keeps recording other pages.
+        """
+        if urls is None:
+            rows = list(self._pending.values())
+        else:
+            rows = [row for row in map(self._pending.get, set(urls)) if row]
+        if not rows:
+            return
+
+        conn = cursor = None
+        try:
+            from core.db import get_db_connection
+
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+                cursor.executemany(upsert_sql, rows[i:i + UPSERT_BATCH_SIZE])
+            conn.commit()
+
+            for url, etag, last_modified, content_hash, interval, _, _, next_crawl_at in rows:
+                self.rows[url] = {
+                    "url": url, "etag": etag, "last_modified": last_modified, "content_hash": content_hash,
+                    "recrawl_interval_hours": interval, "next_crawl_at": next_crawl_at,
+                }
+                self._pending.pop(url, None)
+        except Exception as e:
+            print(f"⚠️ Could not write crawl state: {e}")
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['changed'] + s['new']} parsed ({s['new']} new), {s['not_due']} not due, "
+                f"{s['not_modified']} not modified, {s['unchanged']} unchanged")
+
+
+async def fetch_if_changed(fetcher, url: str, crawl_state: Optional[CrawlState] = None, timeout: float = 30) -> Optional[str]:
+    """crawl_state.fetch() when a crawl state is given, otherwise always the page's HTML."""
+    if crawl_state is None:
+        return await fetcher.html(url, timeout=timeout)
+    return await crawl_state.fetch(fetcher, url, timeout=timeout)
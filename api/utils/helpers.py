@@ -1,7 +1,11 @@
+from dotenv import load_dotenv
 from playwright.async_api import async_playwright
 from unidecode import unidecode
+from urllib.parse import urlparse
 
-import json, random, asyncio
+import json, os, random, asyncio
+
+load_dotenv()
 
 # VARIABLES
 
@@ -11,12 +15,32 @@ USER_AGENT = (
         "Chrome/115.0.0.0 Safari/537.36"
 )
 
+# Scrapers read text and attributes only, so contexts from new_context() abort these
+# resource types and ad/analytics requests (SCRAPER_BLOCK_RESOURCES=false loads everything)
+SCRAPER_BLOCK_RESOURCES = os.getenv("SCRAPER_BLOCK_RESOURCES", "true").lower() == "true"
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googletagmanager.com", "googletagservices.com",
+    "google-analytics.com", "adservice.google.com", "amazon-adsystem.com", "adnxs.com",
+    "criteo.com", "criteo.net", "pubmatic.com", "rubiconproject.com", "openx.net", "casalemedia.com",
+    "moatads.com", "taboola.com", "outbrain.com", "scorecardresearch.com", "quantserve.com",
+    "chartbeat.com", "chartbeat.net", "hotjar.com", "facebook.net",
+    "segment.io", "segment.com", "optimizely.com", "newrelic.com", "nr-data.net",
+)
+
 # SYNCHRONOUS FUNCTIONS
 
 def normalize_name(name):
     """Remove accents and special characters, lowercase, strip spaces."""
     return unidecode(name).strip()
 
+def name_match_key(name):
+    """
+    Case- and accent-insensitive form of a name, matching how the utf8mb4_0900_ai_ci
+    collation compares full_name, for matching scraped names against rows in Python.
+    """
+    return unidecode(name or "").casefold().strip()
+
 def parse_json_list(field: str):
     if not field:
         return []
@@ -26,36 +50,83 @@ def parse_json_list(field: str):
     except Exception:
         return [x.strip().strip('"') for x in field.split(",")]
 
+def is_blocked_request(resource_type, url):
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(url).hostname or ""
+    return any(host == blocked or host.endswith("." + blocked) for blocked in BLOCKED_HOSTS)
+
 # ASYNC FUNCTIONS
 
+async def _route_request(route):
+    request = route.request
+    if is_blocked_request(request.resource_type, request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
 async def launch_browser(headless=True):
+    """Start Chromium. Open scraping pages with new_context()/new_page() so they get the resource policy."""
     playwright = await async_playwright().start()
     browser = await playwright.chromium.launch(headless=headless, args=["--no-sandbox", "--disable-setuid-sandbox", "--disable-dev-shm-usage"])
     return playwright, browser
 
 
-async def safe_goto(page, url, max_retries=3, timeout=60000):
-    """Safely navigate to a URL with retries and page recreation if needed."""
+async def new_context(browser, block_resources=SCRAPER_BLOCK_RESOURCES):
+    """A browser context that aborts images, media, fonts and ad/analytics hosts (see BLOCKED_HOSTS)."""
+    context = await browser.new_context()
+    if block_resources:
+        await context.route("**/*", _route_request)
+    return context
+
+
+async def new_page(browser, block_resources=SCRAPER_BLOCK_RESOURCES):
+    """Open a page in a fresh context (see new_context) with the scraper User-Agent. Close it with page.context.close()."""
+    context = await new_context(browser, block_resources)
+    page = await context.new_page()
+    await page.set_extra_http_headers({"User-Agent": USER_AGENT})
+    return page
+
+
+async def recreate_page(page):
+    """Replace a broken page with a new one in the same context, or in a new context if that one is gone."""
+    context = page.context
+    try:
+        await page.close()
+    except Exception:
+        pass
+
+    try:
+        page = await context.new_page()
+        await page.set_extra_http_headers({"User-Agent": USER_AGENT})
+        return page
+    except Exception:
+        try:
+            await context.close()
+        except Exception:
+            pass
+        return await new_page(context.browser)
+
+
+async def safe_goto(page, url, max_retries=3, timeout=60000, limiter=None):
+    """
+    Safely navigate to a URL with retries and page recreation if needed.
+    Returns the page that loaded, which is a new one if the original failed.
+    With a limiter (utils.scraper_runtime.DomainRateLimiter) every attempt first
+    waits for a request token for the URL's domain.
+    """
     for attempt in range(max_retries):
+        if limiter:
+            await limiter.acquire(url)
         try:
             await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
             return page
         except Exception as e:
             print(f"⚠️ Navigation failed (attempt {attempt+1}) for {url}: {e}")
-            try:
-                ctx = page.context
-                await page.close()
-                await ctx.close()
-            except:
-                pass
-
-            browser = page.context.browser
-            context = await browser.new_context()
-            page = await context.new_page()
-            await page.set_extra_http_headers({"User-Agent": USER_AGENT})
-
             if attempt == max_retries - 1:
                 raise
+            page = await recreate_page(page)
             await asyncio.sleep(5 + random.random() * 5)
     return page
 
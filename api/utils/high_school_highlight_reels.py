@@ -1,10 +1,13 @@
-import random, os
+import random
 
 from rapidfuzz import fuzz
-from typing import List
+from typing import Callable, List, Optional
 
-from core.config import set_youtube_key, set_gemini_key
-from utils.highlight_reel_helpers import DOWNLOAD_DIR, TEMP_CLIP_DIR, deduplicate_clips, download_youtube_video, get_duration, motion_score, cleanup_files, extract_highlight_clips, save_highlight_clips
+from core.config import set_youtube_key
+from core.llm_client import chat_completion_sync
+from core.workspace import JobWorkspace
+from utils.highlight_reel_helpers import generate_highlight_clips
+from utils.llm_json import loads_llm_json
 
 # -------------------------------
 # Generate HS highlights
@@ -12,7 +15,6 @@ from utils.highlight_reel_helpers import DOWNLOAD_DIR, TEMP_CLIP_DIR, deduplicat
 
 def high_school_highlights(full_name: str, class_year: str, max_videos: int = 15) -> List[str]:
     youtube = set_youtube_key()
-    client = set_gemini_key()
 
     # Rotate queries for more variety
     query_variants = [
@@ -95,7 +97,7 @@ def high_school_highlights(full_name: str, class_year: str, max_videos: int = 15
 
     chosen_urls: List[str] = []
     try:
-        response = client.chat.completions.create(
+        response = chat_completion_sync(
             model="gemini-2.5-pro",
             messages=messages,
         )
@@ -109,15 +111,13 @@ def high_school_highlights(full_name: str, class_year: str, max_videos: int = 15
         if not resp_text:
             resp_text = str(response)
 
-        import re, json
-        m = re.search(r"\[.*\]", resp_text, flags=re.S)
-        if m:
-            try:
-                parsed = json.loads(m.group(0))
-                if isinstance(parsed, list):
-                    chosen_urls = [u for u in parsed if isinstance(u, str)]
-            except Exception:
-                chosen_urls = []
+        import re
+        try:
+            parsed = loads_llm_json(resp_text, expect="array")
+            if isinstance(parsed, list):
+                chosen_urls = [u for u in parsed if isinstance(u, str)]
+        except ValueError:
+            chosen_urls = []
         if not chosen_urls:
             # fallback: regex for youtube URLs
             chosen_urls = re.findall(r"https?://(?:www\.)?youtube\.com/watch\?v=[\w\-]+", resp_text)
@@ -148,74 +148,9 @@ def high_school_highlights(full_name: str, class_year: str, max_videos: int = 15
 
     return final
 
-def generate_high_school_highlights(full_name: str, class_year: str, max_videos=15, top_k_per_video=3, max_duration: int = 1200) -> List[str]:
+def generate_high_school_highlights(full_name: str, class_year: str, max_videos=15, top_k_per_video=3, max_duration: int = 1200, two_phase: bool = True, *, job: JobWorkspace, on_clip: Optional[Callable[[str], None]] = None) -> List[str]:
     urls = high_school_highlights(full_name, class_year, max_videos=max_videos)
     if not urls:
         raise ValueError("No videos found for this player.")
 
-    all_clips: List[str] = []
-
-    for i, url in enumerate(urls):
-        video_path = None
-        clips_from_this_video = []
-        
-        try:
-            print(f"📹 Processing video {i+1}/{len(urls)}: {url}")
-            
-            video_path = download_youtube_video(url, output_dir=DOWNLOAD_DIR)
-
-            # Duration guard (skip > max_duration)
-            duration = get_duration(video_path)
-            if duration > max_duration:
-                print(f"⚠️ Skipping long video ({duration/60:.1f} min): {url}")
-                continue
-
-            # Early "dead video" check (low motion in first 10s)
-            avg_motion = motion_score(video_path, 0, min(10, duration))
-            if avg_motion < 0.05:
-                print(f"⚠️ Skipping dead/low-motion video: {url}")
-                continue
-
-            # Extract highlight segments
-            segments = extract_highlight_clips(video_path, top_k=top_k_per_video)
-
-            # Fallback: guarantee at least one short clip if video isn't empty
-            if not segments and duration > 2:
-                segments = [(0, min(5, duration))]
-
-            # Save extracted highlight clips
-            clips_from_this_video = save_highlight_clips(video_path, segments, output_dir=TEMP_CLIP_DIR)
-            all_clips.extend(clips_from_this_video)
-            
-            print(f"✅ Extracted {len(clips_from_this_video)} clips from video {i+1}")
-
-        except Exception as e:
-            print(f"⚠️ Error processing {url}: {e}")
-            # Clean up any partial clips from failed processing
-            if clips_from_this_video:
-                cleanup_files(clips_from_this_video)
-        finally:
-            # ALWAYS clean up the downloaded video immediately
-            if video_path and os.path.exists(video_path):
-                cleanup_files([video_path])
-            
-            # Force garbage collection after each video
-            import gc
-            gc.collect()
-
-    # Deduplicate + shuffle
-    print(f"🔍 Deduplicating {len(all_clips)} clips...")
-    unique_clips = deduplicate_clips(all_clips)
-    
-    # Clean up duplicates that were removed
-    duplicates_to_remove = [clip for clip in all_clips if clip not in unique_clips]
-    if duplicates_to_remove:
-        cleanup_files(duplicates_to_remove)
-    
-    random.shuffle(unique_clips)
-
-    if not unique_clips:
-        raise ValueError("No valid highlight clips found for this player.")
-
-    print(f"✅ Generated {len(unique_clips)} unique highlight clips")
-    return unique_clips
\ No newline at end of file
+    return generate_highlight_clips(urls, top_k_per_video=top_k_per_video, max_duration=max_duration, two_phase=two_phase, job=job, on_clip=on_clip)
@@ -1,5 +1,6 @@
 import os
 import subprocess
+import time
 import cv2
 import imagehash
 import numpy as np
@@ -7,19 +8,51 @@ from scenedetect import open_video, SceneManager
 from scenedetect.detectors import ContentDetector
 from pydub import AudioSegment
 from PIL import Image
-from scenedetect.stats_manager import StatsManager
-from typing import List
+from typing import Callable, List, Optional, Tuple
 
-from core.config import set_gemini_key
+from core.llm_client import chat_completion_sync
+from core.workspace import JobWorkspace
+from utils.pipeline_profiler import add_bytes, add_file_bytes, add_frames, timed_stage
+from utils.highlight_scoring import rank_candidates, split_ties
+from utils.llm_json import loads_llm_json
+from utils.video_analysis_cache import get_cached_video_analysis, save_video_analysis
+from utils.video_hash_helpers import BKTree, SIGNATURE_SAMPLES, SegmentIndex, frame_hashes_at, signature_distance, video_signature
 
 
-DOWNLOAD_DIR = "downloads"
-TEMP_CLIP_DIR = "highlights"
-FINAL_DIR = "final_reels"
+# Upper bounds passed to yt-dlp --max-filesize, reserved against the workspace budget
+MAX_DOWNLOAD_MB = 200
+MAX_ANALYSIS_DOWNLOAD_MB = 80
 
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-os.makedirs(TEMP_CLIP_DIR, exist_ok=True)
-os.makedirs(FINAL_DIR, exist_ok=True)
+# Scene detection and motion scoring run on a small, low-fps proxy of the
+# download rather than the full-resolution source.
+PROXY_WIDTH = 320
+PROXY_FPS = 10
+
+# Frame rate the frame-difference thresholds were tuned at; analysis at other
+# rates rescales them by the time between the frames being compared
+REFERENCE_FPS = 30.0
+
+# Mean frame difference below which the first 10s of a video count as "dead"
+DEAD_VIDEO_MOTION = 0.05
+
+# Every reel clip is normalized to this format before the crossfade merge
+REEL_WIDTH = 1280
+REEL_HEIGHT = 720
+REEL_FPS = 30
+REEL_VF = (
+    f"scale={REEL_WIDTH}:{REEL_HEIGHT}:force_original_aspect_ratio=decrease,"
+    f"pad={REEL_WIDTH}:{REEL_HEIGHT}:(ow-iw)/2:(oh-ih)/2,setsar=1"
+)
+
+# Max Hamming distance (bits, per sampled frame) for two clips to count as duplicates
+DUPLICATE_BITS_PER_FRAME = 8
+
+# How top_k segments are picked per video: "llm", "local" (offline scorer only)
+# or "hybrid" (offline scorer, LLM only to break ties at the cutoff)
+HIGHLIGHT_SELECTION_MODE = os.getenv("HIGHLIGHT_SELECTION_MODE", "llm")
+
+# Bump whenever analyze_video's output changes meaning, so cached analyses are recomputed
+ANALYSIS_VERSION = 3
 
 # -------------------------------
 # Download YouTube video (safe filenames)
@@ -38,7 +71,9 @@ def safe_float(val):
     except Exception:
         return 0.0
 
-def download_youtube_video(url: str, output_dir: str = DOWNLOAD_DIR) -> str:
+@timed_stage("download")
+def download_youtube_video(url: str, output_dir: str) -> str:
+    """Download the full video into output_dir. Returns the exact file yt-dlp wrote."""
     os.makedirs(output_dir, exist_ok=True)
     filename_template = os.path.join(output_dir, "%(title)s.%(ext)s")
 
@@ -54,6 +89,7 @@ def download_youtube_video(url: str, output_dir: str = DOWNLOAD_DIR) -> str:
 
     success = False
     downloaded_file = None
+    result = None
     
     for fmt in format_candidates:
         try:
@@ -65,8 +101,9 @@ def download_youtube_video(url: str, output_dir: str = DOWNLOAD_DIR) -> str:
                 "--merge-output-format", "mp4",
                 "--restrict-filenames",
                 "--no-playlist",
-                "--max-filesize", "200M",  # Size limit still works
+                "--max-filesize", f"{MAX_DOWNLOAD_MB}M",  # Size limit still works
                 "-o", filename_template,
+                "--print", "after_move:filepath",
                 url,
             ]
             
@@ -104,6 +141,7 @@ def download_youtube_video(url: str, output_dir: str = DOWNLOAD_DIR) -> str:
                 "--restrict-filenames",
                 "--no-playlist",
                 "-o", filename_template,
+                "--print", "after_move:filepath",
                 url,
             ], check=True, capture_output=True, text=True, timeout=300)
             success = True
@@ -113,20 +151,12 @@ def download_youtube_video(url: str, output_dir: str = DOWNLOAD_DIR) -> str:
     if not success:
         raise RuntimeError(f"yt-dlp failed for {url} with all format candidates")
 
-    # Find the downloaded file
-    downloaded_files = []
-    if os.path.exists(output_dir):
-        downloaded_files = sorted(
-            [os.path.join(output_dir, f) for f in os.listdir(output_dir) 
-             if f.endswith('.mp4')],
-            key=os.path.getmtime,
-            reverse=True,
-        )
-    
-    if not downloaded_files:
-        raise RuntimeError(f"No MP4 files found in {output_dir} after downloading {url}")
+    # Use the path yt-dlp reports rather than guessing from the directory contents
+    printed = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+    if not printed:
+        raise RuntimeError(f"yt-dlp did not report an output file for {url}")
 
-    downloaded_file = downloaded_files[0]
+    downloaded_file = printed[-1]
     
     # Check if file exists and is not empty
     if not os.path.exists(downloaded_file) or os.path.getsize(downloaded_file) == 0:
@@ -151,9 +181,95 @@ def download_youtube_video(url: str, output_dir: str = DOWNLOAD_DIR) -> str:
         raise RuntimeError(f"Video too long: {duration/60:.1f}min")
 
     print(f"✅ Accepted: {os.path.basename(downloaded_file)} ({file_size_mb:.1f}MB, {duration/60:.1f}min)")
+    add_file_bytes(downloaded_file)
     return downloaded_file  # No remuxing!
 
 
+# -------------------------------
+# Two-phase download: low-bitrate analysis rendition, then only the selected sections
+# -------------------------------
+# Smallest rendition that is still useful for scoring (scene cuts, motion, audio spikes)
+ANALYSIS_FORMAT = "worstvideo[height>=240]+worstaudio/worst[height>=240]/worst"
+# Reel-quality rendition used when fetching the selected sections
+REEL_FORMAT = "bestvideo[height<=720]+bestaudio[abr<=128]/best[height<=720]/best"
+
+@timed_stage("download_analysis")
+def download_analysis_rendition(url: str, output_dir: str) -> str:
+    """
+    Phase one: fetch a low-bitrate rendition for scoring only.
+    Returns the exact file yt-dlp wrote.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cmd = [
+        "yt-dlp",
+        "-f", ANALYSIS_FORMAT,
+        "--merge-output-format", "mp4",
+        "--restrict-filenames",
+        "--no-playlist",
+        "--max-filesize", f"{MAX_ANALYSIS_DOWNLOAD_MB}M",
+        "-o", os.path.join(output_dir, "%(id)s_analysis.%(ext)s"),
+        "--print", "after_move:filepath",
+        url,
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=300)
+    printed = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+    if not printed or not os.path.exists(printed[-1]):
+        raise RuntimeError(f"yt-dlp did not report an analysis file for {url}")
+
+    analysis_path = printed[-1]
+    add_file_bytes(analysis_path)
+    print(f"📥 Analysis rendition: {os.path.basename(analysis_path)} ({os.path.getsize(analysis_path) / (1024 * 1024):.1f}MB)")
+    return analysis_path
+
+@timed_stage("download_sections")
+def download_video_sections(url: str, segments, output_dir: str,
+                            source_duration: Optional[float] = None) -> Tuple[List[str], List[Optional[float]]]:
+    """
+    Phase two: fetch only the selected time ranges at reel quality,
+    one clip file per segment, in a single yt-dlp invocation.
+    Returns the clips and their durations from the segment bounds (clamped to
+    `source_duration` when known), or None where the mapping is uncertain.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    section_args = []
+    section_durations = []
+    for seg in segments:
+        start, end = float(seg["start"]), float(seg["end"])
+        if source_duration:
+            end = min(end, source_duration)
+        if end > start:
+            section_args.extend(["--download-sections", f"*{start:.3f}-{end:.3f}"])
+            section_durations.append(end - start)
+    if not section_args:
+        return [], []
+
+    cmd = [
+        "yt-dlp",
+        "-f", REEL_FORMAT,
+        "--merge-output-format", "mp4",
+        "--restrict-filenames",
+        "--no-playlist",
+        *section_args,
+        "--force-keyframes-at-cuts",
+        "-o", os.path.join(output_dir, "%(id)s_clip_%(section_number)s.%(ext)s"),
+        "--print", "after_move:filepath",
+        url,
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=300)
+    clips = [
+        line.strip() for line in result.stdout.splitlines()
+        if line.strip() and os.path.exists(line.strip()) and os.path.getsize(line.strip()) > 0
+    ]
+
+    # Sections are written in request order; only trust the mapping if every one arrived
+    durations = section_durations if len(clips) == len(section_durations) else [None] * len(clips)
+
+    add_file_bytes(*clips)
+    total_mb = sum(os.path.getsize(c) for c in clips) / (1024 * 1024)
+    print(f"📥 Downloaded {len(clips)} sections ({total_mb:.1f}MB) from {url}")
+    return clips, durations
+
+
 # Also add a fallback function to handle video info checking
 def check_video_info(url: str) -> dict:
     """
@@ -183,48 +299,129 @@ def check_video_info(url: str) -> dict:
     return {'duration': 0, 'title': '', 'filesize': 0, 'width': 0, 'height': 0}
 
 
+# -------------------------------
+# Analysis proxy
+# -------------------------------
+def get_video_fps(video_path: str) -> float:
+    """Return the stream frame rate, defaulting to 30 when it can't be read."""
+    cap = cv2.VideoCapture(video_path)
+    fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+    cap.release()
+    return fps if fps > 0 else 30.0
+
+@timed_stage("analysis_proxy")
+def make_analysis_proxy(video_path: str, width: int = PROXY_WIDTH, fps: int = PROXY_FPS) -> Optional[str]:
+    """
+    Transcode a video-only, low-resolution, low-fps proxy for the analysis stages.
+    Uses plain software scaling and libx264 so it behaves the same on every host.
+    Returns None on failure so callers can fall back to the source file.
+    """
+    proxy_path = f"{os.path.splitext(video_path)[0]}_proxy.mp4"
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-i", video_path,
+        "-an",
+        "-vf", f"scale='min({width},iw)':-2:flags=fast_bilinear,fps={fps}",
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-crf", "28",
+        "-g", str(fps),  # keyframe every second keeps cv2 seeks cheap
+        proxy_path,
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=300)
+    except Exception as e:
+        print(f"⚠️ Proxy decode failed for {video_path}, analyzing source instead: {e}")
+        if os.path.exists(proxy_path):
+            cleanup_files([proxy_path])
+        return None
+    add_file_bytes(video_path, proxy_path)
+    return proxy_path
+
+def snap_to_frame(seconds: float, fps: float) -> float:
+    """Map a timestamp onto the nearest frame boundary of a stream at `fps`."""
+    return round(round(float(seconds) * fps) / fps, 3)
+
+
 # -------------------------------
 # Scene detection
 # -------------------------------
-def detect_scenes(video_path: str, threshold: float = 30.0):  # Increased threshold for fewer scenes
+@timed_stage("detect_scenes")
+def detect_scenes(video_path: str, threshold: float = 30.0, source_fps: Optional[float] = None, min_scene_secs: float = 0.5):
     """
-    Memory-optimized scene detection with higher threshold to reduce memory usage.
+    Scene detection without a StatsManager, so per-frame metrics aren't held in memory.
+    When `video_path` is an analysis proxy, pass the source fps so boundaries are
+    snapped back onto source frame timestamps.
     """
     try:
         video = open_video(video_path)
-        scene_manager = SceneManager(stats_manager=StatsManager())
-        scene_manager.add_detector(ContentDetector(threshold=threshold))
-        scene_manager.detect_scenes(video=video)
+        min_scene_len = max(1, int(round(min_scene_secs * float(video.frame_rate or 30))))
+        scene_manager = SceneManager()
+        scene_manager.add_detector(ContentDetector(threshold=threshold, min_scene_len=min_scene_len))
+        add_frames(scene_manager.detect_scenes(video=video))
         scene_list = scene_manager.get_scene_list()
-        
-        # Limit number of scenes to prevent memory issues
+
+        # Limit number of scenes to keep downstream scoring bounded
         max_scenes = 75
         if len(scene_list) > max_scenes:
             print(f"⚠️ Too many scenes detected ({len(scene_list)}), using first {max_scenes}")
             scene_list = scene_list[:max_scenes]
 
-        return [(start.get_seconds(), end.get_seconds()) for start, end in scene_list]
+        scenes = [(start.get_seconds(), end.get_seconds()) for start, end in scene_list]
+        if source_fps:
+            scenes = [(snap_to_frame(start, source_fps), snap_to_frame(end, source_fps)) for start, end in scenes]
+        return scenes
     except Exception as e:
         print(f"⚠️ Scene detection failed: {e}")
         return []
 
-def detect_audio_spikes(video_path: str, window_ms: int = 500, threshold: float = 1.5):
-    audio = AudioSegment.from_file(video_path)
-    samples = np.array(audio.get_array_of_samples())
-    samples = samples.astype(np.float32) / (2**15)  # normalize
+@timed_stage("audio_decode")
+def load_audio_samples(video_path: str):
+    """Decode the audio track once as normalized mono float32 samples. Returns (samples, sample_rate)."""
+    audio = AudioSegment.from_file(video_path).set_channels(1)
+    samples = np.array(audio.get_array_of_samples()).astype(np.float32) / (2**15)  # normalize
+    add_bytes(samples.nbytes)
+    return samples, audio.frame_rate
+
+@timed_stage("detect_audio_spikes")
+def detect_audio_spikes(video_path: str, window_ms: int = 500, threshold: float = 1.5, audio=None):
+    """
+    Timestamps (seconds) of windows whose RMS exceeds `threshold` x the mean.
+    Pass `audio` from load_audio_samples to avoid decoding the track again.
+    """
+    samples, frame_rate = audio if audio is not None else load_audio_samples(video_path)
 
     # RMS per window
-    step = int(window_ms * audio.frame_rate / 1000)
+    step = max(1, int(window_ms * frame_rate / 1000))
     rms_values = [np.sqrt(np.mean(samples[i:i+step]**2)) for i in range(0, len(samples), step)]
+    if not rms_values:
+        return []
     mean_rms = np.mean(rms_values)
 
     # Spike timestamps in seconds
     spikes = [i * (window_ms/1000) for i, rms in enumerate(rms_values) if rms > mean_rms * threshold]
     return spikes
 
+def audio_fingerprint(audio, start: float, end: float, bits: int = 32) -> Optional[int]:
+    """
+    Short loudness-envelope fingerprint of [start, end): the segment is split into
+    bits + 1 windows and each bit records whether RMS rises between neighbours.
+    Gain changes don't affect it; re-uploads with the same commentary/crowd audio match.
+    """
+    samples, frame_rate = audio
+    segment = samples[int(start * frame_rate):int(end * frame_rate)]
+    windows = bits + 1
+    if len(segment) < windows:
+        return None
+    usable = segment[: len(segment) - len(segment) % windows].reshape(windows, -1)
+    rms = np.sqrt(np.mean(usable ** 2, axis=1))
+    rising = rms[1:] > rms[:-1]
+    return int.from_bytes(np.packbits(rising).tobytes(), "big")
+
 # -------------------------------
 # Motion scoring (weighted by scene length)
 # -------------------------------
+@timed_stage("motion_scoring")
 def motion_density(video_path: str, start: float, end: float, sample_rate: int = 3, motion_thresh: float = 20):
     """
     Memory-optimized motion density calculation.
@@ -249,6 +446,9 @@ def motion_density(video_path: str, start: float, end: float, sample_rate: int =
     frames, density_sum, max_density = 0, 0.0, 0.0
     fps = float(cap.get(cv2.CAP_PROP_FPS) or 30)
     step = max(1, int(fps // sample_rate))
+    # Compared frames are step/fps apart rather than exactly 1/sample_rate (0.3s on the
+    # 10 fps proxy); scale the threshold so the same motion counts the same
+    motion_thresh *= (step / fps) * sample_rate
 
     while cap.get(cv2.CAP_PROP_POS_MSEC) < end * 1000:
         for _ in range(step):
@@ -274,12 +474,14 @@ def motion_density(video_path: str, start: float, end: float, sample_rate: int =
         prev_gray = gray
 
     cap.release()
+    add_frames(frames * step + 1)
     return {
         "avg_density": float(density_sum / max(frames, 1)),
         "max_density": float(max_density),
         "frame_count": frames
     }
 
+@timed_stage("motion_scoring")
 def motion_score(video_path: str, start: float, end: float, sample_rate: int = 3) -> float:
     """
     Memory-optimized motion scoring with lower sample rate and immediate cleanup.
@@ -307,6 +509,8 @@ def motion_score(video_path: str, start: float, end: float, sample_rate: int = 3
     score, frames = 0.0, 0
     fps = float(cap.get(cv2.CAP_PROP_FPS) or 30)
     step = max(1, int(fps // sample_rate))
+    # Normalized to a 1/sample_rate gap between compared frames, as in motion_density
+    gap_scale = (step / fps) * sample_rate
 
     while cap.get(cv2.CAP_PROP_POS_MSEC) < end * 1000:
         for _ in range(step):
@@ -330,7 +534,8 @@ def motion_score(video_path: str, start: float, end: float, sample_rate: int = 3
         prev_gray = gray
 
     cap.release()
-    return float(score / max(frames, 1))
+    add_frames(frames * step + 1)
+    return float(score / max(frames, 1) / gap_scale)
 
 def score_scene(video_path: str, start: float, end: float, audio_spikes: list):
     start, end = float(start), float(end)
@@ -371,6 +576,7 @@ def score_scene(video_path: str, start: float, end: float, audio_spikes: list):
 # -------------------------------
 # Extract highlight scenes
 # -------------------------------
+@timed_stage("scene_extension")
 def extend_scene_to_motion_end(
     video_path: str,
     start: float,
@@ -416,62 +622,131 @@ def extend_scene_to_motion_end(
         total_extend += frame_time
 
     cap.release()
+    add_frames(round(total_extend / frame_time) + 1)
     return float(min(end + total_extend, end + max_extend))
 
-def extract_highlight_clips(
+@timed_stage("segment_fingerprints")
+def segment_fingerprint(analysis_path: str, audio, start: float, end: float) -> dict:
+    """Perceptual hashes of frames at 10/50/90% of the segment plus a short audio fingerprint."""
+    length = end - start
+    timestamps = [start + length * fraction for fraction in SIGNATURE_SAMPLES]
+    frame_hashes = frame_hashes_at(analysis_path, timestamps)
+    add_frames(len(timestamps))
+    return {
+        "frame_hashes": list(frame_hashes) if frame_hashes else None,
+        "audio_fingerprint": audio_fingerprint(audio, start, end) if audio is not None else None,
+    }
+
+@timed_stage("analyze_video")
+def analyze_video(
     video_path: str,
-    top_k: int = 3,
+    max_duration: Optional[float] = None,
     min_len: float = 3,
     max_len: float = 12,
     pad_before: float = 0.3,
     early_skip: float = 10.0,
-):
-    audio_spikes = detect_audio_spikes(video_path)
-    scenes = detect_scenes(video_path)
-    candidate_scenes = []
+    use_proxy: bool = True,
+) -> dict:
+    """
+    Run every analysis stage that doesn't depend on top_k: duration and dead-video
+    checks, scene boundaries, and per-segment scores with fingerprints (frame
+    hashes + audio) used for cross-video duplicate detection.
+    The result is JSON-serializable so it can be cached per video.
+    """
+    duration = get_duration(video_path)
+    analysis = {
+        "duration": duration,
+        "intro_motion": None,
+        "scenes": [],
+        "candidates": None,
+    }
 
-    for start, end in scenes:
-        try:
-            start = float(safe_float(start))
-            end = float(safe_float(end))
-        except Exception as e:
-            print(f"⚠️ Skipping invalid scene times {start}, {end}: {e}")
-            continue
+    # Duration guard and early "dead video" check (low motion in first 10s)
+    if max_duration is not None and duration > max_duration:
+        return analysis
+    analysis["intro_motion"] = float(motion_score(video_path, 0, min(10, duration)))
+    if analysis["intro_motion"] < DEAD_VIDEO_MOTION:
+        return analysis
 
-        duration = end - start
-        if duration < min_len or end < early_skip:
-            continue
+    try:
+        audio = load_audio_samples(video_path)
+    except Exception as e:
+        print(f"⚠️ Could not decode audio for {video_path}: {e}")
+        audio = None
+    audio_spikes = detect_audio_spikes(video_path, audio=audio) if audio is not None else []
+    source_fps = get_video_fps(video_path)
+
+    proxy_path = make_analysis_proxy(video_path) if use_proxy else None
+    analysis_path = proxy_path or video_path
+    analysis_fps = float(PROXY_FPS) if proxy_path else source_fps
+    # extend_scene_to_motion_end counts frames and compares consecutive ones, so keep its
+    # cooldown at ~1/3s of footage and scale its threshold with the time between frames
+    cooldown_frames = max(1, int(round(10 * analysis_fps / REFERENCE_FPS)))
+    extend_motion_thresh = 5.0 * REFERENCE_FPS / analysis_fps
 
-        extended_end = extend_scene_to_motion_end(
-            video_path, start, end, max_extend=max_len - duration,
-            motion_thresh=5.0, cooldown_frames=10, audio_spikes=audio_spikes
-        )
+    candidate_scenes = []
+    try:
+        scenes = detect_scenes(analysis_path, source_fps=source_fps)
+        analysis["scenes"] = [[float(start), float(end)] for start, end in scenes]
 
-        seg_start = max(0.0, start - pad_before)
-        seg_end = min(extended_end, start + max_len)
+        for start, end in scenes:
+            try:
+                start = float(safe_float(start))
+                end = float(safe_float(end))
+            except Exception as e:
+                print(f"⚠️ Skipping invalid scene times {start}, {end}: {e}")
+                continue
 
-        try:
-            motion = float(motion_score(video_path, seg_start, seg_end))
-            density_data = motion_density(video_path, seg_start, seg_end)
-        except Exception as e:
-            print(f"⚠️ Skipping scene due to motion/density error: {e}")
-            continue
+            scene_duration = end - start
+            if scene_duration < min_len or end < early_skip:
+                continue
 
-        duration = seg_end - seg_start
-        candidate_scenes.append({
-            "start": seg_start,
-            "end": seg_end,
-            "duration": duration,
-            "motion_score": motion,
-            "avg_density": float(density_data.get("avg_density", 0.0)),
-            "has_audio_spike": any(seg_start <= spike <= seg_end for spike in audio_spikes)
-        })
+            extended_end = extend_scene_to_motion_end(
+                analysis_path, start, end, max_extend=max_len - scene_duration,
+                motion_thresh=extend_motion_thresh, cooldown_frames=cooldown_frames, audio_spikes=audio_spikes
+            )
 
-    if not candidate_scenes:
-        return []
+            seg_start = max(0.0, start - pad_before)
+            seg_end = min(extended_end, start + max_len)
+
+            try:
+                motion = float(motion_score(analysis_path, seg_start, seg_end))
+                density_data = motion_density(analysis_path, seg_start, seg_end)
+            except Exception as e:
+                print(f"⚠️ Skipping scene due to motion/density error: {e}")
+                continue
+
+            candidate_scenes.append({
+                "start": seg_start,
+                "end": seg_end,
+                "duration": seg_end - seg_start,
+                "motion_score": motion,
+                "avg_density": float(density_data.get("avg_density", 0.0)),
+                "has_audio_spike": any(seg_start <= spike <= seg_end for spike in audio_spikes),
+                **segment_fingerprint(analysis_path, audio, seg_start, seg_end),
+            })
+    finally:
+        if proxy_path:
+            cleanup_files([proxy_path])
+
+    analysis["candidates"] = candidate_scenes
+    return analysis
+
+def is_video_usable(analysis: dict, max_duration: float, url: str = "") -> bool:
+    """Apply the duration guard and dead-video check to an (optionally cached) analysis."""
+    duration = float(analysis.get("duration") or 0.0)
+    if duration > max_duration:
+        print(f"⚠️ Skipping long video ({duration/60:.1f} min): {url}")
+        return False
+    intro_motion = analysis.get("intro_motion")
+    if intro_motion is not None and intro_motion < DEAD_VIDEO_MOTION:
+        print(f"⚠️ Skipping dead/low-motion video: {url}")
+        return False
+    return True
 
+def _llm_select_segments(candidate_scenes: List[dict], top_k: int) -> List[dict]:
+    """Ask the LLM for the top_k candidates, falling back to the highest avg_density ones."""
     # LLM selection with safe float parsing
-    client = set_gemini_key()
     try:
         system_prompt = "You are an expert at selecting NBA highlight moments from short video clips."
         user_instructions = (
@@ -493,13 +768,11 @@ def extract_highlight_clips(
             {"role": "user", "content": user_instructions + "\n\nCandidates:\n" + "\n".join(scene_lines)}
         ]
 
-        response = client.chat.completions.create(model="gemini-2.5-pro", messages=messages)
+        response = chat_completion_sync(model="gemini-2.5-pro", messages=messages)
         resp_text = getattr(getattr(response.choices[0], "message", {}), "content", str(response))
-        import re, json
-        m = re.search(r"\[.*\]", resp_text, flags=re.S)
         selected_segments = []
-        if m:
-            parsed = json.loads(m.group(0))
+        parsed = loads_llm_json(resp_text, expect="array")
+        if isinstance(parsed, list):
             for s in parsed:
                 try:
                     start = float(safe_float(s.get("start", 0)))
@@ -510,8 +783,51 @@ def extract_highlight_clips(
                     print(f"⚠️ Skipping invalid segment {s}: {e}")
     except Exception as e:
         print(f"⚠️ LLM selection failed, fallback to top avg_density segments: {e}")
-        candidate_scenes.sort(key=lambda x: x["avg_density"], reverse=True)
-        selected_segments = [{"start": float(c["start"]), "end": float(c["end"])} for c in candidate_scenes[:top_k]]
+        ranked = sorted(candidate_scenes, key=lambda x: x["avg_density"], reverse=True)
+        selected_segments = [{"start": float(c["start"]), "end": float(c["end"])} for c in ranked[:top_k]]
+
+    return selected_segments
+
+def _local_select_segments(candidate_scenes: List[dict], top_k: int, hybrid: bool = False) -> List[dict]:
+    """
+    Rank candidates with the offline scorer. In hybrid mode, the LLM is only
+    asked to break ties at the top_k cutoff, and only sees the tied candidates.
+    """
+    ranked = rank_candidates(candidate_scenes)
+    if not hybrid:
+        return [{"start": float(c["start"]), "end": float(c["end"])} for _, c in ranked[:top_k]]
+
+    confident, contenders, open_slots = split_ties(ranked, top_k)
+    if len(contenders) <= open_slots:
+        chosen = confident + contenders
+    else:
+        print(f"🤝 {len(contenders)} candidates tied for {open_slots} slot(s), asking the LLM")
+        chosen = confident
+        picked = _llm_select_segments(contenders, open_slots)[:open_slots]
+        if picked:
+            return [{"start": float(c["start"]), "end": float(c["end"])} for c in chosen] + picked
+        chosen = confident + contenders[:open_slots]
+    return [{"start": float(c["start"]), "end": float(c["end"])} for c in chosen[:top_k]]
+
+@timed_stage("segment_selection")
+def select_highlight_segments(candidate_scenes: List[dict], top_k: int = 3, mode: Optional[str] = None) -> List[dict]:
+    """
+    Pick the top_k candidate segments.
+    mode (default HIGHLIGHT_SELECTION_MODE): "llm" sends every candidate to the LLM,
+    "local" uses the deterministic offline scorer only, and "hybrid" uses the local
+    ranking and consults the LLM only for ties at the cutoff.
+    """
+    if not candidate_scenes:
+        return []
+
+    mode = (mode or HIGHLIGHT_SELECTION_MODE).lower()
+    started = time.perf_counter()
+    if mode in ("local", "hybrid"):
+        selected_segments = _local_select_segments(candidate_scenes, top_k, hybrid=(mode == "hybrid"))
+    else:
+        selected_segments = _llm_select_segments(candidate_scenes, top_k)
+    print(f"⏱️ Selected {len(selected_segments)}/{len(candidate_scenes)} segments in {mode} mode "
+          f"in {(time.perf_counter() - started) * 1000:.1f}ms")
 
     # Final safety filter: remove any segment with non-float values
     final_segments = []
@@ -525,6 +841,22 @@ def extract_highlight_clips(
 
     return final_segments
 
+def extract_highlight_clips(
+    video_path: str,
+    top_k: int = 3,
+    min_len: float = 3,
+    max_len: float = 12,
+    pad_before: float = 0.3,
+    early_skip: float = 10.0,
+    use_proxy: bool = True,
+    selection_mode: Optional[str] = None,
+):
+    analysis = analyze_video(
+        video_path, min_len=min_len, max_len=max_len,
+        pad_before=pad_before, early_skip=early_skip, use_proxy=use_proxy,
+    )
+    return select_highlight_segments(analysis["candidates"] or [], top_k=top_k, mode=selection_mode)
+
 
 # -------------------------------
 # Save highlight clips
@@ -544,126 +876,206 @@ def is_valid_mp4(file_path: str) -> bool:
         print(e.stderr)
         return False
 
-def save_highlight_clips(video_path: str, segments, output_dir=TEMP_CLIP_DIR) -> List[str]:
+def probe_video(video_path: str) -> dict:
+    """Single ffprobe call returning duration, first video stream geometry/fps/codec and audio presence."""
+    import json
+    info = {"duration": 0.0, "width": 0, "height": 0, "fps": 0.0, "vcodec": None, "has_audio": False}
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_streams", "-show_format", "-of", "json", video_path],
+            capture_output=True, text=True, check=True
+        )
+        data = json.loads(result.stdout or "{}")
+    except Exception as e:
+        print(f"⚠️ Could not probe {video_path}: {e}")
+        return info
+
+    info["duration"] = float(safe_float(data.get("format", {}).get("duration", 0.0)))
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and info["vcodec"] is None:
+            num, _, den = str(stream.get("avg_frame_rate") or stream.get("r_frame_rate") or "0/1").partition("/")
+            info["fps"] = float(num) / float(den) if safe_float(den) else 0.0
+            info["width"] = int(stream.get("width") or 0)
+            info["height"] = int(stream.get("height") or 0)
+            info["vcodec"] = stream.get("codec_name")
+        elif stream.get("codec_type") == "audio":
+            info["has_audio"] = True
+    return info
+
+def is_reel_normalized(info: dict) -> bool:
+    """True if a probed clip already matches the reel format, so it needs no prep encode."""
+    return (
+        info.get("vcodec") == "h264"
+        and info.get("width") == REEL_WIDTH
+        and info.get("height") == REEL_HEIGHT
+        and abs(float(info.get("fps") or 0.0) - REEL_FPS) < 0.01
+        and info.get("has_audio", False)
+    )
+
+def get_keyframe_times(video_path: str) -> List[float]:
+    """Sorted keyframe timestamps of the first video stream, read from packet flags (no decoding)."""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-select_streams", "v:0",
+                "-show_entries", "packet=pts_time,flags",
+                "-of", "csv=p=0",
+                video_path,
+            ],
+            capture_output=True, text=True, check=True, timeout=120
+        )
+    except Exception as e:
+        print(f"⚠️ Could not read keyframes for {video_path}: {e}")
+        return []
+
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+def nearest_keyframe(keyframes: List[float], t: float, tolerance: float) -> Optional[float]:
+    """Closest keyframe to `t` within `tolerance` seconds, if any."""
+    import bisect
+    i = bisect.bisect_left(keyframes, t)
+    nearby = [keyframes[j] for j in (i - 1, i) if 0 <= j < len(keyframes)]
+    best = min(nearby, key=lambda k: abs(k - t), default=None)
+    return best if best is not None and abs(best - t) <= tolerance else None
+
+@timed_stage("save_highlight_clips")
+def save_highlight_clips(video_path: str, segments, output_dir: str, snap_tolerance: float = 0.5,
+                         source_duration: Optional[float] = None) -> Tuple[List[str], List[float]]:
+    """
+    Cut segments out of a source video. When a keyframe sits within `snap_tolerance`
+    of a segment start, the cut is snapped to it and streams are copied without
+    re-encoding. Otherwise the clip is encoded straight into the normalized reel
+    format, so make_final_reel doesn't have to encode it again before merging.
+
+    Returns the clips and their durations for make_final_reel. Segment ends are
+    clamped to the source's length (probed once if `source_duration` isn't given),
+    so a segment running past the end doesn't claim time the clip doesn't have.
+    """
     import ffmpeg
     os.makedirs(output_dir, exist_ok=True)
     saved_paths = []
+    durations = []
     base = os.path.splitext(os.path.basename(video_path))[0]
+    keyframes = get_keyframe_times(video_path)
+    source_duration = source_duration or get_duration(video_path)
 
     for i, seg in enumerate(segments):
         try:
             start = float(seg["start"])
             end = float(seg["end"])
+            if source_duration:
+                end = min(end, source_duration)
             if end <= start:
                 print(f"⚠️ Skipping invalid clip {i}: start >= end")
                 continue
-            duration = end - start
         except Exception as e:
             print(f"⚠️ Skipping invalid clip {i}: {e}")
             continue
 
         out_path = os.path.join(output_dir, f"{base}_clip_{i+1}.mp4")
+        keyframe = nearest_keyframe(keyframes, start, snap_tolerance)
+
+        if keyframe is not None and end > keyframe:
+            try:
+                (
+                    ffmpeg
+                    .input(video_path, ss=keyframe, t=end - keyframe)
+                    .output(out_path, c='copy', avoid_negative_ts='make_zero', movflags='faststart')
+                    .overwrite_output()
+                    .run(quiet=True)
+                )
+                saved_paths.append(out_path)
+                durations.append(end - keyframe)
+                continue
+            except ffmpeg.Error as e:
+                print(f"⚠️ Stream copy failed for clip {i+1}, transcoding instead: {e.stderr.decode()[:200]}")
+
         try:
             (
                 ffmpeg
-                .input(video_path, ss=start, t=duration)
+                .input(video_path, ss=start, t=end - start)
                 .output(
                     out_path,
+                    vf=REEL_VF,
+                    r=REEL_FPS,
                     vcodec='libx264',
                     preset='fast',
                     crf=23,
+                    pix_fmt='yuv420p',
                     acodec='aac',
-                    audio_bitrate='128k',
+                    audio_bitrate='192k',
+                    ac=2,
                     movflags='faststart'
                 )
                 .overwrite_output()
                 .run(quiet=True)
             )
             saved_paths.append(out_path)
+            durations.append(end - start)
         except ffmpeg.Error as e:
             print(f"⚠️ Failed to save clip {i+1} from {video_path}: {e.stderr.decode()}")
 
-    return saved_paths
+    add_file_bytes(*saved_paths)
+    return saved_paths, durations
 
 
 # -------------------------------
 # Concatenate clips into final reel
 # -------------------------------
-def make_final_reel(clips: List[str], output_path: str) -> str:
+@timed_stage("make_final_reel")
+def make_final_reel(clips: List[str], output_path: str, durations: Optional[List[float]] = None, crossfade: float = 0.5) -> str:
+    """
+    Render the reel in a single ffmpeg invocation: every raw clip is trimmed, scaled,
+    padded, resampled to the reel fps and given square pixels inside one filtergraph,
+    then chained through xfade/acrossfade. `durations` are the ones returned when
+    the clips were cut (see JobWorkspace.clip_durations); ffprobe is only used for
+    clips without one.
+    """
     if not clips:
         raise ValueError("No clips provided.")
 
-    import ffmpeg
-    preprocessed = []
-
-    # Preprocess clips (scale, pad, fix FPS)
-    for i, clip in enumerate(clips):
-        tmp = clip.replace(".mp4", "_prep.mp4")
-        (
-            ffmpeg
-            .input(clip)
-            .output(
-                tmp,
-                vf='scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:(ow-iw)/2:(oh-ih)/2,setsar=1',
-                r=30,
-                vcodec='libx264',
-                preset='fast',
-                crf=23,
-                acodec='aac',
-                audio_bitrate='192k',
-                ac=2
-            )
-            .overwrite_output()
-            .run(quiet=True)
-        )
-        preprocessed.append(tmp)
+    durations = list(durations or [])
+    durations += [None] * (len(clips) - len(durations))
+    durations = [d if safe_float(d) > 0 else get_duration(clip) for clip, d in zip(clips, durations)]
 
-    # Get durations safely and filter out invalid clips
-    durations = []
-    valid_preprocessed = []
-    for c in preprocessed:
-        dur = get_duration(c)
-        try:
-            dur = float(dur)
-        except Exception:
-            dur = 0.0
-        if dur > 0.0:
-            durations.append(dur)
-            valid_preprocessed.append(c)
-
-    if not valid_preprocessed:
-        raise ValueError("No valid preprocessed clips to merge.")
+    # Filter out clips without a usable duration
+    valid = [(clip, float(safe_float(d))) for clip, d in zip(clips, durations) if safe_float(d) > crossfade]
+    if not valid:
+        raise ValueError("No valid clips to merge.")
 
-    preprocessed = valid_preprocessed
-
-    # Calculate xfade offsets safely
-    cumulative = durations[0]
-    offsets = []
-    for d in durations[1:]:
-        offsets.append(round(float(cumulative) - 0.5, 3))  # ensure float
-        cumulative = float(cumulative) + float(d) - 0.5
-
-    # Build inputs for ffmpeg CLI
     inputs = []
-    for clip in preprocessed:
-        inputs.extend(["-i", clip])
-
-    # Build filter_complex
     filter_parts = []
-    last_v, last_a = "[0:v]", "[0:a]"
-    for i in range(1, len(preprocessed)):
+    for i, (clip, dur) in enumerate(valid):
+        inputs.extend(["-i", clip])
+        filter_parts.append(
+            f"[{i}:v]trim=duration={dur:.3f},setpts=PTS-STARTPTS,{REEL_VF},fps={REEL_FPS},format=yuv420p[v{i}]"
+        )
         filter_parts.append(
-            f"{last_v}[{i}:v]xfade=transition=fade:duration=0.5:offset={offsets[i-1]}[v{i}out];"
-            f"{last_a}[{i}:a]acrossfade=d=0.5[a{i}out]"
+            f"[{i}:a]atrim=duration={dur:.3f},asetpts=PTS-STARTPTS,"
+            f"aformat=sample_fmts=fltp:sample_rates=48000:channel_layouts=stereo[a{i}]"
         )
-        last_v, last_a = f"[v{i}out]", f"[a{i}out]"
 
-    filter_complex = ";".join(filter_parts)
+    # Chain crossfades; each offset is where the next clip starts fading in
+    last_v, last_a = "[v0]", "[a0]"
+    cumulative = valid[0][1]
+    for i in range(1, len(valid)):
+        offset = round(cumulative - crossfade, 3)
+        filter_parts.append(
+            f"{last_v}[v{i}]xfade=transition=fade:duration={crossfade}:offset={offset}[vx{i}]"
+        )
+        filter_parts.append(f"{last_a}[a{i}]acrossfade=d={crossfade}[ax{i}]")
+        last_v, last_a = f"[vx{i}]", f"[ax{i}]"
+        cumulative = cumulative + valid[i][1] - crossfade
 
-    # Run final ffmpeg merge
     cmd = [
         "ffmpeg", "-y", *inputs,
-        "-filter_complex", filter_complex,
+        "-filter_complex", ";".join(filter_parts),
         "-map", last_v, "-map", last_a,
         "-c:v", "libx264",
         "-pix_fmt", "yuv420p",
@@ -671,10 +1083,12 @@ def make_final_reel(clips: List[str], output_path: str) -> str:
         "-preset", "fast",
         "-c:a", "aac",
         "-b:a", "192k",
+        "-movflags", "+faststart",
         "-shortest",
         output_path
     ]
     subprocess.run(cmd, check=True)
+    add_file_bytes(*[clip for clip, _ in valid], output_path)
     return output_path
 
 
@@ -714,73 +1128,257 @@ def get_duration(video_path: str) -> float:
         return 0.0
 
 # --- Step 4: deduplicate by frame similarity ---
-def is_duplicate_clip(clip_a: str, clip_b: str, hash_size=8, threshold=5) -> bool:
+def is_duplicate_clip(clip_a: str, clip_b: str, threshold: int = DUPLICATE_BITS_PER_FRAME) -> bool:
     """
-    Check if two video clips are duplicates based on their first frame hash similarity.
-    Uses manual Hamming distance calculation to avoid ImageHash subtraction issues.
+    Check if two clips are duplicates by comparing their sampled-frame signatures.
+    `threshold` is the allowed Hamming distance in bits per sampled frame.
     """
-    cap_a = cv2.VideoCapture(clip_a)
-    cap_b = cv2.VideoCapture(clip_b)
-    
-    # Get first frames
-    ret_a, frame_a = cap_a.read()
-    ret_b, frame_b = cap_b.read()
-    
-    cap_a.release()
-    cap_b.release()
-    
-    # If either frame couldn't be read, assume not duplicate
-    if not (ret_a and ret_b) or frame_a is None or frame_b is None:
+    sig_a, sig_b = video_signature(clip_a), video_signature(clip_b)
+    if sig_a is None or sig_b is None:
         return False
+    return signature_distance(sig_a, sig_b) <= threshold * len(sig_a)
 
-    try:
-        # Convert frames to PIL Images
-        img_a = Image.fromarray(cv2.cvtColor(frame_a, cv2.COLOR_BGR2RGB))
-        img_b = Image.fromarray(cv2.cvtColor(frame_b, cv2.COLOR_BGR2RGB))
 
-        # Generate hashes and immediately convert to hex strings
-        hash_a_obj = imagehash.average_hash(img_a, hash_size=hash_size)
-        hash_b_obj = imagehash.average_hash(img_b, hash_size=hash_size)
-        
-        # Convert to hex strings
-        hex_a = str(hash_a_obj)
-        hex_b = str(hash_b_obj)
-        
-        # Calculate Hamming distance manually
-        if len(hex_a) != len(hex_b):
-            return False
-            
-        hamming_distance = sum(c1 != c2 for c1, c2 in zip(hex_a, hex_b))
-        return hamming_distance <= threshold
-            
-    except Exception as e:
-        print(f"⚠️ Failed to compute hash similarity for clips {clip_a}, {clip_b}: {e}")
-        return False
-
-
-def deduplicate_clips(clips: List[str]) -> List[str]:
+@timed_stage("deduplicate_clips")
+def deduplicate_clips(clips: List[str], threshold: int = DUPLICATE_BITS_PER_FRAME,
+                      index: Optional[BKTree] = None) -> List[str]:
     """
-    Remove duplicate clips based on first frame similarity.
+    Remove near-duplicate clips. Each clip is opened once and hashed from several
+    sampled frames into 64-bit integers; lookups go through a BK-tree, so the cost
+    is close to linear in the number of clips instead of pairwise.
+    Pass the same `index` across calls to deduplicate clips incrementally as they arrive.
     """
     if not clips:
         return []
-        
+
+    if index is None:
+        index = BKTree(signature_distance)
     unique_clips = []
-    
+
     for clip in clips:
-        # Check if this clip is a duplicate of any existing unique clip
-        is_duplicate = False
-        for existing in unique_clips:
-            try:
-                if is_duplicate_clip(clip, existing):
-                    is_duplicate = True
-                    break
-            except Exception as e:
-                print(f"⚠️ Error comparing clips, assuming not duplicate: {e}")
-                # If comparison fails, assume not duplicate to be safe
-                continue
-        
-        if not is_duplicate:
+        try:
+            signature = video_signature(clip)
+            add_frames(len(SIGNATURE_SAMPLES))
+        except Exception as e:
+            print(f"⚠️ Could not hash {clip}, assuming not duplicate: {e}")
+            signature = None
+
+        # If a clip can't be hashed, keep it to be safe
+        if signature is None:
             unique_clips.append(clip)
-    
-    return unique_clips
\ No newline at end of file
+            continue
+
+        if index.find_within(signature, threshold * len(signature)):
+            continue
+
+        index.add(signature, clip)
+        unique_clips.append(clip)
+
+    return unique_clips
+
+
+# -------------------------------
+# Per-video highlight pipeline
+# -------------------------------
+def parse_youtube_video_id(url: str) -> Optional[str]:
+    """Extract the 11-character video id from a YouTube watch/short/embed URL."""
+    import re
+    m = re.search(r"(?:v=|youtu\.be/|/shorts/|/embed/)([\w-]{11})", url or "")
+    return m.group(1) if m else None
+
+def _overlap(a: dict, b: dict) -> float:
+    return max(0.0, min(float(a["end"]), float(b["end"])) - max(float(a["start"]), float(b["start"])))
+
+def _select_cached_segments(video_id: Optional[str], analysis: dict, top_k: int,
+                            segment_index: Optional[SegmentIndex] = None, source: str = "") -> List[dict]:
+    """
+    Reuse a stored selection for this top_k, or run selection and store it with the analysis.
+    With a segment_index, candidates that repeat a play already kept from another video in
+    this job are dropped before selection, and the chosen segments are added to the index.
+    """
+    candidates = analysis.get("candidates") or []
+    excluded = []
+    if segment_index is not None:
+        for idx, c in enumerate(candidates):
+            match = segment_index.find_duplicate(c.get("frame_hashes"), c.get("audio_fingerprint"), source)
+            if match is not None:
+                print(f"🔁 Skipping {source} segment {c['start']:.1f}-{c['end']:.1f}s, duplicate of {match}")
+                excluded.append(idx)
+    remaining = [c for idx, c in enumerate(candidates) if idx not in excluded]
+
+    # The selection depends on the mode and on which candidates were available, so key it on both
+    mode = HIGHLIGHT_SELECTION_MODE.lower()
+    key = f"{mode}:{top_k}" if not excluded else f"{mode}:{top_k}:excl={','.join(map(str, excluded))}"
+    selections = analysis.setdefault("selections", {})
+    segments = selections.get(key)
+    if segments is None:
+        segments = select_highlight_segments(remaining, top_k=top_k, mode=mode) if remaining else []
+        selections[key] = segments
+        if video_id:
+            save_video_analysis(video_id, ANALYSIS_VERSION, analysis)
+
+    if segment_index is not None:
+        for seg in segments:
+            best = max(remaining, key=lambda c: _overlap(c, seg), default=None)
+            if best is not None and _overlap(best, seg) > 0:
+                segment_index.add(best.get("frame_hashes"), best.get("audio_fingerprint"),
+                                  source, f"{source} @ {float(seg['start']):.1f}s")
+
+    # Fallback: guarantee at least one short clip if video isn't empty
+    # (not when every candidate was a duplicate of another video)
+    duration = float(analysis.get("duration") or 0.0)
+    if not segments and not excluded and duration > 2:
+        segments = [{"start": 0.0, "end": min(5.0, duration)}]
+    return segments
+
+def _lookup_analysis(video_id: Optional[str], max_duration: int) -> Optional[dict]:
+    """Cached analysis for this video, unless it was stored without candidates that are now needed."""
+    if not video_id:
+        return None
+    analysis = get_cached_video_analysis(video_id, ANALYSIS_VERSION)
+    if analysis is None:
+        return None
+    if analysis.get("candidates") is None and is_video_usable(analysis, max_duration):
+        return None  # previously skipped as too long for a smaller max_duration
+    print(f"♻️ Analysis cache hit for {video_id}")
+    return analysis
+
+def _process_full_download(url: str, top_k_per_video: int, max_duration: int, job: JobWorkspace,
+                           segment_index: Optional[SegmentIndex] = None) -> Tuple[List[str], List[Optional[float]]]:
+    """Download the whole video, analyze it (or reuse the cached analysis), and cut the selected clips locally. Returns (clips, durations)."""
+    video_id = parse_youtube_video_id(url)
+    analysis = _lookup_analysis(video_id, max_duration)
+    if analysis is not None and not is_video_usable(analysis, max_duration, url):
+        return [], []
+
+    video_path = None
+    try:
+        job.reserve(MAX_DOWNLOAD_MB * 1024 * 1024)
+        video_path = download_youtube_video(url, output_dir=job.downloads)
+
+        if analysis is None:
+            analysis = analyze_video(video_path, max_duration=max_duration)
+            if video_id:
+                save_video_analysis(video_id, ANALYSIS_VERSION, analysis)
+            if not is_video_usable(analysis, max_duration, url):
+                return [], []
+
+        segments = _select_cached_segments(video_id, analysis, top_k_per_video, segment_index, video_id or url)
+        if not segments:
+            return [], []
+        return save_highlight_clips(video_path, segments, output_dir=job.highlights,
+                                    source_duration=analysis.get("duration"))
+    finally:
+        # ALWAYS clean up the downloaded video immediately
+        if video_path and os.path.exists(video_path):
+            cleanup_files([video_path])
+
+def _process_two_phase(url: str, top_k_per_video: int, max_duration: int, job: JobWorkspace,
+                       segment_index: Optional[SegmentIndex] = None) -> Tuple[List[str], List[Optional[float]]]:
+    """
+    Analyze a low-bitrate rendition, then fetch only the selected sections at reel quality.
+    On an analysis cache hit the analysis download is skipped entirely. Returns (clips, durations).
+    """
+    video_id = parse_youtube_video_id(url)
+    analysis = _lookup_analysis(video_id, max_duration)
+
+    if analysis is None:
+        job.reserve(MAX_ANALYSIS_DOWNLOAD_MB * 1024 * 1024)
+        analysis_path = download_analysis_rendition(url, output_dir=job.downloads)
+        try:
+            analysis = analyze_video(analysis_path, max_duration=max_duration)
+        finally:
+            cleanup_files([analysis_path])
+        if video_id:
+            save_video_analysis(video_id, ANALYSIS_VERSION, analysis)
+
+    if not is_video_usable(analysis, max_duration, url):
+        return [], []
+
+    segments = _select_cached_segments(video_id, analysis, top_k_per_video, segment_index, video_id or url)
+    if not segments:
+        return [], []
+    job.reserve(MAX_DOWNLOAD_MB * 1024 * 1024)
+    return download_video_sections(url, segments, output_dir=job.highlights,
+                                   source_duration=analysis.get("duration"))
+
+def generate_highlight_clips(urls: List[str], top_k_per_video: int = 3, max_duration: int = 1200,
+                             two_phase: bool = True, *, job: JobWorkspace,
+                             on_clip: Optional[Callable[[str], None]] = None) -> List[str]:
+    """
+    Turn a list of YouTube URLs into deduplicated, shuffled highlight clips.
+    Videos are processed sequentially and cleaned up immediately. In two-phase mode
+    only a low-bitrate rendition and the selected sections are downloaded; if that
+    fails for a video, it falls back to the full download.
+
+    Segments that repeat a play already taken from an earlier video (re-uploads,
+    compilations) are dropped from the analysis candidates before selection, so
+    they are never sent to the LLM, downloaded or encoded. The clip-level pass
+    at the end remains as a safety net for anything the fingerprints missed.
+
+    All downloads and clips are written inside `job`; the caller owns the
+    returned clips and finishes or releases the job when done. Each returned
+    clip's duration is recorded in job.clip_durations for make_final_reel.
+
+    Clips are deduplicated as each video finishes. If `on_clip` is given it is
+    called with every unique clip as soon as it is ready, in processing order,
+    so a reel can be streamed while later videos are still being processed;
+    the returned list is then left unshuffled to match what was streamed.
+    """
+    import gc
+    import random
+
+    unique_clips: List[str] = []
+    clip_index = BKTree(signature_distance)
+    segment_index = SegmentIndex()
+
+    for i, url in enumerate(urls):
+        clips_from_this_video = []
+
+        try:
+            print(f"📹 Processing video {i+1}/{len(urls)}: {url}")
+
+            if two_phase:
+                try:
+                    clips_from_this_video, durations = _process_two_phase(url, top_k_per_video, max_duration, job, segment_index)
+                except Exception as e:
+                    print(f"⚠️ Two-phase download failed for {url}, falling back to full download: {e}")
+                    clips_from_this_video, durations = _process_full_download(url, top_k_per_video, max_duration, job, segment_index)
+            else:
+                clips_from_this_video, durations = _process_full_download(url, top_k_per_video, max_duration, job, segment_index)
+
+            print(f"✅ Extracted {len(clips_from_this_video)} clips from video {i+1}")
+
+            new_clips = deduplicate_clips(clips_from_this_video, index=clip_index)
+            duplicates = [clip for clip in clips_from_this_video if clip not in new_clips]
+            if duplicates:
+                print(f"🔍 Dropped {len(duplicates)} duplicate clips")
+                cleanup_files(duplicates)
+            unique_clips.extend(new_clips)
+            job.clip_durations.update(
+                (clip, duration) for clip, duration in zip(clips_from_this_video, durations)
+                if clip in new_clips and duration
+            )
+            clips_from_this_video = []  # now owned by unique_clips
+
+            if on_clip:
+                for clip in new_clips:
+                    on_clip(clip)
+
+        except Exception as e:
+            print(f"⚠️ Error processing {url}: {e}")
+            # Clean up any partial clips from failed processing
+            if clips_from_this_video:
+                cleanup_files(clips_from_this_video)
+        finally:
+            # Force garbage collection after each video
+            gc.collect()
+
+    if not on_clip:
+        random.shuffle(unique_clips)
+
+    if not unique_clips:
+        raise ValueError("No valid highlight clips found for this player.")
+
+    print(f"✅ Generated {len(unique_clips)} unique highlight clips")
+    return unique_clips
@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Relative weight of each (per-video normalized) candidate feature
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "motion_score": 0.35,
+    "avg_density": 0.40,
+    "has_audio_spike": 0.20,
+    "duration": 0.05,
+}
+
+# Duration the duration feature peaks at; highlights are usually one play
+IDEAL_DURATION = 7.0
+
+# Candidates overlapping a better-ranked one by more than this (temporal IoU) are suppressed
+NMS_IOU_THRESHOLD = 0.3
+
+# Scores within this margin of the top_k cutoff are treated as ties in hybrid mode
+TIE_MARGIN = 0.05
+
+
+def _normalize(values: Sequence[float]) -> List[float]:
+    """Min-max scale to [0, 1]; a constant feature carries no signal and scales to 0."""
+    lo, hi = min(values), max(values)
+    if hi - lo <= 1e-9:
+        return [0.0 for _ in values]
+    return [(v - lo) / (hi - lo) for v in values]
+
+
+def score_candidates(candidates: List[dict], weights: Optional[Dict[str, float]] = None,
+                     ideal_duration: float = IDEAL_DURATION) -> List[float]:
+    """
+    Weighted sum of motion_score, avg_density, has_audio_spike and duration fit.
+    Motion features are normalized within the video, so scores rank segments
+    against each other rather than across videos. Deterministic for a given input.
+    """
+    if not candidates:
+        return []
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+
+    motion = _normalize([float(c.get("motion_score") or 0.0) for c in candidates])
+    density = _normalize([float(c.get("avg_density") or 0.0) for c in candidates])
+    audio = [1.0 if c.get("has_audio_spike") else 0.0 for c in candidates]
+    duration_fit = [
+        max(0.0, 1.0 - abs(float(c.get("duration") or 0.0) - ideal_duration) / ideal_duration)
+        for c in candidates
+    ]
+
+    return [
+        weights["motion_score"] * m
+        + weights["avg_density"] * d
+        + weights["has_audio_spike"] * a
+        + weights["duration"] * f
+        for m, d, a, f in zip(motion, density, audio, duration_fit)
+    ]
+
+
+def temporal_iou(a: dict, b: dict) -> float:
+    inter = max(0.0, min(float(a["end"]), float(b["end"])) - max(float(a["start"]), float(b["start"])))
+    union = max(float(a["end"]), float(b["end"])) - min(float(a["start"]), float(b["start"]))
+    return inter / union if union > 0 else 0.0
+
+
+def rank_candidates(candidates: List[dict], weights: Optional[Dict[str, float]] = None,
+                    iou_threshold: float = NMS_IOU_THRESHOLD) -> List[Tuple[float, dict]]:
+    """
+    (score, candidate) pairs best-first after non-maximum suppression: a candidate
+    is dropped if it overlaps an already-kept, higher-scoring one by more than
+    iou_threshold. Ties keep the earlier segment so the order is stable.
+    """
+    scores = score_candidates(candidates, weights)
+    order = sorted(range(len(candidates)), key=lambda i: (-scores[i], float(candidates[i]["start"])))
+
+    kept: List[Tuple[float, dict]] = []
+    for i in order:
+        if all(temporal_iou(candidates[i], other) <= iou_threshold for _, other in kept):
+            kept.append((scores[i], candidates[i]))
+    return kept
+
+
+def split_ties(ranked: List[Tuple[float, dict]], top_k: int,
+               margin: float = TIE_MARGIN) -> Tuple[List[dict], List[dict], int]:
+    """
+    Split a ranking at the top_k cutoff into (confident, contenders, open_slots).
+    Confident candidates score clearly above the cutoff; contenders are within
+    `margin` of it and compete for the remaining open_slots. When there are no
+    more contenders than slots, the local ranking is unambiguous.
+    """
+    if len(ranked) <= top_k:
+        return [c for _, c in ranked], [], 0
+
+    cutoff = ranked[top_k - 1][0]
+    confident = [c for s, c in ranked if s > cutoff + margin]
+    contenders = [c for s, c in ranked if abs(s - cutoff) <= margin]
+    return confident, contenders, top_k - len(confident)
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from typing import Any, Awaitable, Callable, List, Optional
+
+from core.db import get_db_connection
+
+load_dotenv()
+
+# Scraped records written (and committed) per upsert batch
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "250"))
+# A partial batch is written anyway once its oldest record has waited this long, so slow crawls land steadily
+INGEST_FLUSH_SECONDS = float(os.getenv("INGEST_FLUSH_SECONDS", "60"))
+# Scrapers block on a full queue, which bounds memory if the database falls behind
+INGEST_QUEUE_SIZE = 1000
+
+_DONE = object()
+
+
+def _write(conn, cursor, write_batch, after_commit, batch):
+    try:
+        write_batch(cursor, batch)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if after_commit:
+        after_commit(batch)
+
+
+async def ingest(
+    produce: Callable[[asyncio.Queue], Awaitable[Any]],
+    write_batch: Callable[[Any, List[Any]], None],
+    after_commit: Optional[Callable[[List[Any]], None]] = None,
+    batch_size: int = INGEST_BATCH_SIZE,
+    flush_seconds: float = INGEST_FLUSH_SECONDS,
+) -> int:
+    """
+    Stream scraped records into the database while the crawl runs.
+
+    produce(queue) puts records on a bounded queue. A writer groups them into
+    batches of `batch_size` (or whatever has arrived after `flush_seconds`),
+    runs write_batch(cursor, batch) in a worker thread and commits each batch,
+    then calls after_commit(batch) in that same thread, so blocking follow-up
+    writes such as CrawlState.flush stay off the event loop. If either side
+    fails the other is cancelled; committed batches stay committed. Returns the
+    number of records written.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+    written = 0
+
+    async def producer():
+        await produce(queue)
+        await queue.put(_DONE)
+
+    async def writer():
+        nonlocal written
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        batch: List[Any] = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    record = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    record = None
+
+                finished = record is _DONE
+                if record is not None and not finished:
+                    batch.append(record)
+                    if deadline is None:
+                        deadline = time.monotonic() + flush_seconds
+
+                if batch and (finished or record is None or len(batch) >= batch_size):
+                    await asyncio.to_thread(_write, conn, cursor, write_batch, after_commit, batch)
+                    written += len(batch)
+                    print(f"💾 Committed {len(batch)} records ({written} total)")
+                    batch, deadline = [], None
+
+                if finished:
+                    return
+        finally:
+            cursor.close()
+            conn.close()
+
+    async with asyncio.TaskGroup() as tasks:
+        tasks.create_task(producer())
+        tasks.create_task(writer())
+    return written
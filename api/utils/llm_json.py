@@ -0,0 +1,144 @@
+import json
+import os
+
+from dotenv import load_dotenv
+from typing import Any, Optional
+
+load_dotenv()
+
+# Ask the API for JSON-only output (OpenAI-compatible response_format) so replies
+# parse on the fast path without repair. Off by default; not used for batch arrays.
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "false").lower() == "true"
+# Optional JSONL file collecting outputs that could not be parsed, for the parser benchmark corpus
+LLM_JSON_FAILURE_LOG = os.getenv("LLM_JSON_FAILURE_LOG", "")
+
+_WHITESPACE = " \t\r\n"
+_OPENERS = {"object": "{", "array": "["}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def json_mode_kwargs() -> dict:
+    """Extra chat completion kwargs that request a JSON object, when LLM_JSON_MODE is on."""
+    return {"response_format": {"type": "json_object"}} if LLM_JSON_MODE else {}
+
+
+def _find_start(text: str, expect: Optional[str]) -> int:
+    if expect:
+        return text.find(_OPENERS[expect])
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return min(starts) if starts else -1
+
+
+def _repair_scan(text: str, start: int) -> str:
+    """
+    One string-aware pass from the opening bracket to its match. Along the way it
+    escapes quotes inside strings that can't be closing quotes (the next
+    non-space character isn't , : } or ]) and drops trailing commas before a
+    closing bracket. The slice is returned untouched when nothing needed fixing.
+    """
+    depth, in_string, escape = 0, False, False
+    last_comma = None
+    edits = []  # (index, replacement)
+    n = len(text)
+    i = start
+    end = None
+
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                j = i + 1
+                while j < n and text[j] in _WHITESPACE:
+                    j += 1
+                if j >= n or text[j] in ",:}]":
+                    in_string = False
+                else:
+                    edits.append((i, '\\"'))
+        elif ch == '"':
+            in_string = True
+            last_comma = None
+        elif ch == "{" or ch == "[":
+            depth += 1
+            last_comma = None
+        elif ch == "}" or ch == "]":
+            if last_comma is not None:
+                edits.append((last_comma, ""))
+                last_comma = None
+            depth -= 1
+            if depth == 0:
+                end = i
+                break
+        elif ch == ",":
+            last_comma = i
+        elif ch not in _WHITESPACE:
+            last_comma = None
+        i += 1
+
+    if end is None:
+        raise ValueError("LLM output ended before the JSON value closed")
+    if not edits:
+        return text[start:end + 1]
+
+    pieces, prev = [], start
+    for index, replacement in edits:
+        pieces.append(text[prev:index])
+        pieces.append(replacement)
+        prev = index + 1
+    pieces.append(text[prev:end + 1])
+    return "".join(pieces)
+
+
+def loads_llm_json(text: str, expect: Optional[str] = "object") -> Any:
+    """
+    Parse the JSON value in an LLM reply, ignoring code fences and any prose around it.
+    expect is "object", "array" or None (whichever comes first).
+
+    Fast path: json.loads on the span from the first opening bracket to the last
+    matching closer, which is all a well-formed reply needs. Otherwise one
+    repair pass (see _repair_scan) and a second json.loads. Raises ValueError.
+    """
+    if not text:
+        raise ValueError("LLM output is empty")
+
+    start = _find_start(text, expect)
+    if start == -1:
+        raise ValueError(f"No JSON {expect or 'value'} found in LLM output")
+
+    end = text.rfind(_CLOSERS[text[start]])
+    if end > start:
+        try:
+            return json.loads(text[start:end + 1], strict=False)
+        except json.JSONDecodeError:
+            pass
+
+    return json.loads(_repair_scan(text, start), strict=False)
+
+
+def parse_llm_json(text: str, expect: Optional[str] = "object") -> Optional[Any]:
+    """loads_llm_json that returns None (and logs the output) instead of raising."""
+    try:
+        value = loads_llm_json(text, expect)
+    except ValueError as e:
+        print(f"JSON parse error in LLM output: {e}\nOriginal text:\n{text}")
+        record_failure(text)
+        return None
+
+    if (expect == "object" and not isinstance(value, dict)) or (expect == "array" and not isinstance(value, list)):
+        print(f"LLM output is not a JSON {expect}:\n{text}")
+        return None
+    return value
+
+
+def record_failure(text: str):
+    """Append an unparseable output to LLM_JSON_FAILURE_LOG, if set."""
+    if not LLM_JSON_FAILURE_LOG:
+        return
+    try:
+        with open(LLM_JSON_FAILURE_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"text": text}) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not record LLM JSON failure: {e}")
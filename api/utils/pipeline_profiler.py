@@ -0,0 +1,228 @@
+import functools
+import json
+import os
+import resource
+import threading
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Where per-job metrics (and optional profiler captures) are written
+PROFILE_DIR = os.getenv("HIGHLIGHT_PROFILE_DIR", "profiles")
+# Optional whole-job capture: "cprofile" or "pyinstrument"; unset disables it
+PROFILE_CAPTURE = os.getenv("HIGHLIGHT_PROFILE_CAPTURE", "").lower()
+# Oldest job files beyond this count are pruned
+PROFILE_KEEP = 200
+
+_current_profile: ContextVar[Optional["PipelineProfile"]] = ContextVar("pipeline_profile", default=None)
+_current_stage: ContextVar[Optional[str]] = ContextVar("pipeline_stage", default=None)
+# Only one capture can run per process (cProfile raises if a second one is enabled)
+_capture_lock = threading.Lock()
+
+
+def _process_peak_rss_mb() -> Dict[str, float]:
+    """
+    Lifetime high-water RSS of this process and of its largest finished child
+    (ffmpeg, yt-dlp), in MB. These never go down, so in a long-lived server they
+    describe the process, not any one job.
+    """
+    # ru_maxrss is KB on Linux
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def _current_rss_mb() -> Optional[float]:
+    """Current RSS of this process in MB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PipelineProfile:
+    """
+    Per-job totals for each pipeline stage: calls, wall seconds, bytes processed
+    and frames decoded. rss_mb is the process RSS when the job started and the
+    highest value sampled at any stage boundary during it; process_peak_rss_mb
+    is the process-lifetime high-water mark (see _process_peak_rss_mb).
+    Nested stages are recorded separately, so a parent's time includes its children.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started = time.time()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        rss = _current_rss_mb()
+        self.rss_mb = {"start": rss, "peak": rss}
+        self.process_peak_rss_mb = _process_peak_rss_mb()
+        self.wall_seconds = 0.0
+
+    def _stage(self, name: str) -> Dict[str, float]:
+        return self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0, "frames": 0})
+
+    def record(self, name: str, seconds: float = 0.0, calls: int = 0, nbytes: int = 0, frames: int = 0):
+        entry = self._stage(name)
+        entry["calls"] += calls
+        entry["seconds"] += seconds
+        entry["bytes"] += nbytes
+        entry["frames"] += frames
+
+    def sample_rss(self):
+        rss = _current_rss_mb()
+        if rss is not None:
+            self.rss_mb["peak"] = max(self.rss_mb["peak"] or 0.0, rss)
+        self.process_peak_rss_mb = _process_peak_rss_mb()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "started": self.started,
+            "wall_seconds": self.wall_seconds,
+            "rss_mb": self.rss_mb,
+            "process_peak_rss_mb": self.process_peak_rss_mb,
+            "stages": self.stages,
+        }
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as pipeline stage `name`. A no-op outside profile_job."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    token = _current_stage.set(name)
+    profile.sample_rss()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(name, seconds=time.perf_counter() - started, calls=1)
+        profile.sample_rss()
+        _current_stage.reset(token)
+
+
+def timed_stage(name: str):
+    """Decorator form of stage()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_bytes(nbytes: int):
+    """Attribute bytes read or written to the innermost running stage."""
+    profile, name = _current_profile.get(), _current_stage.get()
+    if profile is not None and name is not None and nbytes:
+        profile.record(name, nbytes=int(nbytes))
+
+
+def add_frames(frames: int):
+    """Attribute decoded frames to the innermost running stage."""
+    profile, name = _current_profile.get(), _current_stage.get()
+    if profile is not None and name is not None and frames:
+        profile.record(name, frames=int(frames))
+
+
+def add_file_bytes(*paths: str):
+    """add_bytes() for the current size of each existing file."""
+    add_bytes(sum(os.path.getsize(p) for p in paths if p and os.path.exists(p)))
+
+
+def _prune_profiles():
+    entries = sorted(
+        (e for e in os.scandir(PROFILE_DIR) if e.is_file()),
+        key=lambda e: e.stat().st_mtime,
+    )
+    for entry in entries[:-PROFILE_KEEP]:
+        os.remove(entry.path)
+
+
+@contextmanager
+def profile_job(job_id: str, capture: Optional[str] = None):
+    """
+    Collect stage metrics for everything run inside the block, then log a summary
+    and save PROFILE_DIR/<job_id>.json. With capture="cprofile" (or "pyinstrument",
+    if installed) the whole job is also profiled to <job_id>.prof / <job_id>.html.
+    Defaults to HIGHLIGHT_PROFILE_CAPTURE. Only one job captures at a time; jobs
+    that overlap it record metrics only. cProfile only sees the thread that
+    entered the block, not work handed to worker threads.
+    """
+    capture = PROFILE_CAPTURE if capture is None else capture.lower()
+    profile = PipelineProfile(job_id)
+    token = _current_profile.set(profile)
+
+    capturing = False
+    if capture:
+        capturing = _capture_lock.acquire(blocking=False)
+        if not capturing:
+            print(f"⚠️ Another job is being profiled, skipping capture for {job_id}")
+            capture = ""
+
+    profiler = None
+    if capture == "cprofile":
+        import cProfile
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        except ValueError as e:  # another profiling tool (debugger, coverage) already owns the hook
+            print(f"⚠️ Could not start cProfile, skipping capture: {e}")
+            capture = ""
+    elif capture == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        except ImportError:
+            print("⚠️ pyinstrument not installed, skipping capture")
+            capture = ""
+
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.wall_seconds = time.perf_counter() - started
+        profile.sample_rss()
+        _current_profile.reset(token)
+
+        try:
+            if capture == "cprofile":
+                profiler.disable()
+            elif capture == "pyinstrument" and profiler is not None:
+                profiler.stop()
+        finally:
+            if capturing:
+                _capture_lock.release()
+
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            base = os.path.join(PROFILE_DIR, job_id)
+            if capture == "cprofile":
+                profiler.dump_stats(base + ".prof")
+            elif capture == "pyinstrument" and profiler is not None:
+                with open(base + ".html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+
+            metrics = profile.to_dict()
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(metrics, f, indent=2)
+            _prune_profiles()
+
+            # One structured line per job so log pipelines can pick it up as a metric
+            print("📊 highlight_pipeline_metrics " + json.dumps(metrics, separators=(",", ":")))
+        except Exception as e:
+            print(f"⚠️ Could not save pipeline profile for {job_id}: {e}")
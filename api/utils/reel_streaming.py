@@ -0,0 +1,165 @@
+import math
+import os
+import subprocess
+import threading
+
+from typing import Callable, List, Optional, Tuple
+
+from core.workspace import JobWorkspace
+from utils.highlight_reel_helpers import REEL_FPS, REEL_VF, cleanup_files
+from utils.pipeline_profiler import add_file_bytes, profile_job, timed_stage
+
+# Length of each HLS media segment; keyframes are forced on this grid so segments cut cleanly
+HLS_SEGMENT_SECONDS = 4
+PLAYLIST_NAME = "reel.m3u8"
+
+# How long a stream request waits for the first segment before returning the playlist anyway
+FIRST_SEGMENT_TIMEOUT = 240
+
+
+class HlsReelWriter:
+    """
+    Builds an HLS EVENT playlist one clip at a time. Each clip is encoded straight
+    into the reel format as MPEG-TS segments and appended to the playlist as soon
+    as it is rendered, so players can start on the first highlight while later
+    videos are still downloading. Clips are joined with hard cuts (no crossfade).
+    """
+
+    def __init__(self, output_dir: str, segment_seconds: int = HLS_SEGMENT_SECONDS):
+        self.output_dir = output_dir
+        self.segment_seconds = segment_seconds
+        self.playlist_path = os.path.join(output_dir, PLAYLIST_NAME)
+        self.first_segment = threading.Event()
+        self.finished = False
+        self.error: Optional[str] = None
+        self._clips: List[List[Tuple[str, float]]] = []  # per clip: (segment filename, duration)
+        self._offset = 0.0
+        self._lock = threading.Lock()
+
+        os.makedirs(output_dir, exist_ok=True)
+        self._write_playlist()
+
+    @property
+    def segment_count(self) -> int:
+        return sum(len(segments) for segments in self._clips)
+
+    @timed_stage("hls_segments")
+    def add_clip(self, clip_path: str):
+        """Encode one clip into segments and publish them. Safe to call from a worker thread."""
+        with self._lock:
+            index = len(self._clips)
+            prefix = f"clip{index:03d}_"
+            segment_list = os.path.join(self.output_dir, f"{prefix}segments.csv")
+
+            cmd = [
+                "ffmpeg", "-y", "-v", "error",
+                "-i", clip_path,
+                "-vf", f"{REEL_VF},fps={REEL_FPS},format=yuv420p",
+                "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+                "-force_key_frames", f"expr:gte(t,n_forced*{self.segment_seconds})",
+                "-c:a", "aac", "-b:a", "192k", "-ar", "48000", "-ac", "2",
+                # Keep timestamps increasing across clips
+                "-output_ts_offset", f"{self._offset:.3f}",
+                "-f", "segment",
+                "-segment_time", str(self.segment_seconds),
+                "-segment_format", "mpegts",
+                "-segment_list", segment_list,
+                "-segment_list_type", "csv",
+                os.path.join(self.output_dir, f"{prefix}%03d.ts"),
+            ]
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+
+            segments = []
+            with open(segment_list, encoding="utf-8") as f:
+                for line in f:
+                    # filename,start_time,end_time
+                    parts = line.strip().split(",")
+                    if len(parts) >= 3:
+                        segments.append((parts[0], float(parts[2]) - float(parts[1])))
+            os.remove(segment_list)
+            if not segments:
+                return
+
+            add_file_bytes(clip_path, *[os.path.join(self.output_dir, name) for name, _ in segments])
+            self._clips.append(segments)
+            self._offset += sum(duration for _, duration in segments)
+            self._write_playlist()
+
+        print(f"📺 Streamed clip {index + 1} ({len(segments)} segments)")
+        self.first_segment.set()
+
+    def finish(self, error: Optional[str] = None):
+        """Close the playlist (#EXT-X-ENDLIST) and wake anyone waiting for the first segment."""
+        with self._lock:
+            self.error = error
+            self.finished = True
+            self._write_playlist()
+        self.first_segment.set()
+
+    def _write_playlist(self):
+        target = max([self.segment_seconds] + [math.ceil(d) for clip in self._clips for _, d in clip])
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{target}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for i, segments in enumerate(self._clips):
+            if i > 0:
+                lines.append("#EXT-X-DISCONTINUITY")
+            for filename, duration in segments:
+                lines.append(f"#EXTINF:{duration:.3f},")
+                lines.append(filename)
+        if self.finished:
+            lines.append("#EXT-X-ENDLIST")
+
+        # Replace atomically so players polling the playlist never read a partial file
+        tmp_path = self.playlist_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.playlist_path)
+
+
+def start_reel_stream(job: JobWorkspace, generate: Callable[[Callable[[str], None]], List[str]]) -> HlsReelWriter:
+    """
+    Run `generate(on_clip)` on a background thread, streaming every clip it reports
+    into an HLS playlist in the job's final_reels/ directory. Each clip file is
+    removed once its segments are written. When generation ends the playlist is
+    closed and the job is marked idle, so it stays playable until evicted.
+    """
+    writer = HlsReelWriter(job.final_reels)
+
+    def on_clip(clip_path: str):
+        try:
+            writer.add_clip(clip_path)
+        finally:
+            cleanup_files([clip_path])
+        job.touch()
+
+    def run():
+        error = None
+        try:
+            with profile_job(job.job_id):
+                generate(on_clip)
+        except ValueError as e:
+            error = str(e)
+        except Exception as e:
+            print(f"🔥 Streamed highlight reel error: {e}")
+            error = "Internal server error generating highlight reel"
+        finally:
+            writer.finish(error)
+            job.finish()
+
+    threading.Thread(target=run, name=f"reel-stream-{job.job_id}", daemon=True).start()
+    return writer
+
+
+def stream_status(job: JobWorkspace, writer: HlsReelWriter) -> dict:
+    """Response body for a stream request: where to fetch the playlist and how far along it is."""
+    return {
+        "job_id": job.job_id,
+        "playlist_url": f"/reels/{job.job_id}/{PLAYLIST_NAME}",
+        "segments": writer.segment_count,
+        "complete": writer.finished,
+    }
@@ -0,0 +1,216 @@
+import asyncio
+import os
+import random
+import time
+
+import httpx
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from utils.helpers import USER_AGENT, launch_browser, new_page, recreate_page, safe_goto
+
+load_dotenv()
+
+# Pages (each in its own browser context) open at once while scraping
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "4"))
+# Sustained page loads per minute per site. sports-reference / basketball-reference
+# block clients above 20/min, and 18 plus a burst of 2 never exceeds that in any minute.
+SCRAPER_REQUESTS_PER_MINUTE = float(os.getenv("SCRAPER_REQUESTS_PER_MINUTE", "18"))
+SCRAPER_BURST = int(os.getenv("SCRAPER_BURST", "2"))
+# "http" fetches static pages with httpx (a few MB per connection); "browser" loads them in Chromium
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "http").lower()
+
+
+class TokenBucket:
+    """Allows `burst` requests at once, refilled at `rate_per_minute`. acquire() waits for a token."""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DomainRateLimiter:
+    """One TokenBucket per site, so crawling two sites at once doesn't slow either down."""
+
+    def __init__(self, rate_per_minute: float = SCRAPER_REQUESTS_PER_MINUTE, burst: int = SCRAPER_BURST,
+                 overrides: Optional[Dict[str, float]] = None):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.overrides = overrides or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @staticmethod
+    def domain(url: str) -> str:
+        host = urlparse(url).hostname or ""
+        return host[4:] if host.startswith("www.") else host
+
+    async def acquire(self, url: str):
+        domain = self.domain(url)
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = TokenBucket(self.overrides.get(domain, self.rate_per_minute), self.burst)
+            self._buckets[domain] = bucket
+        await bucket.acquire()
+
+
+class PagePool:
+    """
+    A fixed set of reusable pages, each in its own browser context, shared by
+    concurrent scrapes. Every navigation goes through safe_goto with the pool's
+    rate limiter, so callers only bound concurrency and never sleep themselves.
+
+        async with PagePool(browser) as pool:
+            async with pool.page(url) as page:
+                ...
+    """
+
+    def __init__(self, browser, size: int = SCRAPER_CONCURRENCY, limiter: Optional[DomainRateLimiter] = None):
+        self.browser = browser
+        self.size = max(1, size)
+        self.limiter = limiter or DomainRateLimiter()
+        self._idle: asyncio.Queue = asyncio.Queue()
+
+    async def start(self):
+        for _ in range(self.size):
+            self._idle.put_nowait(await new_page(self.browser))
+        return self
+
+    async def close(self):
+        while not self._idle.empty():
+            page = self._idle.get_nowait()
+            try:
+                await page.context.close()
+            except Exception:
+                pass
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @asynccontextmanager
+    async def page(self, url: str, timeout: int = 60000, max_retries: int = 3):
+        """Borrow a page that has loaded `url`. A page that fails to load is replaced before it goes back."""
+        page = await self._idle.get()
+        try:
+            try:
+                page = await safe_goto(page, url, max_retries=max_retries, timeout=timeout, limiter=self.limiter)
+            except Exception:
+                page = await recreate_page(page)
+                raise
+            yield page
+        finally:
+            self._idle.put_nowait(page)
+
+    async def html(self, url: str, timeout: float = 30, max_retries: int = 3) -> str:
+        """The rendered HTML of `url` (timeout in seconds), for parsers shared with HttpFetcher."""
+        async with self.page(url, timeout=int(timeout * 1000), max_retries=max_retries) as page:
+            return await page.content()
+
+
+class HttpFetcher:
+    """
+    Pooled async HTTP client for pages that don't need JavaScript. Same interface
+    as PagePool.html() and the same per-site rate limiter, without a browser.
+    """
+
+    def __init__(self, size: int = SCRAPER_CONCURRENCY, limiter: Optional[DomainRateLimiter] = None):
+        self.size = max(1, size)
+        self.limiter = limiter or DomainRateLimiter()
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.size, max_keepalive_connections=self.size),
+            timeout=30,
+        )
+        return self
+
+    async def close(self):
+        if self.client:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def get(self, url: str, timeout: float = 30, max_retries: int = 3, headers: Optional[dict] = None) -> httpx.Response:
+        """GET with a rate-limit token per attempt. 429s, 5xx and network errors are retried; other statuses are returned."""
+        for attempt in range(max_retries):
+            await self.limiter.acquire(url)
+            try:
+                response = await self.client.get(url, timeout=timeout, headers=headers)
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                print(f"⚠️ Request failed (attempt {attempt+1}) for {url}: {e}")
+                if attempt == max_retries - 1:
+                    raise
+                await asyncio.sleep(5 + random.random() * 5)
+
+    async def html(self, url: str, timeout: float = 30, max_retries: int = 3) -> str:
+        response = await self.get(url, timeout=timeout, max_retries=max_retries)
+        response.raise_for_status()
+        return response.text
+
+
+@asynccontextmanager
+async def html_fetcher(concurrency: int = SCRAPER_CONCURRENCY, backend: str = SCRAPER_BACKEND):
+    """
+    An HttpFetcher, or with backend="browser" a PagePool on a Chromium launched
+    (and closed) here. Either one has html(url) and size.
+    """
+    if backend != "browser":
+        async with HttpFetcher(size=concurrency) as fetcher:
+            yield fetcher
+        return
+
+    playwright, browser = await launch_browser(headless=True)
+    try:
+        async with PagePool(browser, size=concurrency) as pool:
+            yield pool
+    finally:
+        await browser.close()
+        await playwright.stop()
+
+
+async def gather_bounded(items: Iterable, fn: Callable[..., Awaitable], limit: int) -> List:
+    """
+    asyncio.gather over fn(item) with at most `limit` running at once. Results
+    keep input order; an item that raises is logged and comes back as None.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item):
+        async with semaphore:
+            return await fn(item)
+
+    results = await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Scrape task failed: {result}")
+            results[i] = None
+    return results
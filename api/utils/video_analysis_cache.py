@@ -0,0 +1,55 @@
+import json
+
+from typing import Optional
+
+select_sql = """
+    SELECT analysis_json FROM video_analysis_cache
+    WHERE video_id = %s AND analysis_version = %s
+"""
+
+upsert_sql = """
+    INSERT INTO video_analysis_cache (video_id, analysis_version, analysis_json)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE analysis_json = VALUES(analysis_json)
+"""
+
+def get_cached_video_analysis(video_id: str, analysis_version: int) -> Optional[dict]:
+    """Return the stored analysis for a YouTube video id, or None on a miss or DB error."""
+    conn = cursor = None
+    try:
+        # Imported lazily so the highlight pipeline still runs without a database
+        from core.db import get_db_connection
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(select_sql, (video_id, analysis_version))
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        analysis = row["analysis_json"]
+        if isinstance(analysis, str):
+            analysis = json.loads(analysis)
+        return analysis
+    except Exception as e:
+        print(f"⚠️ Could not read analysis cache for {video_id}: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def save_video_analysis(video_id: str, analysis_version: int, analysis: dict):
+    """Upsert the analysis for a YouTube video id. Failures are logged, never raised."""
+    conn = cursor = None
+    try:
+        from core.db import get_db_connection
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(upsert_sql, (video_id, analysis_version, json.dumps(analysis)))
+        conn.commit()
+    except Exception as e:
+        print(f"⚠️ Could not write analysis cache for {video_id}: {e}")
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
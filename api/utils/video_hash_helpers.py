@@ -0,0 +1,166 @@
+import cv2
+import numpy as np
+
+from typing import Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+# Positions (as a fraction of the clip) sampled for a clip's perceptual signature
+SIGNATURE_SAMPLES = (0.1, 0.5, 0.9)
+
+# -------------------------------
+# 64-bit perceptual hashes
+# -------------------------------
+def average_hash64(frame: np.ndarray) -> int:
+    """8x8 average hash of a BGR frame packed into a 64-bit integer."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA)
+    bits = (small > small.mean()).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming64(a: int, b: int) -> int:
+    """Number of differing bits between two 64-bit hashes."""
+    return (a ^ b).bit_count()
+
+def signature_distance(a: Sequence[int], b: Sequence[int]) -> int:
+    """
+    Sum of per-frame Hamming distances. A sum of metrics is still a metric,
+    so signatures can be indexed in a BK-tree. Signatures of different lengths
+    are treated as maximally distant.
+    """
+    if len(a) != len(b):
+        return 64 * max(len(a), len(b))
+    return sum(hamming64(x, y) for x, y in zip(a, b))
+
+def video_signature(video_path: str, samples: Sequence[float] = SIGNATURE_SAMPLES) -> Optional[Tuple[int, ...]]:
+    """
+    Hash a few frames spread across the clip, opening the file once.
+    Returns None if any sampled frame can't be decoded.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        hashes = []
+        for fraction in samples:
+            if frame_count > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_count * fraction))
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                return None
+            hashes.append(average_hash64(frame))
+        return tuple(hashes)
+    finally:
+        cap.release()
+
+def frame_hashes_at(video_path: str, timestamps: Sequence[float]) -> Optional[Tuple[int, ...]]:
+    """Hash the frames at the given timestamps (seconds). Returns None if any can't be decoded."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        hashes = []
+        for t in timestamps:
+            cap.set(cv2.CAP_PROP_POS_MSEC, max(0.0, t) * 1000)
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                return None
+            hashes.append(average_hash64(frame))
+        return tuple(hashes)
+    finally:
+        cap.release()
+
+
+# -------------------------------
+# BK-tree for near-duplicate lookups
+# -------------------------------
+class BKTree(Generic[K, V]):
+    """
+    Burkhard-Keller tree over a discrete metric. Range queries only descend
+    into children whose edge distance is within `radius` of the query distance,
+    so lookups touch a small fraction of the indexed items.
+    """
+
+    def __init__(self, distance: Callable[[K, K], int]):
+        self._distance = distance
+        self._root = None  # [key, value, {edge_distance: child}]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: K, value: V):
+        if self._root is None:
+            self._root = [key, value, {}]
+            self._size = 1
+            return
+
+        node = self._root
+        while True:
+            d = self._distance(key, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [key, value, {}]
+                self._size += 1
+                return
+            node = child
+
+    def find_within(self, key: K, radius: int) -> List[Tuple[int, V]]:
+        """All (distance, value) pairs whose key is within `radius` of `key`."""
+        if self._root is None:
+            return []
+
+        matches = []
+        stack = [self._root]
+        while stack:
+            node_key, node_value, children = stack.pop()
+            d = self._distance(key, node_key)
+            if d <= radius:
+                matches.append((d, node_value))
+            for edge, child in children.items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return matches
+
+
+# -------------------------------
+# Cross-video segment index
+# -------------------------------
+class SegmentIndex:
+    """
+    Fingerprints of segments already kept in a reel job. A segment is a duplicate
+    when its frames are near-identical to a kept one, or when its frames are
+    only loosely similar (re-encodes, overlays, crops) but the audio envelope matches too.
+    """
+
+    def __init__(self, bits_per_frame: int = 8, loose_bits_per_frame: int = 16, audio_bits: int = 6):
+        self.bits_per_frame = bits_per_frame
+        self.loose_bits_per_frame = loose_bits_per_frame
+        self.audio_bits = audio_bits
+        self._tree: BKTree = BKTree(signature_distance)
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    def find_duplicate(self, frame_hashes: Optional[Sequence[int]], audio_fingerprint: Optional[int] = None,
+                       source: Optional[str] = None):
+        """
+        The label of a matching indexed segment, or None. Segments from the same
+        `source` video are ignored, and segments without frame hashes never match.
+        """
+        if not frame_hashes:
+            return None
+        key = tuple(frame_hashes)
+        strict = self.bits_per_frame * len(key)
+        loose = self.loose_bits_per_frame * len(key)
+        for distance, (other_source, label, other_audio) in sorted(self._tree.find_within(key, loose), key=lambda m: m[0]):
+            if source is not None and other_source == source:
+                continue
+            if distance <= strict:
+                return label
+            if audio_fingerprint is not None and other_audio is not None and \
+                    (audio_fingerprint ^ other_audio).bit_count() <= self.audio_bits:
+                return label
+        return None
+
+    def add(self, frame_hashes: Optional[Sequence[int]], audio_fingerprint: Optional[int], source: str, label: str):
+        if frame_hashes:
+            self._tree.add(tuple(frame_hashes), (source, label, audio_fingerprint))
@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS ai_analysis_cache (
+    cache_key CHAR(64) NOT NULL,
+    kind VARCHAR(32) NOT NULL,
+    model VARCHAR(64) NOT NULL,
+    prompt_version INT NOT NULL,
+    response_json JSON NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (cache_key),
+    INDEX idx_ai_analysis_cache_expires (expires_at)
+);
@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS crawl_state (
+    url VARCHAR(512) NOT NULL,
+    etag VARCHAR(255) NULL,
+    last_modified VARCHAR(64) NULL,
+    content_hash CHAR(32) NULL,
+    recrawl_interval_hours INT NOT NULL,
+    last_fetched_at DATETIME NOT NULL,
+    last_changed_at DATETIME NULL,
+    next_crawl_at DATETIME NOT NULL,
+    PRIMARY KEY (url),
+    INDEX idx_crawl_state_next (next_crawl_at)
+);
@@ -30,6 +30,8 @@ CREATE TABLE `ai_generated_high_school_evaluations` (
   `strengths` json NOT NULL,
   `weaknesses` json NOT NULL,
   `ai_analysis` mediumtext NOT NULL,
+  `input_fingerprint` char(32) DEFAULT NULL,
+  `prompt_version` int DEFAULT NULL,
   PRIMARY KEY (`ai_evaluation_id`),
   UNIQUE KEY `player_id` (`player_uid`),
   UNIQUE KEY `player_uid` (`player_uid`),
@@ -61,6 +63,8 @@ CREATE TABLE `ai_generated_nba_evaluations` (
   `strengths` json NOT NULL,
   `weaknesses` json NOT NULL,
   `ai_analysis` mediumtext NOT NULL,
+  `input_fingerprint` char(32) DEFAULT NULL,
+  `prompt_version` int DEFAULT NULL,
   PRIMARY KEY (`ai_evaluation_id`),
   UNIQUE KEY `uq_player_uid` (`player_uid`),
   CONSTRAINT `fk_ai_player_uid` FOREIGN KEY (`player_uid`) REFERENCES `players` (`player_uid`) ON DELETE CASCADE ON UPDATE CASCADE
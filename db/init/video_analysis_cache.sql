@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS video_analysis_cache (
+    video_id VARCHAR(32) NOT NULL,
+    analysis_version INT NOT NULL,
+    analysis_json JSON NOT NULL,
+    last_updated TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (video_id, analysis_version)
+);
\ No newline at end of file